@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Compute the test plans of several pull requests against the same base reference.
+
+Usage: python batch_plan.py pull_requests.json plans.json
+
+The pull requests file maps a key (e.g. the pull request number) to the git reference of the
+pull request head and its body: {"123": {"ref": "refs/pull/123/head", "body": "..."}}. The other
+settings (COLLECTIONS_TO_TEST, TOTAL_JOBS, PULL_REQUEST_BASE_REF, ...) are read from the
+environment, like for list_changed_targets.py.
+"""
+
+import json
+import os
+
+from argparse import ArgumentParser
+from pathlib import PosixPath
+
+from list_changed_targets import ListChangedTargets
+from list_changed_targets import PullRequest
+from phase_timings import PROFILER
+
+
+def read_pull_requests(path: PosixPath) -> dict[str, PullRequest]:
+    """Read the pull requests to compute the test plan of.
+
+    :param path: the JSON file of the pull requests
+    :returns: the pull requests, per key
+    :raises ValueError: when a pull request has no git reference
+    """
+    content = json.loads(path.read_text(encoding="utf-8"))
+    result = {}
+    for key, value in content.items():
+        if not value.get("ref"):
+            raise ValueError(f"Missing git reference for pull request {key}")
+        result[str(key)] = PullRequest(value["ref"], value.get("body") or "")
+    return result
+
+
+def main() -> None:
+    """Compute the test plans of the pull requests and write them as JSON."""
+    parser = ArgumentParser(description="Compute the test plans of several pull requests.")
+    parser.add_argument("pull_requests", type=PosixPath, help="The pull requests JSON file.")
+    parser.add_argument("output", type=PosixPath, help="Write the test plans as JSON.")
+    args = parser.parse_args()
+
+    plans = ListChangedTargets().run_batch(read_pull_requests(args.pull_requests))
+    args.output.write_text(json.dumps(plans, indent=2), encoding="utf-8")
+    timings_output = os.environ.get("SPLITTER_TIMINGS_OUTPUT", "")
+    PROFILER.write(PosixPath(timings_output) if timings_output else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks of the splitter, run as modules from the directory of the action."""
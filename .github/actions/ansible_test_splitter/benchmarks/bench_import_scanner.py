@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Compare the import scanner with a full ast walk on the python files of collections.
+
+Usage: python -m benchmarks.bench_import_scanner path_to_collection_1 [path_to_collection_2 ...]
+"""
+
+import ast
+import json
+import statistics
+import timeit
+
+from argparse import ArgumentParser
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import List
+
+from import_scanner import scan_imports
+from import_scanner import walk_imports
+
+
+def bench_file(path: PosixPath, repeat: int) -> dict[str, Any]:
+    """Time the import extraction of a single file.
+
+    :param path: path to the python file
+    :param repeat: number of extractions to time
+    :returns: the timings of the file
+    """
+    content = path.read_text()
+    walk = min(timeit.repeat(lambda: walk_imports(content), number=1, repeat=repeat))
+    scan = min(timeit.repeat(lambda: scan_imports(content), number=1, repeat=repeat))
+    return {
+        "path": str(path),
+        "size": len(content),
+        "ast_walk": walk,
+        "scanner": scan,
+        "speedup": walk / scan if scan else 0.0,
+        "same_imports": sorted(ast.dump(n) for n in scan_imports(content))
+        == sorted(ast.dump(n) for n in walk_imports(content)),
+    }
+
+
+def main() -> None:
+    """Run the benchmark on the collections provided as arguments."""
+    parser = ArgumentParser(description="Benchmark the import scanner against ast.walk.")
+    parser.add_argument("collections", nargs="+", type=PosixPath, help="Path to collections.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing repetitions.")
+    parser.add_argument("--output", type=PosixPath, help="Write the per-file results as JSON.")
+    args = parser.parse_args()
+
+    results = []  # type: List[Dict[str, Any]]
+    for collection in args.collections:
+        for path in sorted(collection.glob("plugins/**/*.py")):
+            results.append(bench_file(path, args.repeat))
+    if not results:
+        print("No python file found.")
+        return
+
+    speedups = [r["speedup"] for r in results]
+    print(f"files            : {len(results)}")
+    print(f"total ast walk   : {sum(r['ast_walk'] for r in results) * 1000:.1f} ms")
+    print(f"total scanner    : {sum(r['scanner'] for r in results) * 1000:.1f} ms")
+    print(f"median speedup   : {statistics.median(speedups):.2f}x")
+    print(f"min/max speedup  : {min(speedups):.2f}x / {max(speedups):.2f}x")
+    for result in results:
+        if not result["same_imports"]:
+            print(f"imports mismatch : {result['path']}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
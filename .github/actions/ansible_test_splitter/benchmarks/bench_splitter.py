@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Time the phases of the splitter on synthetic collections of several sizes.
+
+Usage: python -m benchmarks.bench_splitter --sizes 100 1000 5000 --output results.json
+
+The results of two commits can be compared using --compare results_of_the_base.json.
+"""
+
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+from argparse import ArgumentParser
+from collections.abc import Callable
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from benchmarks.synthetic_collection import CollectionShape
+from benchmarks.synthetic_collection import SyntheticCollection
+from benchmarks.synthetic_collection import add_aliases_mix_argument
+from import_tree import build_import_tree
+from list_changed_common import Collection
+from list_changed_common import CollectionsImportGraph
+from list_changed_common import ElGrandeSeparator
+
+
+def timed(function: Callable[[], Any], repeat: int) -> float:
+    """Return the best wall time of a function, its output being discarded.
+
+    :param function: the function to time
+    :param repeat: the number of runs
+    :returns: the best wall time in seconds
+    """
+    best = float("inf")
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for _ in range(repeat):
+            with contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                function()
+                best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_size(root: PosixPath, shape: CollectionShape, jobs: int, repeat: int) -> dict[str, Any]:
+    """Time the splitter phases on a synthetic collection.
+
+    :param root: the directory to generate the collection into
+    :param shape: the size and the content mix of the collection
+    :param jobs: the number of jobs to share the targets on
+    :param repeat: the number of runs of each phase
+    :returns: the timings of the phases in seconds
+    """
+    size = shape.modules
+    synthetic = SyntheticCollection(root / f"size_{size}", shape=shape)
+    path = synthetic.generate()
+    graph = CollectionsImportGraph([path])
+    graph.build()
+    changed_utils = [
+        f"ansible_collections.{synthetic.name}.plugins.module_utils.{u}"
+        for u in synthetic.module_utils[-3:]
+    ]
+
+    def _add_targets() -> None:
+        collection = Collection(path, graph)
+        for module in synthetic.modules:
+            collection.add_target_to_plan(module)
+
+    def _cover_module_utils() -> None:
+        graph.graph.clear_closures()
+        Collection(path, graph).cover_module_utils(changed_utils)
+
+    def _output() -> None:
+        collection = Collection(path, graph)
+        collection.cover_all()
+        ElGrandeSeparator([collection], jobs).output()
+
+    return {
+        "size": size,
+        "module_utils": len(synthetic.module_utils),
+        "build_import_tree": timed(
+            lambda: build_import_tree(path, synthetic.name, [synthetic.name]), repeat
+        ),
+        "add_target_to_plan": timed(_add_targets, repeat),
+        "cover_module_utils": timed(_cover_module_utils, repeat),
+        "ElGrandeSeparator.output": timed(_output, repeat),
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Return the commit being benchmarked.
+
+    :returns: the commit SHA or None outside of a git checkout
+    """
+    proc = subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        cwd=PosixPath(__file__).parent,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    return proc.stdout.decode().strip() or None
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]]) -> None:
+    """Print the ratio of the timings to the ones of a baseline.
+
+    :param results: the timings per size
+    :param baseline: the timings per size of the baseline
+    """
+    base_by_size = {r["size"]: r for r in baseline}
+    for result in results:
+        base = base_by_size.get(result["size"])
+        if base is None:
+            continue
+        for phase, value in result.items():
+            if phase in ("size", "module_utils") or not base.get(phase):
+                continue
+            print(f"size {result['size']:>6} {phase:<26} {value / base[phase]:.2f}x baseline")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = ArgumentParser(description="Benchmark the splitter on synthetic collections.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Sizes.")
+    parser.add_argument("--fan-out", type=int, default=3, help="The module_utils per file.")
+    parser.add_argument(
+        "--module-utils-ratio",
+        type=float,
+        default=0.1,
+        help="The number of module_utils relative to the size.",
+    )
+    add_aliases_mix_argument(parser)
+    parser.add_argument("--jobs", type=int, default=10, help="The number of jobs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timing repetitions.")
+    parser.add_argument("--output", type=PosixPath, help="Write the results as JSON.")
+    parser.add_argument("--compare", type=PosixPath, help="JSON results to compare with.")
+    args = parser.parse_args()
+
+    results = []  # type: List[Dict[str, Any]]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            shape = CollectionShape(
+                modules=size,
+                module_utils=max(1, int(size * args.module_utils_ratio)),
+                targets=size,
+                fan_out=args.fan_out,
+                aliases_mix=args.aliases_mix,
+            )
+            result = bench_size(PosixPath(tmp_dir), shape, args.jobs, args.repeat)
+            print(
+                " ".join(
+                    f"{k}={v * 1000:.1f}ms" if isinstance(v, float) else f"{k}={v}"
+                    for k, v in result.items()
+                )
+            )
+            results.append(result)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        compare(results, baseline["results"])
+    if args.output:
+        content = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "fan_out": args.fan_out,
+            "module_utils_ratio": args.module_utils_ratio,
+            "aliases_mix": args.aliases_mix,
+            "jobs": args.jobs,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(content, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
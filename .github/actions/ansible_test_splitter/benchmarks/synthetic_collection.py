@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Generate synthetic collections to measure how the splitter scales.
+
+Usage: python -m benchmarks.synthetic_collection output_dir --modules 500 --module-utils 50
+"""
+
+import random
+
+from argparse import ArgumentParser
+from pathlib import PosixPath
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+
+# The aliases of a regular target, picked at random with these weights
+ALIASES_MIX = {
+    "": 10,
+    "slow": 1,
+    "disabled": 1,
+    "unstable": 1,
+    "time=10m": 2,
+    "time=45": 2,
+}
+
+MODULE_TEMPLATE = '''
+DOCUMENTATION = r"""
+module: {name}
+short_description: synthetic module
+"""
+
+EXAMPLES = r"""
+- name: Not an import
+  import_tasks: something.yml
+"""
+
+{imports}
+
+
+def main():
+    pass
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+class CollectionShape(NamedTuple):
+    """The size and the content mix of a synthetic collection."""
+
+    modules: int = 100
+    module_utils: int = 20
+    targets: int = 100
+    fan_out: int = 3
+    setup_targets: int = 5
+    aliases_mix: Optional[Dict[str, int]] = None
+
+
+def parse_aliases_mix(value: str) -> dict[str, int]:
+    """Parse an aliases mix given on the command line.
+
+    :param value: comma separated alias=weight pairs, e.g. "=10,slow=1,time=10m=2"
+    :returns: the weight of each alias, the empty alias being a target without extra alias
+    """
+    mix = {}  # type: Dict[str, int]
+    for item in value.split(","):
+        alias, _, weight = item.rpartition("=")
+        mix[alias] = int(weight)
+    return mix
+
+
+def add_aliases_mix_argument(parser: ArgumentParser) -> None:
+    """Add the option setting the aliases mix of the targets to a command line parser.
+
+    :param parser: the command line parser
+    """
+    parser.add_argument(
+        "--aliases-mix",
+        type=parse_aliases_mix,
+        default=ALIASES_MIX,
+        help="The weights of the extra aliases of the targets, e.g. '=10,slow=1,disabled=1'.",
+    )
+
+
+class SyntheticCollection:
+    """A collection generated on disk.
+
+    The module_utils are imported following a power law (a few are imported by most of the
+    modules, like module_utils/core.py), the module_utils only import module_utils with a lower
+    index so that the import graph has no cycle.
+    """
+
+    def __init__(
+        self,
+        path: PosixPath,
+        name: str = "synthetic.collection",
+        shape: CollectionShape = CollectionShape(),
+        seed: int = 0,
+    ) -> None:
+        """Class constructor.
+
+        :param path: the directory to generate the collection into
+        :param name: the collection name
+        :param shape: the size and the content mix of the collection
+        :param seed: the seed of the random generator
+        """
+        self.path = path
+        self.name = name
+        self.shape = shape
+        self.modules = [f"mod_{i}" for i in range(shape.modules)]
+        self.module_utils = [f"util_{i}" for i in range(shape.module_utils)]
+        self.random = random.Random(seed)
+
+    def _pick_utils(self, count: int, upper: int) -> list[str]:
+        """Pick module_utils following a power law.
+
+        :param count: the number of module_utils to pick
+        :param upper: pick among the module_utils with an index lower than this one
+        :returns: the names of the module_utils
+        """
+        if upper <= 0:
+            return []
+        weights = [1 / (i + 1) for i in range(upper)]
+        picked = self.random.choices(self.module_utils[:upper], weights=weights, k=count)
+        return sorted(set(picked))
+
+    def _imports(self, utils: list[str]) -> str:
+        """Render the imports of module_utils, mixing absolute and relative imports.
+
+        :param utils: the names of the module_utils
+        :returns: the python import statements
+        """
+        lines = ["import json"]
+        for util in utils:
+            if self.random.random() < 0.5:
+                lines.append(
+                    f"from ansible_collections.{self.name}.plugins.module_utils.{util} import X"
+                )
+            else:
+                lines.append(f"from ..module_utils.{util} import X")
+        return "\n".join(lines)
+
+    def write_plugins(self) -> None:
+        """Write the modules and the module_utils of the collection."""
+        modules_dir = self.path / "plugins" / "modules"
+        utils_dir = self.path / "plugins" / "module_utils"
+        modules_dir.mkdir(parents=True, exist_ok=True)
+        utils_dir.mkdir(parents=True, exist_ok=True)
+        (utils_dir / "__init__.py").write_text("")
+        for i, util in enumerate(self.module_utils):
+            utils = self._pick_utils(self.shape.fan_out, i)
+            (utils_dir / f"{util}.py").write_text(
+                MODULE_TEMPLATE.format(name=util, imports=self._imports(utils))
+            )
+        for module in self.modules:
+            utils = self._pick_utils(self.shape.fan_out, len(self.module_utils))
+            (modules_dir / f"{module}.py").write_text(
+                MODULE_TEMPLATE.format(name=module, imports=self._imports(utils))
+            )
+
+    def write_targets(self) -> None:
+        """Write the integration test targets of the collection."""
+        targets_dir = self.path / "tests" / "integration" / "targets"
+        setup_targets = [f"setup_{i}" for i in range(self.shape.setup_targets)]
+        for setup in setup_targets:
+            (targets_dir / setup).mkdir(parents=True, exist_ok=True)
+            (targets_dir / setup / "aliases").write_text("hidden\n")
+        aliases_mix = self.shape.aliases_mix or ALIASES_MIX
+        mix = list(aliases_mix)
+        mix_weights = list(aliases_mix.values())
+        for i in range(self.shape.targets):
+            aliases = ["cloud/aws"]  # type: List[str]
+            if self.modules:
+                aliases.append(self.modules[i % len(self.modules)])
+            if setup_targets and self.random.random() < 0.3:
+                aliases.append(f"needs/target/{self.random.choice(setup_targets)}")
+            extra = self.random.choices(mix, weights=mix_weights)[0]
+            if extra:
+                aliases.append(extra)
+            (targets_dir / f"target_{i}").mkdir(parents=True, exist_ok=True)
+            (targets_dir / f"target_{i}" / "aliases").write_text("\n".join(aliases) + "\n")
+
+    def generate(self) -> PosixPath:
+        """Write the collection on disk.
+
+        :returns: the path to the collection
+        """
+        namespace, name = self.name.split(".")
+        self.path.mkdir(parents=True, exist_ok=True)
+        (self.path / "galaxy.yml").write_text(f"namespace: {namespace}\nname: {name}\n")
+        self.write_plugins()
+        self.write_targets()
+        return self.path
+
+
+def main() -> None:
+    """Generate a synthetic collection."""
+    parser = ArgumentParser(description="Generate a synthetic collection.")
+    parser.add_argument("path", type=PosixPath, help="The directory to generate into.")
+    parser.add_argument("--name", default="synthetic.collection", help="The collection name.")
+    parser.add_argument("--modules", type=int, default=100, help="The number of modules.")
+    parser.add_argument("--module-utils", type=int, default=20, help="The number of module_utils.")
+    parser.add_argument("--targets", type=int, default=100, help="The number of targets.")
+    parser.add_argument("--fan-out", type=int, default=3, help="The module_utils per file.")
+    add_aliases_mix_argument(parser)
+    parser.add_argument("--seed", type=int, default=0, help="The random generator seed.")
+    args = parser.parse_args()
+
+    shape = CollectionShape(
+        modules=args.modules,
+        module_utils=args.module_utils,
+        targets=args.targets,
+        fan_out=args.fan_out,
+        aliases_mix=args.aliases_mix,
+    )
+    SyntheticCollection(args.path, args.name, shape, seed=args.seed).generate()
+
+
+if __name__ == "__main__":
+    main()
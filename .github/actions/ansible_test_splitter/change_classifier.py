@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Classify the changed files of a collection in a single pass."""
+
+from collections.abc import Iterable
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+# Bucket of the changed files matching none of the known prefixes
+UNCLASSIFIED = "unclassified"
+# Bucket of the changed files which do not impact the integration tests
+IGNORED = "ignored"
+
+# The bucket of the changed files, per path prefix
+CHANGE_PREFIXES = {
+    "plugins/modules": "modules",
+    "plugins/inventory": "inventory",
+    "plugins/connection": "connection",
+    "plugins/lookup": "lookup",
+    "plugins/module_utils": "module_utils",
+    "plugins/plugin_utils": "plugin_utils",
+    "plugins/doc_fragments": "doc_fragments",
+    "tests/integration/targets": "targets",
+    "roles": "roles",
+    "changelogs": IGNORED,
+    "docs": IGNORED,
+    "tests/sanity": IGNORED,
+    "tests/unit": IGNORED,
+}
+
+# A classified change: the path and the path component following the prefix (e.g. the target
+# name for tests/integration/targets/<name>/tasks/main.yml)
+Classified = Tuple[PosixPath, str]
+
+
+class PrefixTrie:
+    """Map path prefixes to values, matching the longest prefix of a path."""
+
+    def __init__(self, prefixes: Optional[dict[str, Any]] = None) -> None:
+        """Class constructor.
+
+        :param prefixes: the value per path prefix
+        """
+        # the children per path component, the value of a prefix is stored under the None key
+        self.root = {}  # type: Dict[Optional[str], Any]
+        for prefix, value in (prefixes or {}).items():
+            self.insert(prefix, value)
+
+    def insert(self, prefix: str, value: Any) -> None:
+        """Add a prefix.
+
+        :param prefix: the path prefix
+        :param value: the value of the prefix
+        """
+        node = self.root
+        for part in PosixPath(prefix).parts:
+            node = node.setdefault(part, {})
+        node[None] = value
+
+    def match(self, parts: tuple[str, ...]) -> tuple[Any, int]:
+        """Find the longest prefix of a path.
+
+        :param parts: the path components
+        :returns: the value of the longest prefix and its number of components, None and 0 when
+            no prefix matches
+        """
+        node = self.root
+        result = (None, 0)  # type: Tuple[Any, int]
+        for depth, part in enumerate(parts, start=1):
+            if part not in node:
+                break
+            node = node[part]
+            if None in node:
+                result = (node[None], depth)
+        return result
+
+
+_CHANGE_TRIE = PrefixTrie(CHANGE_PREFIXES)
+
+
+def classify_changes(paths: Iterable[PosixPath]) -> dict[str, list[Classified]]:
+    """Bucket the changed files by kind (modules, targets, roles, ...).
+
+    :param paths: the changed files, relative to the collection root
+    :returns: the changes per bucket, the files matching no prefix being into UNCLASSIFIED
+    """
+    result = {UNCLASSIFIED: []}  # type: Dict[str, List[Classified]]
+    for bucket in CHANGE_PREFIXES.values():
+        result[bucket] = []
+    for path in paths:
+        bucket, depth = _CHANGE_TRIE.match(path.parts)
+        if bucket is None:
+            result[UNCLASSIFIED].append((path, ""))
+        elif depth < len(path.parts):
+            result[bucket].append((path, path.parts[depth]))
+    return result
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Fixtures shared by the tests cases."""
+
+import subprocess
+
+from pathlib import PosixPath
+
+import pytest
+
+
+class GitRepository:
+    """A git repository created into a temporary directory."""
+
+    def __init__(self, path: PosixPath) -> None:
+        """Class constructor.
+
+        :param path: the directory of the repository
+        """
+        self.path = path
+
+    def run(self, *args: str) -> None:
+        """Run a git command into the repository.
+
+        :param args: the git command arguments
+        """
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=self.path,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def commit_base(self) -> None:
+        """Commit the files of the directory as the origin/main base reference."""
+        self.run("init", "-q")
+        self.run("add", ".")
+        self.run("commit", "-q", "-m", "initial")
+        self.run("update-ref", "refs/remotes/origin/main", "HEAD")
+
+
+@pytest.fixture(name="git_repo")
+def fixture_git_repo(tmp_path: PosixPath) -> GitRepository:
+    """Create a git repository into the temporary directory of the test.
+
+    :param tmp_path: python temporary path fixture
+    :returns: the repository, its files being committed using commit_base
+    """
+    return GitRepository(tmp_path)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Index the collection files covered by each integration test target."""
+
+import json
+import re
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from collections.abc import Iterable
+from pathlib import PosixPath
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from json_store import JsonStore
+
+
+STORE_VERSION = 1
+STORE_FILE_NAME = "coverage_index.json"
+
+# The collection files path into the coverage data, e.g.
+# /root/ansible_collections/amazon/aws/plugins/modules/ec2.py
+_COLLECTION_PATH = re.compile(r"(?:^|/)ansible_collections/(\w+)/(\w+)/(.+)$")
+
+
+def coverage_key(collection_name: str, path: str) -> str:
+    """Return the key of a collection file into the index.
+
+    :param collection_name: the collection the path is relative to, unless the path is under an
+        ansible_collections/<namespace>/<name> directory
+    :param path: the file path
+    :returns: the key, e.g. amazon.aws:plugins/modules/ec2.py
+    """
+    match = _COLLECTION_PATH.search(path)
+    if match:
+        return f"{match.group(1)}.{match.group(2)}:{match.group(3)}"
+    return f"{collection_name}:{path}"
+
+
+def read_coverage_targets(path: PosixPath, collection_name: str) -> dict[str, set[str]]:
+    """Read the targets covering each file from an ansible-test coverage analysis.
+
+    The file is written by `ansible-test coverage analyze targets generate`, it lists the
+    targets and, per file, the arcs or lines covered by the ids of the targets.
+
+    :param path: path to the coverage analysis
+    :param collection_name: the collection the coverage was collected for
+    :returns: the names of the targets covering each file, per file key (see coverage_key)
+    """
+    content = json.loads(path.read_text(encoding="utf-8"))
+    targets = content["targets"]
+    result = defaultdict(set)  # type: Dict[str, Set[str]]
+    for kind in ("arcs", "lines"):
+        for file_path, points in content.get(kind, {}).items():
+            key = coverage_key(collection_name, file_path)
+            for ids in points.values():
+                result[key].update(targets[i] for i in ids)
+    return dict(result)
+
+
+def read_coverage(paths: Iterable[PosixPath], collection_name: str) -> dict[str, set[str]]:
+    """Read the targets covering each file from ansible-test coverage analysis files.
+
+    :param paths: path to the files or directories containing them
+    :param collection_name: the collection the coverage was collected for
+    :returns: the names of the targets covering each file, per file key (see coverage_key)
+    """
+    result = defaultdict(set)  # type: Dict[str, Set[str]]
+    for path in paths:
+        files = sorted(path.glob("**/*.json")) if path.is_dir() else [path]
+        for file in files:
+            try:
+                for key, targets in read_coverage_targets(file, collection_name).items():
+                    result[key] |= targets
+            except (ValueError, KeyError, TypeError, IndexError, AttributeError) as err:
+                print(f"Ignoring invalid coverage analysis file {file} => {err}")
+    return dict(result)
+
+
+class CoverageIndex(JsonStore):
+    """Keep the files covered by the targets of each collection.
+
+    The index is a JSON file as follow, the files being listed with the ids of the targets of the
+    collection covering them:
+
+        {
+            "version": 1,
+            "collections": {
+                "community.aws": {
+                    "targets": ["ec2_win_password", "sns"],
+                    "files": {"amazon.aws:plugins/module_utils/ec2.py": [0]}
+                }
+            }
+        }
+    """
+
+    store_file_name = STORE_FILE_NAME
+    store_version = STORE_VERSION
+    description = "coverage index"
+
+    def __init__(self, cache_dir: Optional[PosixPath] = None) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the index from and save it to, the index is kept in
+            memory only when not set
+        """
+        super().__init__(cache_dir)
+        # the targets of each collection covering a file, per file key
+        self.collections = {}  # type: Dict[str, Dict[str, Set[str]]]
+        self.load()
+
+    def load(self) -> None:
+        """Load the index from the cache directory, invalid content is ignored."""
+        content = self.read()
+        if content is None:
+            return
+        try:
+            collections = {}
+            for name, data in content.get("collections", {}).items():
+                targets = data["targets"]
+                collections[name] = {
+                    key: {targets[i] for i in ids} for key, ids in data["files"].items()
+                }
+        except (ValueError, KeyError, TypeError, IndexError, AttributeError):
+            print(f"Ignoring invalid {self.description} => {self.store_file}")
+            return
+        self.collections = collections
+
+    def save(self) -> None:
+        """Write the index into the cache directory."""
+        if self.store_file is None:
+            return
+        collections = {}
+        for name, files in self.collections.items():
+            targets = sorted({t for covering in files.values() for t in covering})
+            ids = {target: i for i, target in enumerate(targets)}
+            collections[name] = {
+                "targets": targets,
+                "files": {key: sorted(ids[t] for t in files[key]) for key in sorted(files)},
+            }
+        self.write({"collections": collections})
+
+    def record(self, collection_name: str, coverage: dict[str, set[str]]) -> None:
+        """Update the index with the coverage of a run of some targets of a collection.
+
+        The files covered by the targets of the run replace the ones previously recorded for
+        these targets, the other targets are kept as is.
+
+        :param collection_name: the collection of the targets
+        :param coverage: the names of the targets covering each file, per file key
+        """
+        files = self.collections.setdefault(collection_name, {})
+        ran = {t for covering in coverage.values() for t in covering}
+        for key in list(files):
+            files[key] -= ran
+            if not files[key]:
+                del files[key]
+        for key, covering in coverage.items():
+            files.setdefault(key, set()).update(covering)
+
+    def covering_targets(self, key: str) -> Optional[dict[str, list[str]]]:
+        """List the targets covering a file.
+
+        :param key: the file key, e.g. amazon.aws:plugins/module_utils/ec2.py
+        :returns: the sorted names of the targets covering the file, per collection, None when
+            no target of the index covers the file
+        """
+        result = {}  # type: Dict[str, List[str]]
+        for name, files in self.collections.items():
+            if key in files:
+                result[name] = sorted(files[key])
+        return result or None
+
+    def covered_files(self, collection_name: str, target_name: str) -> list[str]:
+        """List the files covered by a target.
+
+        :param collection_name: the collection of the target
+        :param target_name: the target name
+        :returns: the sorted keys of the files covered by the target
+        """
+        files = self.collections.get(collection_name, {})
+        return sorted(key for key, covering in files.items() if target_name in covering)
+
+
+def main() -> None:
+    """Record the targets coverage from ansible-test coverage analysis files into the index."""
+    parser = ArgumentParser(description="Record the files covered by integration test targets.")
+    parser.add_argument("--collection", required=True, help="The collection name.")
+    parser.add_argument("--cache-dir", required=True, type=PosixPath, help="The index directory.")
+    parser.add_argument(
+        "coverage",
+        nargs="+",
+        type=PosixPath,
+        help="ansible-test coverage analyze targets files/directories.",
+    )
+    args = parser.parse_args()
+
+    index = CoverageIndex(args.cache_dir)
+    coverage = read_coverage(args.coverage, args.collection)
+    print(f"Recording the targets covering {len(coverage)} files for {args.collection}")
+    index.record(args.collection, coverage)
+    index.save()
+
+
+if __name__ == "__main__":
+    main()
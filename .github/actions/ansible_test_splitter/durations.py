@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Store the duration of the integration test targets learned from previous runs."""
+
+import json
+import time
+import xml.etree.ElementTree as ET
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from collections.abc import Iterable
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from import_cache import git_blob_sha
+from json_store import CollectionsStore
+
+
+STORE_VERSION = 1
+STORE_FILE_NAME = "durations.json"
+
+# Weight of the newest sample in the moving average
+EWMA_ALPHA = 0.3
+# A sample is clamped to this ratio of the current estimate, so that a single hung or
+# short-circuited run does not ruin the estimate
+OUTLIER_RATIO = 4.0
+# Targets not seen for this number of days are dropped from the store
+MAX_AGE_DAYS = 60
+
+
+def read_ansible_test_data(path: PosixPath) -> dict[str, float]:
+    """Read the targets duration from an ansible-test integration data file.
+
+    The file is written by ansible-test into tests/output/data/integration-*.json.
+
+    :param path: path to the data file
+    :returns: the duration in seconds per target
+    :raises ValueError: when the file content is not a JSON object of targets
+    """
+    content = json.loads(path.read_text(encoding="utf-8"))
+    targets = content.get("targets", {}) if isinstance(content, dict) else None
+    if not isinstance(targets, dict):
+        raise ValueError("not an ansible-test data file")
+    return {
+        name: float(data["run_time_seconds"])
+        for name, data in targets.items()
+        if isinstance(data, dict) and data.get("run_time_seconds") is not None
+    }
+
+
+def read_junit(path: PosixPath) -> dict[str, float]:
+    """Read the targets duration from a JUnit XML file.
+
+    Each test suite is expected to be named after the target it ran.
+
+    :param path: path to the JUnit file
+    :returns: the duration in seconds per target
+    """
+    result = defaultdict(float)  # type: Dict[str, float]
+    for suite in ET.parse(path).getroot().iter("testsuite"):
+        name = suite.get("name")
+        if name:
+            result[name] += float(suite.get("time") or 0)
+    return dict(result)
+
+
+def list_results_files(paths: Iterable[PosixPath]) -> list[PosixPath]:
+    """List the ansible-test data and JUnit files of paths to files or directories.
+
+    :param paths: path to the files or directories containing them
+    :returns: the path to the files
+    """
+    result = []
+    for path in paths:
+        files = sorted(path.glob("**/*")) if path.is_dir() else [path]
+        result += [f for f in files if f.suffix in (".json", ".xml") and f.is_file()]
+    return result
+
+
+def read_results(paths: Iterable[PosixPath]) -> dict[str, float]:
+    """Read the targets duration from ansible-test data or JUnit files.
+
+    :param paths: path to the files or directories containing them
+    :returns: the duration in seconds per target
+    """
+    result = {}  # type: Dict[str, float]
+    for file in list_results_files(paths):
+        try:
+            if file.suffix == ".json":
+                result.update(read_ansible_test_data(file))
+            else:
+                result.update(read_junit(file))
+        except (ValueError, KeyError, TypeError, ET.ParseError) as err:
+            print(f"Ignoring invalid test results file {file} => {err}")
+    return result
+
+
+class DurationStore(CollectionsStore):
+    """Keep a robust estimate of the duration of each target, per collection.
+
+    The store is a JSON file as follow:
+
+        {
+            "version": 1,
+            "collections": {
+                "amazon.aws": {
+                    "ec2_instance_basic": {"estimate": 612.4, "samples": 12, "last_seen": 1.7e9}
+                }
+            },
+            "ingested": {"amazon.aws": {"<blob sha of a results file>": 1.7e9}}
+        }
+
+    The results files already recorded are kept in "ingested", so that the same results are not
+    sampled twice when they are provided to several runs.
+    """
+
+    store_file_name = STORE_FILE_NAME
+    store_version = STORE_VERSION
+    description = "durations store"
+    max_age_days = MAX_AGE_DAYS
+
+    def __init__(self, cache_dir: Optional[PosixPath] = None) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the store from and save it to, the store is kept in
+            memory only when not set
+        """
+        # the time the results files were recorded, per collection and blob SHA of the file
+        self.ingested = {}  # type: Dict[str, Dict[str, float]]
+        super().__init__(cache_dir)
+
+    def restore(self, content: dict[str, Any]) -> None:
+        """Restore the store from the content of its file.
+
+        :param content: the content of the store file, with the expected version
+        """
+        super().restore(content)
+        self.ingested = content.get("ingested", {})
+
+    def dump(self) -> dict[str, Any]:
+        """Return the content of the store file.
+
+        :returns: the JSON serializable content, without the version
+        """
+        return {**super().dump(), "ingested": self.ingested}
+
+    def ingest(
+        self, collection_name: str, paths: Iterable[PosixPath], now: Optional[float] = None
+    ) -> dict[str, float]:
+        """Record the durations of the results files which have not been recorded yet.
+
+        :param collection_name: the collection name
+        :param paths: path to the results files or directories containing them
+        :param now: the time of the run, defaults to the current time
+        :returns: the duration in seconds per target read from the new results files
+        """
+        now = time.time() if now is None else now
+        ingested = self.ingested.setdefault(collection_name, {})
+        files = {}  # type: Dict[str, PosixPath]
+        for file in list_results_files(paths):
+            digest = git_blob_sha(file.read_bytes())
+            if digest not in ingested:
+                files.setdefault(digest, file)
+        durations = read_results(files.values())
+        self.record(collection_name, durations, now)
+        ingested.update(dict.fromkeys(files, now))
+        return durations
+
+    def record(
+        self, collection_name: str, durations: dict[str, float], now: Optional[float] = None
+    ) -> None:
+        """Update the estimates with the durations of a run.
+
+        :param collection_name: the collection name
+        :param durations: the duration in seconds per target
+        :param now: the time of the run, defaults to the current time
+        """
+        now = time.time() if now is None else now
+        targets = self.collections.setdefault(collection_name, {})
+        for name, duration in durations.items():
+            entry = targets.get(name)
+            if entry is None:
+                targets[name] = {"estimate": duration, "samples": 1, "last_seen": now}
+                continue
+            estimate = entry["estimate"]
+            if estimate > 0:
+                duration = min(max(duration, estimate / OUTLIER_RATIO), estimate * OUTLIER_RATIO)
+            entry["estimate"] = round(EWMA_ALPHA * duration + (1 - EWMA_ALPHA) * estimate, 1)
+            entry["samples"] += 1
+            entry["last_seen"] = now
+
+    def prune_entry(self, entry: dict[str, Any], limit: float) -> Optional[dict[str, Any]]:
+        """Drop the estimate of a target which has not been seen recently.
+
+        :param entry: the estimate of the target
+        :param limit: the time before which the target is dropped
+        :returns: the estimate, None when the target is dropped
+        """
+        return entry if entry["last_seen"] >= limit else None
+
+    def prune_before(self, limit: float) -> None:
+        """Drop the targets not seen since a time and the results files recorded before it.
+
+        :param limit: the time before which a target or a results file is dropped
+        """
+        super().prune_before(limit)
+        for name in list(self.ingested):
+            files = {k: v for k, v in self.ingested[name].items() if v >= limit}
+            if files:
+                self.ingested[name] = files
+            else:
+                del self.ingested[name]
+
+    def get(self, collection_name: str, target_name: str) -> Optional[int]:
+        """Return the estimated duration of a target.
+
+        :param collection_name: the collection name
+        :param target_name: the target name
+        :returns: the estimated duration in seconds or None when the target is unknown
+        """
+        entry = self.collections.get(collection_name, {}).get(target_name)
+        if entry is None:
+            return None
+        return max(1, int(round(entry["estimate"])))
+
+
+def main() -> None:
+    """Record the targets duration from test results into the store."""
+    parser = ArgumentParser(description="Record the duration of integration test targets.")
+    parser.add_argument("--collection", required=True, help="The collection name.")
+    parser.add_argument("--cache-dir", required=True, type=PosixPath, help="The store directory.")
+    parser.add_argument(
+        "--max-age-days", type=int, default=MAX_AGE_DAYS, help="Drop targets older than this."
+    )
+    parser.add_argument(
+        "results", nargs="+", type=PosixPath, help="ansible-test data or JUnit files/directories."
+    )
+    args = parser.parse_args()
+
+    store = DurationStore(args.cache_dir)
+    durations = store.ingest(args.collection, args.results)
+    print(f"Recording the duration of {len(durations)} targets for {args.collection}")
+    store.prune(args.max_age_days)
+    store.save()
+
+
+if __name__ == "__main__":
+    main()
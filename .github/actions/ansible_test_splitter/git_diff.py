@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Stream the files changed against a git reference."""
+
+import os
+import subprocess
+import tempfile
+
+from collections import defaultdict
+from collections.abc import Generator
+from collections.abc import Iterable
+from contextlib import contextmanager
+from pathlib import PosixPath
+from typing import IO
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+
+# Size of the chunks read from the git diff output
+CHUNK_SIZE = 64 * 1024
+
+
+class FileChange(NamedTuple):
+    """A file changed, as reported by `git diff --name-status`."""
+
+    # A (added), C (copied), D (deleted), M (modified), R (renamed), T (type changed), ...
+    status: str
+    path: PosixPath
+    # the path before a rename or a copy
+    old_path: Optional[PosixPath] = None
+
+    def paths(self) -> list[PosixPath]:
+        """List the paths impacted by the change.
+
+        :returns: the path and, for a rename, the path before the rename
+        """
+        if self.old_path is not None and self.status == "R":
+            return [self.path, self.old_path]
+        return [self.path]
+
+
+def split_stream(stream: IO[bytes], chunk_size: int = CHUNK_SIZE) -> Generator[bytes, None, None]:
+    """Split a stream on the NUL character while reading it.
+
+    :param stream: the stream to read
+    :param chunk_size: the size of the chunks read from the stream
+    :yields: the NUL terminated fields, without the NUL character
+    """
+    pending = b""
+    while chunk := stream.read(chunk_size):
+        fields = (pending + chunk).split(b"\0")
+        pending = fields.pop()
+        yield from fields
+    if pending:
+        yield pending
+
+
+def parse_name_status(fields: Iterable[bytes]) -> Generator[FileChange, None, None]:
+    """Parse the output of `git diff --name-status -z`.
+
+    Each change is a status (e.g. M or R100 with the similarity score of a rename) followed by
+    the path, or by the old and new paths for a rename or a copy.
+
+    :param fields: the NUL separated fields of the output
+    :yields: the changes
+    :raises ValueError: when the output is truncated
+    """
+    iterator = iter(fields)
+    for status in iterator:
+        if not status:
+            continue
+        kind = status.decode()[0]
+        path = next(iterator, None)
+        new_path = next(iterator, None) if kind in ("R", "C") else path
+        if path is None or new_path is None:
+            raise ValueError(f"Truncated git diff output after the status {status.decode()}")
+        if kind in ("R", "C"):
+            yield FileChange(kind, PosixPath(os.fsdecode(new_path)), PosixPath(os.fsdecode(path)))
+        else:
+            yield FileChange(kind, PosixPath(os.fsdecode(path)))
+
+
+def git_toplevel(path: PosixPath) -> PosixPath:
+    """Return the root directory of the git checkout containing a path.
+
+    :param path: a path inside the checkout
+    :returns: the root directory of the checkout
+    """
+    proc = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],
+        cwd=path,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return PosixPath(os.fsdecode(proc.stdout.rstrip(b"\n")))
+
+
+def git_diff(
+    base_ref: str, cwd: PosixPath, head_ref: str = ""
+) -> Generator[FileChange, None, None]:
+    """Stream the files changed against a base reference, detecting renames.
+
+    :param base_ref: the base reference, compared as origin/<base_ref>
+    :param cwd: a directory of the git checkout
+    :param head_ref: the reference compared with the base one, the working tree when not set
+    :yields: the changes, with paths relative to the root of the checkout
+    """
+    command = ["git", "diff", "--name-status", "-z", "-M", f"origin/{base_ref}"]
+    if head_ref:
+        command.append(head_ref)
+    print(f"Command for changed files => {' '.join(command)}")
+    with subprocess.Popen(command, stdout=subprocess.PIPE, cwd=cwd) as proc:
+        assert proc.stdout is not None
+        yield from parse_name_status(split_stream(proc.stdout))
+    if proc.returncode:
+        print(f"Command {' '.join(command)} failed with exit code {proc.returncode}")
+
+
+def partition_changes(
+    changes: Iterable[FileChange], roots: dict[PosixPath, PosixPath]
+) -> dict[PosixPath, list[FileChange]]:
+    """Share the changes of a checkout between the directories they belong to.
+
+    A file renamed from a directory into another one is reported as deleted from the first one
+    and added into the second one.
+
+    :param changes: the changes, with paths relative to the root of the checkout
+    :param roots: the directories relative to the root of the checkout, per key
+    :returns: the changes with paths relative to the directory, per key
+    """
+    result = {key: [] for key in roots}  # type: Dict[PosixPath, List[FileChange]]
+
+    def _relative(path: Optional[PosixPath], root: PosixPath) -> Optional[PosixPath]:
+        if path is None or not path.is_relative_to(root):
+            return None
+        return path.relative_to(root)
+
+    for change in changes:
+        for key, root in roots.items():
+            path = _relative(change.path, root)
+            old_path = _relative(change.old_path, root)
+            if path is not None:
+                result[key].append(FileChange(change.status, path, old_path))
+            elif old_path is not None and change.status == "R":
+                result[key].append(FileChange("D", old_path))
+    return result
+
+
+def list_changes(
+    paths: list[PosixPath], base_ref: str, head_ref: str = ""
+) -> dict[PosixPath, list[FileChange]]:
+    """List the files changed into directories, running git diff once per checkout.
+
+    :param paths: the directories, e.g. the collections being tested
+    :param base_ref: the base reference, compared as origin/<base_ref>
+    :param head_ref: the reference compared with the base one, the working tree when not set
+    :returns: the changes with paths relative to the directory, per directory
+    """
+    checkouts = defaultdict(dict)  # type: Dict[PosixPath, Dict[PosixPath, PosixPath]]
+    for path in paths:
+        toplevel = git_toplevel(path)
+        checkouts[toplevel][path] = path.resolve().relative_to(toplevel.resolve())
+    result = {}  # type: Dict[PosixPath, List[FileChange]]
+    for toplevel, roots in checkouts.items():
+        result.update(partition_changes(git_diff(base_ref, toplevel, head_ref), roots))
+    return result
+
+
+def git_revisions(path: PosixPath, base_ref: str) -> Optional[tuple[str, str]]:
+    """Resolve the base and head commits of the checkout containing a path.
+
+    :param path: a directory of the git checkout
+    :param base_ref: the base reference, resolved as origin/<base_ref>
+    :returns: the SHA of the base and head commits, None when the checkout has uncommitted
+        changes to tracked files or the references can not be resolved
+    """
+    proc = subprocess.run(
+        ["git", "rev-parse", f"origin/{base_ref}", "HEAD"],
+        cwd=path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    if proc.returncode:
+        return None
+    base_sha, head_sha = proc.stdout.decode().split()
+    dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=path, check=False)
+    if dirty.returncode:
+        return None
+    return base_sha, head_sha
+
+
+@contextmanager
+def git_worktree(path: PosixPath, ref: str) -> Generator[PosixPath, None, None]:
+    """Check a reference out into a temporary worktree of the checkout containing a path.
+
+    :param path: a directory of the git checkout, e.g. a collection
+    :param ref: the git reference to check out
+    :yields: the directory matching the path into the worktree, removed on exit
+    """
+    toplevel = git_toplevel(path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        worktree = PosixPath(tmp_dir) / "worktree"
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", str(worktree), ref],
+            cwd=toplevel,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            yield worktree / path.resolve().relative_to(toplevel.resolve())
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", str(worktree)], cwd=toplevel, check=False
+            )
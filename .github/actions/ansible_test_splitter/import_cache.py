@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Content-addressed cache of the python imports extracted from collection files."""
+
+import hashlib
+
+from collections.abc import Callable
+from collections.abc import Iterable
+from pathlib import PosixPath
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from json_store import JsonStore
+
+
+CACHE_VERSION = 2
+CACHE_FILE_NAME = "import_cache.json"
+
+
+def git_blob_sha(content: bytes) -> str:
+    """Compute the git blob SHA of a file content.
+
+    The value is the same as the one returned by `git hash-object <file>`.
+
+    :param content: the raw content of the file
+    :returns: the hexadecimal blob SHA
+    """
+    header = f"blob {len(content)}\0".encode()
+    return hashlib.sha1(header + content, usedforsecurity=False).hexdigest()
+
+
+class ImportCache(JsonStore):
+    """Store the imports of a file keyed by the git blob SHA of its content.
+
+    The imports of a file depend on its content and on the package it is read from (relative
+    imports are resolved against it), the entries are then stored as follow:
+
+        {
+            "<blob sha>": {
+                "ansible_collections.amazon.aws.plugins.modules": ["...", "..."],
+            }
+        }
+    """
+
+    store_file_name = CACHE_FILE_NAME
+    store_version = CACHE_VERSION
+    description = "import cache file"
+
+    def __init__(self, cache_dir: Optional[PosixPath] = None) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the cache from and save it to, the cache is kept in
+            memory only when not set
+        """
+        super().__init__(cache_dir)
+        self.entries = {}  # type: Dict[str, Dict[str, List[str]]]
+        self.used = {}  # type: Dict[str, Dict[str, List[str]]]
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self) -> None:
+        """Load the cache entries from the cache directory, invalid content is ignored."""
+        content = self.read()
+        if content is not None:
+            self.entries = content.get("entries", {})
+
+    def save(self) -> None:
+        """Write the cache entries used during this run into the cache directory.
+
+        Entries that have not been looked up are dropped so the cache does not grow with the
+        content of files which no longer exist.
+        """
+        if self.store_file is None or not self.used:
+            return
+        self.write({"entries": self.used}, sort_keys=True)
+        print(f"Import cache saved => {self.store_file} (hits={self.hits}, misses={self.misses})")
+
+    def lookup(self, content: bytes, package: str) -> Optional[list[str]]:
+        """Return the cached imports of a file.
+
+        :param content: the raw content of the file
+        :param package: the python package the file belongs to
+        :returns: the list of imports of the file or None when the file is not cached
+        """
+        blob_sha = git_blob_sha(content)
+        imports = self.entries.get(blob_sha, {}).get(package)
+        if imports is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.used.setdefault(blob_sha, {})[package] = imports
+        return imports
+
+    def store(self, content: bytes, package: str, imports: list[str]) -> None:
+        """Store the imports of a file into the cache.
+
+        :param content: the raw content of the file
+        :param package: the python package the file belongs to
+        :param imports: the list of imports of the file
+        """
+        blob_sha = git_blob_sha(content)
+        self.entries.setdefault(blob_sha, {})[package] = imports
+        self.used.setdefault(blob_sha, {})[package] = imports
+
+    def fetch(
+        self,
+        content: bytes,
+        package: str,
+        extract: Callable[[str], Iterable[str]],
+    ) -> list[str]:
+        """Return the imports of a file, the extract function is called on cache miss only.
+
+        :param content: the raw content of the file
+        :param package: the python package the file belongs to
+        :param extract: function returning the imports from the file content
+        :returns: the list of imports of the file
+        """
+        imports = self.lookup(content, package)
+        if imports is None:
+            imports = list(extract(content.decode()))
+            self.store(content, package, imports)
+        return imports
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Reverse dependency index of the python imports of a collection."""
+
+from collections import defaultdict
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+
+class ImportGraph:
+    """Index the modules impacted by a change on a python module they import.
+
+    The index stores the reverse edges of the import tree (imported module -> direct importers),
+    the modules transitively depending on an imported module are stored as a bitset over the
+    modules ids and computed once per imported module.
+    """
+
+    def __init__(
+        self, modules_import: dict[str, list[str]], utils_import: dict[str, list[str]]
+    ) -> None:
+        """Class constructor.
+
+        :param modules_import: python modules imported by each module
+        :param utils_import: python modules imported by each module_utils
+        """
+        self.modules_import = modules_import
+        self.utils_import = utils_import
+        self.modules = sorted(modules_import)
+        module_ids = {name: i for i, name in enumerate(self.modules)}
+        # bitset of the modules directly importing a python module
+        self.direct_modules = defaultdict(int)  # type: Dict[str, int]
+        # python modules directly importing a python module
+        self.direct_utils = defaultdict(list)  # type: Dict[str, List[str]]
+        for mod, imports in modules_import.items():
+            for imported in imports:
+                self.direct_modules[imported] |= 1 << module_ids[mod]
+        for util, imports in utils_import.items():
+            for imported in imports:
+                self.direct_utils[imported].append(util)
+        self._closures = {}  # type: Dict[str, int]
+        self._masks = {}  # type: Dict[str, int]
+
+    def clear_closures(self) -> None:
+        """Forget the closures computed so far, e.g. to time their computation again."""
+        self._closures.clear()
+
+    def closure(self, pymodule: str) -> int:
+        """Compute the modules transitively depending on a python module.
+
+        :param pymodule: the python module
+        :returns: a bitset of the modules ids
+        """
+        if pymodule not in self._closures:
+            bitset = 0
+            visited = {pymodule}  # type: Set[str]
+            to_visit = [pymodule]
+            while to_visit:
+                current = to_visit.pop()
+                if current != pymodule and current in self._closures:
+                    bitset |= self._closures[current]
+                    continue
+                bitset |= self.direct_modules.get(current, 0)
+                for importer in self.direct_utils.get(current, []):
+                    if importer not in visited:
+                        visited.add(importer)
+                        to_visit.append(importer)
+            self._closures[pymodule] = bitset
+        return self._closures[pymodule]
+
+    def filtered_closure(self, pymodule: str, is_impacted: Callable[[str, str], bool]) -> int:
+        """Compute the modules depending on a python module through its impacted importers.
+
+        The modules and python modules directly importing the python module are kept when
+        is_impacted(importer, pymodule) is true, the modules depending on a kept python module
+        are then all impacted.
+
+        :param pymodule: the python module
+        :param is_impacted: whether a direct importer is impacted by the change of the python module
+        :returns: a bitset of the modules ids
+        """
+        bitset = 0
+        direct = self.direct_modules.get(pymodule, 0)
+        while direct:
+            lowest = direct & -direct
+            if is_impacted(self.modules[lowest.bit_length() - 1], pymodule):
+                bitset |= lowest
+            direct ^= lowest
+        for importer in self.direct_utils.get(pymodule, []):
+            if is_impacted(importer, pymodule):
+                bitset |= self.closure(importer)
+        return bitset
+
+    def dependencies(self, module: str) -> list[str]:
+        """List the python modules a module depends on, directly or through other python modules.
+
+        :param module: the module
+        :returns: the sorted list of python modules
+        """
+        visited = set()  # type: Set[str]
+        to_visit = list(self.modules_import.get(module, []))
+        while to_visit:
+            current = to_visit.pop()
+            if current not in visited:
+                visited.add(current)
+                to_visit.extend(self.utils_import.get(current, []))
+        return sorted(visited)
+
+    def mask(self, prefix: str) -> int:
+        """Compute the bitset of the modules whose name starts with a prefix.
+
+        :param prefix: the modules name prefix
+        :returns: a bitset of the modules ids
+        """
+        if prefix not in self._masks:
+            self._masks[prefix] = sum(
+                1 << i for i, name in enumerate(self.modules) if name.startswith(prefix)
+            )
+        return self._masks[prefix]
+
+    def impacted_modules(
+        self,
+        pymodules: Iterable[str],
+        prefix: str = "",
+        is_impacted: Optional[Callable[[str, str], bool]] = None,
+    ) -> list[str]:
+        """List the modules transitively depending on any of the python modules.
+
+        :param pymodules: the changed python modules
+        :param prefix: only list the modules whose name starts with this prefix
+        :param is_impacted: whether a direct importer of a changed python module is impacted by
+            the change (see filtered_closure), all the importers are impacted when not set
+        :returns: the sorted list of impacted modules
+        """
+        bitset = 0
+        for pymodule in pymodules:
+            if is_impacted is None:
+                bitset |= self.closure(pymodule)
+            else:
+                bitset |= self.filtered_closure(pymodule, is_impacted)
+        if prefix:
+            bitset &= self.mask(prefix)
+        result = []
+        while bitset:
+            lowest = bitset & -bitset
+            result.append(self.modules[lowest.bit_length() - 1])
+            bitset ^= lowest
+        return result
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Resolve python imports to the files of the collections being tested."""
+
+from collections import defaultdict
+from pathlib import PosixPath
+from typing import Dict
+from typing import Optional
+from typing import Set
+
+
+def pymodule_name(collection_name: str, path: PosixPath) -> str:
+    """Return the python module name of a collection file.
+
+    e.g. plugins/module_utils/_s3/transformations.py is
+    ansible_collections.amazon.aws.plugins.module_utils._s3.transformations and
+    plugins/module_utils/botocore/__init__.py is
+    ansible_collections.amazon.aws.plugins.module_utils.botocore
+
+    :param collection_name: the collection name
+    :param path: path to the file, relative to the collection root
+    :returns: the python module name
+    """
+    parts = list(path.with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join([f"ansible_collections.{collection_name}"] + parts)
+
+
+def pymodule_package(path: PosixPath) -> str:
+    """Return the package of a collection file relative to the plugins directory.
+
+    Relative imports from the file are resolved against this package, e.g. the package of
+    plugins/module_utils/_s3/transformations.py is module_utils._s3.
+
+    :param path: path to the file, relative to the collection root
+    :returns: the python package, relative to the plugins directory
+    """
+    return ".".join(path.parent.parts[1:])
+
+
+class ImportResolver:
+    """Map python imports to the files of the collections being tested.
+
+    An import is resolved to the longest python module name matching a file of the collection,
+    e.g. ansible_collections.amazon.aws.plugins.module_utils.core.AnsibleAWSModule resolves to
+    plugins/module_utils/core.py, and to the `__init__.py` files of its parent packages.
+    """
+
+    def __init__(self, collections_paths: dict[str, PosixPath]) -> None:
+        """Class constructor.
+
+        :param collections_paths: path of the collections, per collection name
+        """
+        self.collections_paths = collections_paths
+        self._files = {}  # type: Dict[str, Dict[str, PosixPath]]
+        # collection imports which could not be resolved, per importer
+        self.unresolved = defaultdict(set)  # type: Dict[str, Set[str]]
+
+    def files(self, collection_name: str) -> dict[str, PosixPath]:
+        """List the python files of a collection.
+
+        :param collection_name: the collection name
+        :returns: the path to the python files, relative to the collection root, per module name
+        """
+        if collection_name not in self._files:
+            root = self.collections_paths[collection_name]
+            self._files[collection_name] = {
+                pymodule_name(collection_name, p.relative_to(root)): p.relative_to(root)
+                for p in root.glob("plugins/**/*.py")
+            }
+        return self._files[collection_name]
+
+    def collection_of(self, name: str) -> Optional[str]:
+        """Return the collection a python name belongs to.
+
+        :param name: the python name
+        :returns: the collection name or None when the name is not from a collection being tested
+        """
+        for collection_name in self.collections_paths:
+            if name.startswith(f"ansible_collections.{collection_name}."):
+                return collection_name
+        return None
+
+    def path(self, pymodule: str) -> PosixPath:
+        """Return the path to the file of a python module.
+
+        :param pymodule: the python module name, as returned by resolve
+        :returns: the path to the file
+        :raises KeyError: when the python module is not a file of the collections
+        """
+        collection_name = self.collection_of(pymodule)
+        if collection_name is None:
+            raise KeyError(pymodule)
+        root = self.collections_paths[collection_name]
+        return root / self.files(collection_name)[pymodule]
+
+    def package(self, pymodule: str) -> str:
+        """Return the package relative imports of a python module are resolved against.
+
+        :param pymodule: the python module name, as returned by resolve
+        :returns: the python package, relative to the plugins directory
+        :raises KeyError: when the python module is not a file of the collections
+        """
+        collection_name = self.collection_of(pymodule)
+        if collection_name is None:
+            raise KeyError(pymodule)
+        return pymodule_package(self.files(collection_name)[pymodule])
+
+    def resolve(self, name: str, importer: str = "") -> Optional[list[str]]:
+        """Resolve an imported python name to the python modules of the collection files.
+
+        :param name: the imported python name (module, package or name from a module)
+        :param importer: the importing file, used to report unresolved imports
+        :returns: the list of python modules, empty when the name is not from a collection being
+            tested, None when the name is from a collection being tested and cannot be resolved
+        """
+        collection_name = self.collection_of(name)
+        if collection_name is None:
+            return []
+        files = self.files(collection_name)
+        parts = name.split(".")
+        for i in range(len(parts), 2, -1):
+            pymodule = ".".join(parts[:i])
+            if pymodule in files:
+                if len(parts) - i > 1:
+                    # only a parent package matches (e.g. `from .missing import name` resolves to
+                    # the package __init__.py), the import is likely broken
+                    self.unresolved[importer].add(name)
+                packages = [".".join(parts[:j]) for j in range(3, i)]
+                return [pymodule] + [p for p in packages if p in files]
+        self.unresolved[importer].add(name)
+        return None
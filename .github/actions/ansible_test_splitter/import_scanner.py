@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Fast scanner listing the import statements of a python file without parsing all of it."""
+
+import ast
+import re
+
+from typing import List
+from typing import Union
+
+
+ImportNode = Union[ast.Import, ast.ImportFrom]
+
+# A single pass over the content, string literals and comments are consumed as a whole so that
+# `import` lines they may contain (e.g. into the EXAMPLES documentation of a module) are ignored.
+# - `stmt` matches an import statement starting a line, including parenthesized or backslash
+#   continuations.
+# - `other` matches the `import` keyword anywhere else (e.g. `if x: import y`) or a quote which
+#   does not start a string literal (e.g. an unterminated string), the content is then considered
+#   ambiguous and parsed with ast.
+# An escaped character, including a backslash-newline, never ends a string literal.
+_SCANNER = re.compile(
+    r"""
+    (?P<skip>
+        \#[^\n]*
+        |[rRbBuUfF]{0,2}
+        (?:
+            \"\"\"[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*\"\"\"
+            |'''[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*'''
+            |"[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*"
+            |'[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*'
+        )
+    )
+    |^[ \t]*(?P<stmt>
+        (?:import|from[ \t]+[\w.]+[ \t]+import)\b
+        [ \t]*(?:\((?:[^)\#]|\#[^\n]*)*\)[^\n]*|(?:[^\n\\]|\\\n)*)
+    )
+    |(?P<other>\bimport\b|["'])
+    """,
+    re.MULTILINE | re.VERBOSE,
+)
+
+
+def walk_imports(content: str) -> list[ImportNode]:
+    """List the import nodes of a python content by walking its whole syntax tree.
+
+    :param content: python content
+    :returns: the list of import nodes
+    """
+    return [
+        node
+        for node in ast.walk(ast.parse(content))
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def scan_imports(content: str) -> list[ImportNode]:
+    """List the import nodes of a python content.
+
+    Only the import statements are parsed, the whole content is parsed with ast when an import
+    cannot be extracted unambiguously.
+
+    :param content: python content
+    :returns: the list of import nodes, in the order they appear into the content
+    """
+    if "import" not in content:
+        return []
+    nodes = []  # type: List[ImportNode]
+    for match in _SCANNER.finditer(content):
+        if match.group("other"):
+            return walk_imports(content)
+        statement = match.group("stmt")
+        if statement is None:
+            continue
+        try:
+            tree = ast.parse(statement.strip())
+        except SyntaxError:
+            return walk_imports(content)
+        for node in tree.body:
+            if not isinstance(node, (ast.Import, ast.ImportFrom)):
+                return walk_imports(content)
+            nodes.append(node)
+    return nodes
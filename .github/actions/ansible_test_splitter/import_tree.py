@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Build the import tree of the modules, the other plugins and the module_utils of a collection."""
+
+import ast
+
+from collections import defaultdict
+from collections.abc import Generator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from import_cache import ImportCache
+from import_resolver import ImportResolver
+from import_resolver import pymodule_package
+from import_scanner import scan_imports
+from phase_timings import PROFILER
+
+
+def list_pyimport(prefix: str, subdir: str, module_content: str) -> Generator[str, None, None]:
+    """List the python names imported by a module content.
+
+    Relative imports are resolved against the package of the module, every name imported from a
+    module is listed (e.g. `from ..module_utils import core, tagging` yields
+    `<prefix>module_utils.core` and `<prefix>module_utils.tagging`), whether it is a module or an
+    attribute of a module is determined by ImportResolver.
+
+    :param prefix: files prefix
+    :param subdir: package of the module relative to the prefix (e.g. modules, module_utils._s3)
+    :param module_content: module content
+    :yields: python imported name
+    """
+    package = f"{prefix}{subdir}".split(".")
+    for node in scan_imports(module_content):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom):
+            base = [node.module] if node.module else []
+            if node.level:
+                if node.level > len(package):
+                    continue
+                base = package[: len(package) - node.level + 1] + base
+            module = ".".join(base)
+            for alias in node.names:
+                yield module if alias.name == "*" else f"{module}.{alias.name}"
+
+
+# Plugin types whose files are mapped to test targets by the import graph (see the plugin
+# directories listed by ansible_validate_changelog), modules and action plugins are tested by the
+# targets of the module, the other plugins by the targets named <plugin type>_<plugin name>
+PLUGIN_TYPES = (
+    "modules",
+    "action",
+    "become",
+    "cache",
+    "callback",
+    "cliconf",
+    "connection",
+    "filter",
+    "httpapi",
+    "inventory",
+    "lookup",
+    "netconf",
+    "shell",
+    "strategy",
+    "terminal",
+    "test",
+    "vars",
+)
+
+# Below this number of files to parse, starting a pool of processes costs more than it saves
+MIN_PARALLEL_FILES = 32
+
+
+def plugin_target_name(plugin_type: str, plugin_name: str) -> str:
+    """Return the name used to look up the test targets of a plugin.
+
+    :param plugin_type: the plugin type (e.g. modules, inventory)
+    :param plugin_name: the plugin name
+    :returns: the target name
+    """
+    if plugin_type in ("modules", "action"):
+        return plugin_name
+    return f"{plugin_type}_{plugin_name}"
+
+
+def list_plugins(import_path: PosixPath) -> list[PosixPath]:
+    """List the modules and the other plugins of a collection mapped to test targets.
+
+    :param import_path: path to the collection
+    :returns: the path to the modules and plugins files
+    """
+    plugins = sorted(p for p in import_path.glob("plugins/modules/*") if p.is_file())
+    for plugin_type in PLUGIN_TYPES[1:]:
+        plugins += sorted(import_path.glob(f"plugins/{plugin_type}/*.py"))
+    return plugins
+
+
+def _extract_pyimport(prefix: str, subdir: str, content: str) -> list[str]:
+    """List the python imports of a file content, used as the process pool worker.
+
+    :param prefix: files prefix
+    :param subdir: sub directory
+    :param content: file content
+    :returns: the list of python module imports, empty when the content is not valid python
+    """
+    try:
+        return list(list_pyimport(prefix, subdir, content))
+    except SyntaxError as err:
+        print(f"Unable to parse python content ({prefix}{subdir}) => {err}")
+        return []
+
+
+class ImportReader:
+    """Read the python imports of the collections files, using the import cache when provided."""
+
+    def __init__(self, cache: Optional[ImportCache] = None, workers: int = 1) -> None:
+        """Class constructor.
+
+        :param cache: the import cache to look the files content up
+        :param workers: maximum number of processes used to parse the files
+        """
+        self.cache = cache
+        self.workers = workers
+
+    def read(self, path: PosixPath, prefix: str, subdir: str) -> list[str]:
+        """Read the python imports of a file.
+
+        :param path: path to the python file
+        :param prefix: files prefix
+        :param subdir: sub directory
+        :returns: the list of python module imports
+        """
+        if self.cache is None:
+            return list(list_pyimport(prefix, subdir, path.read_text()))
+        return self.cache.fetch(
+            path.read_bytes(),
+            f"{prefix}{subdir}",
+            lambda content: list_pyimport(prefix, subdir, content),
+        )
+
+    def extract(
+        self, files: list[tuple[PosixPath, str]], prefix: str
+    ) -> dict[PosixPath, list[str]]:
+        """Extract the python imports of a list of files.
+
+        The files missing from the cache are parsed using a pool of processes when there is enough
+        of them and more than one worker is requested, they are parsed serially otherwise, when the
+        pool cannot be started or, for the remaining files, when a worker dies.
+
+        :param files: list of tuple with the path to the file and its sub directory
+        :param prefix: files prefix
+        :returns: the list of python module imports per file
+        """
+        result = {}  # type: Dict[PosixPath, List[str]]
+        pending = []  # type: List[Tuple[PosixPath, str, bytes]]
+        PROFILER.files_read(len(files))
+        for path, subdir in files:
+            content = path.read_bytes()
+            imports = self.cache.lookup(content, f"{prefix}{subdir}") if self.cache else None
+            if imports is None:
+                pending.append((path, subdir, content))
+            else:
+                result[path] = imports
+
+        subdirs = [subdir for _, subdir, _ in pending]
+        contents = [content.decode() for _, _, content in pending]
+        extracted = self._extract_parallel(prefix, subdirs, contents)
+        done = len(extracted)
+        extracted += [
+            _extract_pyimport(prefix, d, c) for d, c in zip(subdirs[done:], contents[done:])
+        ]
+
+        for (path, subdir, content), imports in zip(pending, extracted):
+            if self.cache:
+                self.cache.store(content, f"{prefix}{subdir}", imports)
+            result[path] = imports
+        return result
+
+    def _extract_parallel(
+        self, prefix: str, subdirs: list[str], contents: list[str]
+    ) -> list[list[str]]:
+        """Extract the python imports of files contents using a pool of processes.
+
+        :param prefix: files prefix
+        :param subdirs: the sub directory of each file
+        :param contents: the content of each file
+        :returns: the list of python module imports of the first files, the ones parsed before
+            the pool broke, none when the pool is not used
+        """
+        extracted = []  # type: List[List[str]]
+        if self.workers <= 1 or len(contents) < MIN_PARALLEL_FILES:
+            return extracted
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for imports in executor.map(
+                    _extract_pyimport,
+                    [prefix] * len(contents),
+                    subdirs,
+                    contents,
+                    chunksize=max(1, len(contents) // (self.workers * 4)),
+                ):
+                    extracted.append(imports)
+        except BrokenProcessPool as err:
+            print(f"The pool of processes broke, parsing the remaining files serially => {err}")
+        except (OSError, NotImplementedError) as err:
+            print(f"Unable to use a pool of {self.workers} processes, parsing serially => {err}")
+        return extracted
+
+
+def _utils_import(
+    utils_to_visit: list[str],
+    extracted: dict[PosixPath, list[str]],
+    reader: ImportReader,
+    resolver: ImportResolver,
+) -> dict[str, list[Any]]:
+    """Walk the python modules imported by the plugins, and the ones they import.
+
+    :param utils_to_visit: the python modules imported by the plugins
+    :param extracted: the python imports of the files already parsed
+    :param reader: the reader of the files not parsed yet
+    :param resolver: the resolver used to map imports to the collections files
+    :returns: the python modules imported by each python module of the collections
+    """
+    utils_import = defaultdict(list)  # type: Dict[str, List[Any]]
+    visited = []
+    while utils_to_visit:
+        utils = utils_to_visit.pop()
+        if utils in visited:
+            continue
+        visited.append(utils)
+        try:
+            utils_path = resolver.path(utils)
+            if utils_path in extracted:
+                utils_imports = extracted[utils_path]
+            else:
+                utils_prefix = f"ansible_collections.{resolver.collection_of(utils)}.plugins."
+                utils_imports = reader.read(utils_path, utils_prefix, resolver.package(utils))
+        except KeyError:
+            # not a file of the collections known from the resolver
+            continue
+        for imported in utils_imports:
+            for i in resolver.resolve(imported, str(utils_path)) or []:
+                if i != utils and i not in utils_import[utils]:
+                    utils_import[utils].append(i)
+                    if i not in visited:
+                        utils_to_visit.append(i)
+    return utils_import
+
+
+def _resolve_imports(
+    path: PosixPath, imports: list[str], resolver: ImportResolver, all_prefixes: list[str]
+) -> Generator[str, None, None]:
+    """Resolve the python imports of a plugin to the python modules of the collections.
+
+    :param path: path to the plugin
+    :param imports: the python names imported by the plugin
+    :param resolver: the resolver used to map imports to the collections files
+    :param all_prefixes: the packages of the collections, the imports from them unknown from the
+        resolver being kept as is
+    :yields: the imported python modules
+    """
+    for imported in imports:
+        resolved = resolver.resolve(imported, str(path))
+        if (
+            resolved is not None
+            and not resolved
+            and any(imported.startswith(p) for p in all_prefixes)
+        ):
+            resolved = [imported]
+        yield from resolved or []
+
+
+def build_import_tree(
+    import_path: PosixPath,
+    module_collection_name: str,
+    all_collections_names: list[str],
+    reader: Optional[ImportReader] = None,
+    resolver: Optional[ImportResolver] = None,
+) -> tuple[dict[str, list[Any]], dict[str, list[Any]]]:
+    """Generate import dependencies for the modules, the other plugins and the module_utils.
+
+    The modules and the other plugins are identified by the name of their test target (see
+    plugin_target_name), e.g. `ec2_instance` or `inventory_aws_ec2`. The imports are resolved to
+    the python module of the collection files they load (see ImportResolver), the imports from a
+    collection listed into all_collections_names but unknown from the resolver are kept as is.
+
+    Let say we have the following input:
+
+        modules: ec2_mod1
+            import a_py_mod
+            import ansible.basic
+        modules: ec2_mod2
+            import another_py_mod
+            import ansible_collections.amazon.aws.plugins.module_utils.core
+        modules: ec2_mod3
+            import ansible_collections.amazon.aws.plugins.module_utils.tagging
+            import ansible_collections.amazon.aws.plugins.module_utils.waiters
+
+        module_utils: waiters
+            import some_py_mod
+            import ansible_collections.amazon.aws.plugins.module_utils.core
+        module_utils: tagging
+            import some_py_tricky_mod
+            import ansible_collections.amazon.aws.plugins.module_utils.core
+        module_utils: core
+            import some_py_fancy_mod
+
+    This will generated the following dicts (list only import part of this collection):
+
+    modules_imports
+        {
+            "ec2_mod1": [],
+            "ec2_mod2": [
+                "ansible_collections.amazon.aws.plugins.module_utils.core",
+            ],
+            "ec2_instance_info": [
+                "ansible_collections.amazon.aws.plugins.module_utils.tagging",
+                "ansible_collections.amazon.aws.plugins.module_utils.waiters"
+            ],
+        }
+
+    utils_import
+        {
+            "ansible_collections.amazon.aws.plugins.module_utils.waiters": [
+                "ansible_collections.amazon.aws.plugins.module_utils.core"
+            ],
+            "ansible_collections.amazon.aws.plugins.module_utils.tagging": [
+                "ansible_collections.amazon.aws.plugins.module_utils.core"
+            ]
+        }
+
+    :param all_collections_names: collections names
+    :param module_collection_name: current collection name
+    :param import_path: the path to import from
+    :param reader: the reader of the files imports, files are parsed serially without cache when
+        not set
+    :param resolver: the resolver used to map imports to the collections files, defaults to a
+        resolver for the current collection only
+    :returns: tuple of modules and utils imports
+    """
+    reader = reader or ImportReader()
+    if resolver is None:
+        resolver = ImportResolver({module_collection_name: import_path})
+    all_prefixes = [f"ansible_collections.{n}.plugins." for n in all_collections_names]
+    plugins = list_plugins(import_path)
+    utils_files = sorted(import_path.glob("plugins/module_utils/**/*.py"))
+    utils_files += sorted(import_path.glob("plugins/plugin_utils/**/*.py"))
+    extracted = reader.extract(
+        [(p, pymodule_package(p.relative_to(import_path))) for p in plugins + utils_files],
+        f"ansible_collections.{module_collection_name}.plugins.",
+    )
+
+    modules_import = defaultdict(list)  # type: Dict[str, List[Any]]
+    for plugin in plugins:
+        name = plugin_target_name(plugin.parent.name, plugin.stem)
+        for i in _resolve_imports(plugin, extracted[plugin], resolver, all_prefixes):
+            if i not in modules_import[name]:
+                modules_import[name].append(i)
+
+    utils_to_visit = list({i: None for imports in modules_import.values() for i in imports})
+    return modules_import, _utils_import(utils_to_visit, extracted, reader, resolver)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Base class of the stores persisted as a versioned JSON file into the cache directory."""
+
+import json
+import time
+
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+
+class JsonStore:
+    """A store kept in a JSON file holding the version of its format.
+
+    The subclasses set the name of the file, the version of the format and the description of the
+    store used in the messages.
+    """
+
+    store_file_name = ""
+    store_version = 1
+    description = "store"
+
+    def __init__(self, cache_dir: Optional[PosixPath] = None) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the store from and save it to, the store is kept in
+            memory only when not set
+        """
+        self.cache_dir = cache_dir
+
+    @property
+    def store_file(self) -> Optional[PosixPath]:
+        """Return the path to the store file.
+
+        :returns: the path to the store file or None when the store is in memory only
+        """
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / self.store_file_name
+
+    def read(self) -> Optional[dict[str, Any]]:
+        """Read the content of the store file.
+
+        :returns: the content, None when the file does not exist, is invalid or has another
+            version
+        """
+        store_file = self.store_file
+        if store_file is None or not store_file.exists():
+            return None
+        try:
+            content = json.loads(store_file.read_text(encoding="utf-8"))
+        except ValueError:
+            print(f"Ignoring invalid {self.description} => {store_file}")
+            return None
+        if not isinstance(content, dict) or content.get("version") != self.store_version:
+            return None
+        return content
+
+    def write(
+        self, content: dict[str, Any], indent: Optional[int] = None, sort_keys: bool = False
+    ) -> None:
+        """Write the store file, the version of the format is added to the content.
+
+        :param content: the JSON serializable content
+        :param indent: the indentation of the JSON document, compact when not set
+        :param sort_keys: whether the keys of the JSON objects are sorted or not
+        """
+        store_file = self.store_file
+        if store_file is None:
+            return
+        store_file.parent.mkdir(parents=True, exist_ok=True)
+        store_file.write_text(
+            json.dumps(
+                {"version": self.store_version, **content}, indent=indent, sort_keys=sort_keys
+            ),
+            encoding="utf-8",
+        )
+
+
+class CollectionsStore(JsonStore):
+    """A store of entries per target name, per collection, the entries being dropped when too old.
+
+    The store is a JSON file as follow:
+
+        {
+            "version": 1,
+            "collections": {"amazon.aws": {"<target name>": <entry>}}
+        }
+
+    The subclasses set the default age of the entries dropped by prune and implement
+    prune_entry.
+    """
+
+    max_age_days = 30
+
+    def __init__(self, cache_dir: Optional[PosixPath] = None) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the store from and save it to, the store is kept in
+            memory only when not set
+        """
+        super().__init__(cache_dir)
+        self.collections = {}  # type: Dict[str, Dict[str, Any]]
+        self.load()
+
+    def load(self) -> None:
+        """Load the store from the cache directory, invalid content is ignored."""
+        content = self.read()
+        if content is not None:
+            self.restore(content)
+
+    def restore(self, content: dict[str, Any]) -> None:
+        """Restore the store from the content of its file.
+
+        :param content: the content of the store file, with the expected version
+        """
+        self.collections = content.get("collections", {})
+
+    def dump(self) -> dict[str, Any]:
+        """Return the content of the store file.
+
+        :returns: the JSON serializable content, without the version
+        """
+        return {"collections": self.collections}
+
+    def save(self) -> None:
+        """Write the store into the cache directory."""
+        self.write(self.dump(), indent=1)
+
+    def prune_entry(self, entry: Any, limit: float) -> Any:
+        """Drop the data of an entry which is too old, return the data to keep or None.
+
+        :param entry: the entry of a target
+        :param limit: the time before which the data is dropped
+        :raises NotImplementedError: the subclasses implement it
+        """
+        raise NotImplementedError
+
+    def prune(self, max_age_days: Optional[int] = None, now: Optional[float] = None) -> None:
+        """Drop the entries which are too old.
+
+        :param max_age_days: the number of days after which an entry is dropped, max_age_days of
+            the class when not set
+        :param now: the current time, defaults to the current time
+        """
+        now = time.time() if now is None else now
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        self.prune_before(now - max_age_days * 86400)
+
+    def prune_before(self, limit: float) -> None:
+        """Drop the entries older than a time.
+
+        :param limit: the time before which an entry is dropped
+        """
+        for name in list(self.collections):
+            targets = {}
+            for target, entry in self.collections[name].items():
+                kept = self.prune_entry(entry, limit)
+                if kept is not None:
+                    targets[target] = kept
+            if targets:
+                self.collections[name] = targets
+            else:
+                del self.collections[name]
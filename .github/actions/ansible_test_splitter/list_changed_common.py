@@ -1,22 +1,49 @@
 #!/usr/bin/env python3
 """Define collection module for list_changed_targets executable."""
 
-import ast
 import json
 import os
 import re
-import subprocess
 
 from collections import defaultdict
 from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Mapping
 from pathlib import PosixPath
 from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Set
 
 import yaml
 
+from change_classifier import UNCLASSIFIED
+from change_classifier import Classified
+from change_classifier import classify_changes
+from durations import DurationStore
+from git_diff import FileChange
+from git_diff import list_changes
+from import_graph import ImportGraph
+from import_resolver import ImportResolver
+from import_resolver import pymodule_name
+from import_resolver import pymodule_package
+from import_tree import ImportReader
+from import_tree import build_import_tree
+from import_tree import list_plugins
+from import_tree import plugin_target_name
+from phase_timings import PROFILER
+from scheduler import Schedule
+from scheduler import Setups
+from scheduler import SlotLimits
+from scheduler import fit_schedule
+from scheduler import schedule_targets
+from scheduler import share_slots
+from semantic_diff import changed_symbols
+from semantic_diff import is_doc_only
+from targets import Target
+from targets import TargetIndex
+
 
 def read_collection_name(collection_path: PosixPath) -> str:
     """Read collection namespace from galaxy.yml.
@@ -29,347 +56,431 @@ def read_collection_name(collection_path: PosixPath) -> str:
         return f'{content["namespace"]}.{content["name"]}'
 
 
-def run_command(command: str, chdir: Optional[PosixPath]) -> str:
-    """Run shell command using subprocess.
+# The buckets of the changed python files which can be documentation only changes
+CODE_BUCKETS = (
+    "modules",
+    "inventory",
+    "connection",
+    "lookup",
+    "module_utils",
+    "plugin_utils",
+    "doc_fragments",
+)
+# The bucket of the changed python files left out of the test plan by WhatHaveChanged.skip_doc_only
+DOC_ONLY = "doc_only"
+
 
-    :param command: command to execute
-    :param chdir: directory to place in before running the command
-    :returns: command output
+class CollectionsImportGraph:
+    """Lazily build the import graph shared by all the collections being tested.
+
+    The modules and plugins are identified by their collection name and target name (e.g.
+    community.aws:ec2_win_password) so that plugins from a collection importing the module_utils
+    of another one (e.g. community.aws modules importing amazon.aws module_utils) are tracked.
     """
-    with subprocess.Popen(
-        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, cwd=chdir
-    ) as proc:
-        out, _ = proc.communicate()
-        return out.decode()
 
+    def __init__(
+        self,
+        collections_paths: list[PosixPath],
+        reader: Optional[ImportReader] = None,
+    ) -> None:
+        """Class constructor.
 
-def list_pyimport(prefix: str, subdir: str, module_content: str) -> Generator[str, None, None]:
-    """Read collection namespace from galaxy.yml.
+        :param collections_paths: path to the collections
+        :param reader: the reader of the files imports used to build the graph, files are parsed
+            serially without cache when not set
+        """
+        self.collections_paths = collections_paths
+        self.reader = reader or ImportReader()
+        self.resolver = None  # type: Optional[ImportResolver]
+        self._graph = None  # type: Optional[ImportGraph]
+        # the files of the modules and plugins, per module of the graph (e.g. amazon.aws:ec2)
+        self.plugin_files = defaultdict(list)  # type: Dict[str, List[PosixPath]]
 
-    :param prefix: files prefix
-    :param subdir: sub directory
-    :param module_content: module content
-    :yields: python module import
-    """
-    root = ast.parse(module_content)
-    for node in ast.walk(root):
-        if isinstance(node, ast.Import):
-            yield node.names[0].name
-        elif isinstance(node, ast.ImportFrom):
-            if node.level == 1:
-                current_prefix = f"{prefix}{subdir}."
-            elif node.level == 2:
-                current_prefix = f"{prefix}"
-            else:
-                current_prefix = ""
-            yield f"{current_prefix}{node.module}"
-
-
-def build_import_tree(
-    import_path: PosixPath, module_collection_name: str, all_collections_names: list[str]
-) -> tuple[dict[str, list[Any]], dict[str, list[Any]]]:
-    """Generate import dependencies for the modules and the module_utils.
-
-    Let say we have the following input:
-
-        modules: ec2_mod1
-            import a_py_mod
-            import ansible.basic
-        modules: ec2_mod2
-            import another_py_mod
-            import ansible_collections.amazon.aws.plugins.module_utils.core
-        modules: ec2_mod3
-            import ansible_collections.amazon.aws.plugins.module_utils.tagging
-            import ansible_collections.amazon.aws.plugins.module_utils.waiters
-
-        module_utils: waiters
-            import some_py_mod
-            import ansible_collections.amazon.aws.plugins.module_utils.core
-        module_utils: tagging
-            import some_py_tricky_mod
-            import ansible_collections.amazon.aws.plugins.module_utils.core
-        module_utils: core
-            import some_py_fancy_mod
-
-    This will generated the following dicts (list only import part of this collection):
-
-    modules_imports
-        {
-            "ec2_mod1": [],
-            "ec2_mod2": [
-                "ansible_collections.amazon.aws.plugins.module_utils.core",
-            ],
-            "ec2_instance_info": [
-                "ansible_collections.amazon.aws.plugins.module_utils.tagging",
-                "ansible_collections.amazon.aws.plugins.module_utils.waiters"
-            ],
-        }
+    @property
+    def graph(self) -> ImportGraph:
+        """Return the import graph, built on first access.
 
-    utils_import
-        {
-            "ansible_collections.amazon.aws.plugins.module_utils.core": [
-                "ansible_collections.amazon.aws.plugins.module_utils.waiters"
-                "ansible_collections.amazon.aws.plugins.module_utils.tagging"
-            ]
+        :returns: the import graph of all the collections
+        """
+        return self.build()
+
+    def build(self) -> ImportGraph:
+        """Build the import graph if it has not been built yet.
+
+        :returns: the import graph of all the collections
+        """
+        if self._graph is None:
+            with PROFILER.phase("import_graph"):
+                paths = {read_collection_name(p): p for p in self.collections_paths}
+                self.resolver = ImportResolver(paths)
+                modules_import = {}  # type: Dict[str, List[str]]
+                utils_import = defaultdict(list)  # type: Dict[str, List[str]]
+                for name, path in paths.items():
+                    for plugin in list_plugins(path):
+                        key = f"{name}:{plugin_target_name(plugin.parent.name, plugin.stem)}"
+                        self.plugin_files[key].append(plugin)
+                    modules, utils = build_import_tree(
+                        path, name, list(paths), self.reader, self.resolver
+                    )
+                    for mod, imports in modules.items():
+                        modules_import[f"{name}:{mod}"] = imports
+                    for util, imports in utils.items():
+                        utils_import[util] += [i for i in imports if i not in utils_import[util]]
+                self._graph = ImportGraph(modules_import, utils_import)
+        return self._graph
+
+    def selecting_files(self, name: str) -> list[PosixPath]:
+        """List the modules, plugins and python modules selecting the targets named after a name.
+
+        A changed module or plugin selects the targets named after it into all the collections
+        being tested (see plugin_target_name), a changed module_utils or plugin_utils the targets
+        named <module_utils|plugin_utils>_<file name>.
+
+        :param name: the target name or alias
+        :returns: the files selecting the targets named after the name
+        """
+        self.build()
+        assert self.resolver is not None
+        files = []
+        for collection_name, path in self.resolver.collections_paths.items():
+            files += self.plugin_files.get(f"{collection_name}:{name}", [])
+            for utils in ("module_utils", "plugin_utils"):
+                if name.startswith(f"{utils}_"):
+                    stem = name[len(utils) + 1 :]
+                    files += sorted(path.glob(f"plugins/{utils}/**/{stem}.py"))
+        return files
+
+    def imported_files(self, module: str) -> list[PosixPath]:
+        """List the files of the python modules a module or a plugin depends on.
+
+        :param module: the module of the graph (e.g. amazon.aws:ec2)
+        :returns: the files of the python modules it imports, directly or not, the python modules
+            which are not a file of the collections being tested being left out
+        """
+        graph = self.build()
+        assert self.resolver is not None
+        files = []
+        for pymodule in graph.dependencies(module):
+            try:
+                files.append(self.resolver.path(pymodule))
+            except KeyError:
+                # not a file of the collections being tested
+                continue
+        return files
+
+    def collection_file(self, key: str) -> Optional[PosixPath]:
+        """Return the path to a file of the collections from its key.
+
+        :param key: the file key, e.g. amazon.aws:plugins/module_utils/ec2.py
+        :returns: the path to the file, None when it is not a file of the collections being tested
+        """
+        self.build()
+        assert self.resolver is not None
+        collection_name, _, path = key.partition(":")
+        if collection_name not in self.resolver.collections_paths:
+            return None
+        file_path = self.resolver.collections_paths[collection_name] / path
+        return file_path if file_path.is_file() else None
+
+    def unresolved_imports(self) -> dict[str, list[str]]:
+        """List the imports from the collections being tested which do not match any file.
+
+        :returns: the sorted list of unresolved imports per importing file
+        """
+        self.build()
+        if self.resolver is None:
+            return {}
+        return {
+            importer: sorted(imports)
+            for importer, imports in sorted(self.resolver.unresolved.items())
         }
 
-    :param all_collections_names: collections names
-    :param module_collection_name: current collection name
-    :param import_path: the path to import from
-    :returns: tuple of modules and utils imports
-    """
-    modules_import = defaultdict(list)  # type: Dict[str, List[Any]]
-    prefix = f"ansible_collections.{module_collection_name}.plugins."
-    all_prefixes = [f"ansible_collections.{n}.plugins." for n in all_collections_names]
-    utils_to_visit = []
-    for mod in import_path.glob("plugins/modules/*"):
-        for i in list_pyimport(prefix, "modules", mod.read_text()):
-            if any(i.startswith(p) for p in all_prefixes) and i not in modules_import[mod.stem]:
-                modules_import[mod.stem].append(i)
-                if i not in utils_to_visit:
-                    utils_to_visit.append(i)
-
-    utils_import = defaultdict(list)  # type: Dict[str, List[Any]]
-    visited = []
-    while utils_to_visit:
-        utils = utils_to_visit.pop()
-        if utils in visited:
-            continue
-        visited.append(utils)
-        try:
-            utils_path = import_path / PosixPath(
-                utils.replace(f"ansible_collections.{module_collection_name}.", "").replace(
-                    ".", "/"
-                )
-                + ".py"
-            )
-            for i in list_pyimport(prefix, "module_utils", utils_path.read_text()):
-                if i.startswith(prefix) and i not in utils_import[utils]:
-                    utils_import[utils].append(i)
-                    if i not in visited:
-                        utils_to_visit.append(i)
-        except Exception:  # pylint: disable=broad-except
-            pass
-    return modules_import, utils_import
+    def imported_symbols(self, importer: str, pymodule: str) -> Optional[set[str]]:
+        """List the names a module, a plugin or a python module imports from a python module.
+
+        :param importer: the importer, a module of the graph (e.g. amazon.aws:ec2) or a python
+            module
+        :param pymodule: the imported python module
+        :returns: the imported names, None when the python module itself is imported (e.g.
+            `import x.y`, `from x import y` or `from x.y import *`)
+        """
+        graph = self.build()
+        assert self.resolver is not None
+        if importer in graph.modules_import:
+            collection_name, _ = importer.split(":", maxsplit=1)
+            files = [(p, collection_name) for p in self.plugin_files[importer]]
+        else:
+            collection_name = self.resolver.collection_of(importer) or ""
+            files = [(self.resolver.path(importer), collection_name)]
+        result = set()  # type: Set[str]
+        for path, collection_name in files:
+            root = self.resolver.collections_paths[collection_name]
+            prefix = f"ansible_collections.{collection_name}.plugins."
+            subdir = pymodule_package(path.relative_to(root))
+            for name in self.reader.read(path, prefix, subdir):
+                resolved = self.resolver.resolve(name, str(path)) or []
+                if pymodule not in resolved:
+                    continue
+                if resolved[0] != pymodule or name == pymodule:
+                    return None
+                result.add(name[len(pymodule) + 1 :].split(".")[0])
+        return result
+
+    def impacted_modules(
+        self,
+        pymodules: list[str],
+        collection_name: str,
+        symbols: Optional[Mapping[str, Optional[set[str]]]] = None,
+    ) -> list[str]:
+        """List the modules and plugins of a collection depending on any of the python modules.
+
+        :param pymodules: the changed python modules
+        :param collection_name: the collection name
+        :param symbols: the top level names impacted by the change, per python module, only the
+            importers of these names are impacted. All the importers of the python modules missing
+            or set to None are impacted.
+        :returns: the list of target names of the impacted modules and plugins
+        """
+        prefix = f"{collection_name}:"
+        symbols_per_module = symbols or {}
+
+        def _is_impacted(importer: str, pymodule: str) -> bool:
+            changed = symbols_per_module.get(pymodule)
+            if changed is None:
+                return True
+            imported = self.imported_symbols(importer, pymodule)
+            return imported is None or bool(imported & changed)
+
+        is_impacted = _is_impacted if symbols else None
+        return [
+            m[len(prefix) :] for m in self.graph.impacted_modules(pymodules, prefix, is_impacted)
+        ]
 
 
 class WhatHaveChanged:
     """A class to store information about changes for a specific collection."""
 
-    def __init__(self, change_path: PosixPath, base_ref: str) -> None:
+    def __init__(
+        self,
+        change_path: PosixPath,
+        base_ref: str,
+        changes: Optional[list[FileChange]] = None,
+        head_ref: str = "",
+    ) -> None:
         """Class constructor.
 
         :param change_path: path to the change
         :param base_ref: pull request base reference
+        :param changes: the changes of the collection, listed using git diff when not set
+        :param head_ref: the git reference of the pull request, the working tree when not set
         """
         assert isinstance(change_path, PosixPath)
         self.collection_path = change_path
         self.base_ref = base_ref
+        self.head_ref = head_ref
         self.collection_name = read_collection_name(change_path)
         self.files = []  # type: List[PosixPath]
+        self._changes = changes
+        self._classified = None  # type: Optional[Dict[str, List[Classified]]]
+
+    def changes(self) -> list[FileChange]:
+        """List the changes of the collection files.
+
+        :returns: the changes, with paths relative to the collection root
+        """
+        if self._changes is None:
+            self._changes = list_changes([self.collection_path], self.base_ref, self.head_ref)[
+                self.collection_path
+            ]
+        return self._changes
 
     def changed_files(self) -> list[PosixPath]:
-        """List of changed files.
+        """List of changed files, including the path of the renamed files before the rename.
 
         :returns: a list of pathlib.PosixPath
         """
         if not self.files:
-            changed_files_cmd = f"git diff origin/{self.base_ref} --name-only"
-            print(f"Command for changed files => {changed_files_cmd}")
-            stdout = run_command(command=changed_files_cmd, chdir=self.collection_path)
-            self.files = [PosixPath(p) for p in stdout.split("\n") if p]
+            self.files = list({p: None for c in self.changes() for p in c.paths()})
         return self.files
 
+    def classified(self) -> dict[str, list[Classified]]:
+        """Bucket the changed files by kind, in a single pass.
+
+        :returns: the changes per bucket (modules, targets, roles, ..., unclassified, doc_only)
+        """
+        if self._classified is None:
+            with PROFILER.phase("classification"):
+                self._classified = classify_changes(self.changed_files())
+            self._classified[DOC_ONLY] = []
+        return self._classified
+
+    def skip_doc_only(self) -> None:
+        """Move the changed python files whose executable code is unchanged to the doc_only bucket.
+
+        The files are left out of the other buckets, hence of the test plan.
+        """
+        classified = self.classified()
+        changes = {c.path: c for c in self.changes()}
+        with PROFILER.phase("semantic_diff"):
+            for bucket in CODE_BUCKETS:
+                kept = []
+                for item in classified[bucket]:
+                    change = changes.get(item[0])
+                    if change and is_doc_only(
+                        self.collection_path, change, self.base_ref, self.head_ref
+                    ):
+                        classified[DOC_ONLY].append(item)
+                    else:
+                        kept.append(item)
+                classified[bucket] = kept
+
+    def doc_only(self) -> list[PosixPath]:
+        """List the changed python files whose executable code is unchanged.
+
+        :returns: the paths of the files left out of the other buckets by skip_doc_only
+        """
+        return [path for path, _ in self.classified()[DOC_ONLY]]
+
     def targets(self) -> Generator[str, None, None]:
         """List the test targets impacted by the change.
 
         :yields: targets impacted by this change
         """
-        for change in self.changed_files():
-            if str(change).startswith("tests/integration/targets/"):
-                # These are a special case, we only care that 'something' changed in that test
-                yield str(change).replace("tests/integration/targets/", "").split("/", maxsplit=1)[
-                    0
-                ]
+        # These are a special case, we only care that 'something' changed in that test
+        for _, name in self.classified()["targets"]:
+            yield name
 
-    def _path_matches(self, base_path: str) -> Generator[PosixPath, None, None]:
+    def _path_matches(self, bucket: str) -> Generator[PosixPath, None, None]:
         """Simplest case, just a file name.
 
-        :param base_path: path of the module
+        :param bucket: the kind of plugin
         :yields: path to a change file
         """
-        for changed_file in self.changed_files():
-            if str(changed_file).startswith(base_path):
-                yield PosixPath(changed_file)
+        for path, _ in self.classified()[bucket]:
+            yield path
 
     def connection(self) -> Generator[PosixPath, None, None]:
         """List the connection plugins impacted by the change.
 
         :yields: path to a connection plugin change
         """
-        yield from self._path_matches("plugins/connection/")
+        yield from self._path_matches("connection")
 
     def inventory(self) -> Generator[PosixPath, None, None]:
         """List the inventory plugins impacted by the change.
 
         :yields: path to an inventory plugin change
         """
-        yield from self._path_matches("plugins/inventory/")
+        yield from self._path_matches("inventory")
 
     def lookup(self) -> Generator[PosixPath, None, None]:
         """List the lookup plugins impacted by the change.
 
         :yields: path to a connection lookup change
         """
-        yield from self._path_matches("plugins/lookup/")
+        yield from self._path_matches("lookup")
 
     def modules(self) -> Generator[PosixPath, None, None]:
         """List the modules impacted by the change.
 
         :yields: path to a module plugin change
         """
-        yield from self._path_matches("plugins/modules/")
+        yield from self._path_matches("modules")
 
     def roles(self) -> Generator[str, None, None]:
         """List the roles impacted by the change.
 
         :yields: path to a role change
         """
-        for changed_file in self.changed_files():
-            if str(changed_file).startswith("roles/"):
-                yield str(changed_file).split("/", maxsplit=2)[1]
+        for _, name in self.classified()["roles"]:
+            yield name
 
-    def _util_matches(
-        self, base_path: str, import_path: str
-    ) -> Generator[tuple[PosixPath, str], None, None]:
+    def _util_matches(self, bucket: str) -> Generator[tuple[PosixPath, str], None, None]:
         """List matching utils files.
 
-        :param base_path: path of the module or plugin util
-        :param import_path: path of the import library
-        :yields: path to a module or plugin utils change
+        :param bucket: the kind of util, module_utils or plugin_utils
+        :yields: path to a module or plugin utils change and its python module name
         """
         # We care about the file, but we also need to find what potential side effects would be for
         # our change
-        base_name = f"ansible_collections.{self.collection_name}.plugins.{import_path}."
-        for util_change in self.changed_files():
-            if str(util_change).startswith(base_path):
-                yield (
-                    PosixPath(util_change),
-                    f"{base_name}{util_change.stem}",
-                )
+        for util_change, _ in self.classified()[bucket]:
+            yield (util_change, pymodule_name(self.collection_name, util_change))
 
     def module_utils(self) -> Generator[tuple[PosixPath, str], None, None]:
         """List the Python modules impacted by the change.
 
         :yields: path to a module util change
         """
-        yield from self._util_matches("plugins/module_utils/", "module_utils")
+        yield from self._util_matches("module_utils")
 
     def plugin_utils(self) -> Generator[tuple[PosixPath, str], None, None]:
         """List the Python modules impacted by the change.
 
         :yields: path to a plugin util change
         """
-        yield from self._util_matches("plugins/plugin_utils/", "plugin_utils")
-
-
-class Target:
-    """A class to store information about a specific target."""
-
-    def __init__(self, target_path: PosixPath) -> None:
-        """Class constructor.
-
-        :param target_path: path to the target
-        """
-        self.name = target_path.stem
-        self.lines = []
-        aliases_path = PosixPath(target_path / "aliases")
-        if aliases_path.exists():
-            self.lines = [
-                line.split("#")[0]
-                for line in aliases_path.read_text(encoding="utf-8").split("\n")
-                if line
-            ]
-        self.exec_time = 0
-
-    def is_alias_of(self, name: str) -> bool:
-        """Test alias target.
-
-        :param name: the name of the source target
-        :returns: whether target is an alias or not
-        """
-        return name in self.lines or self.name == name
+        yield from self._util_matches("plugin_utils")
 
-    def is_unstable(self) -> bool:
-        """Test unstable target.
+    def changed_symbols(self, path: PosixPath) -> Optional[set[str]]:
+        """List the top level names of a changed python file impacted by the change.
 
-        :returns: whether target is unstable or not
+        :param path: the changed file, relative to the collection root
+        :returns: the impacted names, None when the whole file must be considered as changed
         """
-        if "unstable" in self.lines:
-            return True
-        return False
+        for change in self.changes():
+            if change.path == path:
+                return changed_symbols(self.collection_path, change, self.base_ref, self.head_ref)
+        return None
 
-    def is_disabled(self) -> bool:
-        """Test disabled target.
+    def unclassified(self) -> list[PosixPath]:
+        """List the changed files whose impact on the targets is unknown.
 
-        :returns: whether target is disabled or not
+        :returns: the paths matching none of the known prefixes
         """
-        if "disabled" in self.lines:
-            return True
-        return False
-
-    def is_slow(self) -> bool:
-        """Test slow target.
+        classified = self.classified()
+        # a doc fragment is documentation, the impact of changing its code is unknown
+        return [path for path, _ in classified[UNCLASSIFIED] + classified["doc_fragments"]]
 
-        :returns: whether target is slow or not
-        """
-        # NOTE: Should be replaced by time=3000
-        if "slow" in self.lines or "# reason: slow" in self.lines:
-            return True
-        return False
 
-    def is_ignored(self) -> bool:
-        """Show the target be ignored.
+# Default setup cost in seconds paid once per job by the targets sharing a needs/target/<name>
+# dependency, unless the needed target defines a time=<value> alias
+NEEDS_TARGET_SETUP_SECONDS = 60
+# Setup cost in seconds paid once per job by the targets of a cloud/<group> alias
+CLOUD_SETUP_SECONDS = 30
 
-        :returns: whether target is set as ignored or not
-        """
-        ignore = {"unsupported", "disabled", "unstable", "hidden"}
-        return not ignore.isdisjoint(set(self.lines))
-
-    def execution_time(self) -> int:
-        """Retrieve execution time of a target.
-
-        :returns: execution time of the target
-        """
-        if self.exec_time:
-            return self.exec_time
-
-        self.exec_time = 3000 if self.is_slow() else 180
-        for line in self.lines:
-            if match := re.match(r"^time=([0-9]+)s\S*$", line):
-                self.exec_time = int(match.group(1))
-            elif match := re.match(r"^time=([0-9]+)m\S*$", line):
-                self.exec_time = int(match.group(1)) * 60
-            elif match := re.match(r"^time=([0-9]+)\S*$", line):
-                self.exec_time = int(match.group(1))
-
-        return self.exec_time
+# The collection files pinning the dependencies of all the targets
+REQUIREMENTS_FILES = (
+    "galaxy.yml",
+    "meta/runtime.yml",
+    "requirements.txt",
+    "test-requirements.txt",
+    "tests/integration/requirements.txt",
+    "tests/integration/constraints.txt",
+)
 
 
 class Collection:
     """A class storing collection information."""
 
-    def __init__(self, collection_path: PosixPath) -> None:
+    def __init__(
+        self,
+        collection_path: PosixPath,
+        import_graph: Optional[CollectionsImportGraph] = None,
+        target_index: Optional[TargetIndex] = None,
+    ) -> None:
         """Class Constructor.
 
         :param collection_path: path to the collection
+        :param import_graph: import graph shared with the other collections being tested
+        :param target_index: index of the collection targets, e.g. shared between the test plans
+            of several pull requests, built on first access when not set
         """
         self.collection_path = collection_path
         self._my_test_plan = []  # type: List[Target]
         self.collection_name = read_collection_name(collection_path)  # type: str
-        self.modules_import = {}  # type: Dict[str, List[Any]]
-        self.utils_import = {}  # type: Dict[str, List[Any]]
+        self.import_graph = import_graph or CollectionsImportGraph([collection_path])
         self.test_groups = []  # type: List[Dict[str, Any]]
+        self._target_index = target_index
+        self._plan_names = set()  # type: Set[str]
 
     @property
     def test_plan_names(self) -> list[str]:
@@ -387,13 +498,24 @@ class Collection:
         """
         return self._my_test_plan
 
+    @property
+    def target_index(self) -> TargetIndex:
+        """Index the collection targets on first access.
+
+        :returns: the index of the collection targets
+        """
+        if self._target_index is None:
+            self._target_index = TargetIndex(
+                Target(p) for p in self.collection_path.glob("tests/integration/targets/*")
+            )
+        return self._target_index
+
     def targets(self) -> Generator[Target, None, None]:
         """List collection targets.
 
         :yields: a collection target
         """
-        for alias in self.collection_path.glob("tests/integration/targets/*"):
-            yield Target(alias)
+        yield from self.target_index.targets
 
     def is_candidate_target(self, target: Target) -> bool:
         """Return true if the target is not ignored and not already part of the test plan.
@@ -401,9 +523,15 @@ class Collection:
         :param target: target name being checked
         :returns: Whether the target should be added to the test plan.
         """
-        return not target.is_ignored() and not any(
-            target.name == t.name for t in self._my_test_plan
-        )
+        return not target.is_ignored() and target.name not in self._plan_names
+
+    def _append_to_plan(self, target: Target) -> None:
+        """Append a target to the test plan.
+
+        :param target: target being added
+        """
+        self._my_test_plan.append(target)
+        self._plan_names.add(target.name)
 
     def add_target_to_plan(self, target_name: str) -> None:
         """Add specific target to the test plan.
@@ -411,47 +539,127 @@ class Collection:
         :param target_name: target name being added
         """
         # add the integration test target to the plan
-        for t in self.targets():
-            if t.name == target_name:
-                print(f"...target = {target_name} - is_candidate = {self.is_candidate_target(t)}")
-                if self.is_candidate_target(t):
-                    self._my_test_plan.append(t)
-                return
+        t = self.target_index.get(target_name)
+        if t is not None:
+            print(f"...target = {target_name} - is_candidate = {self.is_candidate_target(t)}")
+            if self.is_candidate_target(t):
+                self._append_to_plan(t)
+            return
 
         # Trying to impacted target for modified role, lookup, inventory, modules...
         if target_name.startswith("modules_"):
             target_name = target_name.split("_", maxsplit=1)[1]
         # add all the targets with the exact name matching the target name or having
         # the target name in their aliases
-        for t in self.targets():
-            if t.is_alias_of(target_name) and self.is_candidate_target(t):
-                self._my_test_plan.append(t)
+        for t in self.target_index.aliases_of(target_name):
+            if self.is_candidate_target(t):
+                self._append_to_plan(t)
+
+    def remove_from_plan(self, target_names: list[str]) -> None:
+        """Remove targets from the test plan.
+
+        :param target_names: names of the targets being removed
+        """
+        self._my_test_plan = [t for t in self._my_test_plan if t.name not in target_names]
+        self._plan_names.difference_update(target_names)
+
+    def add_dependents_to_plan(self, target_name: str) -> None:
+        """Add the targets needing a changed target (e.g. a hidden setup target) to the plan.
+
+        :param target_name: name of the changed target
+        """
+        for t in self.target_index.dependents_of(target_name):
+            if self.is_candidate_target(t):
+                self._append_to_plan(t)
 
     def cover_all(self) -> None:
         """Cover all the targets available."""
         for cover_target in self.targets():
             self.add_target_to_plan(cover_target.name)
 
-    def cover_module_utils(self, pymodule: str, names: list[str]) -> None:
-        """Track the targets to run follow up to a module_utils changed.
+    def cover_module_utils(
+        self, pymodules: list[str], symbols: Optional[Mapping[str, Optional[set[str]]]] = None
+    ) -> None:
+        """Track the targets to run follow up to module_utils changes.
 
-        :param pymodule: collection module
-        :param names: collections names
+        :param pymodules: changed collection modules
+        :param symbols: the top level names impacted by the change, per python module, all the
+            importers of a python module are impacted when not set
         """
-        if self.modules_import is None or self.utils_import is None:
-            self.modules_import, self.utils_import = build_import_tree(
-                self.collection_path, self.collection_name, names
-            )
+        for mod in self.import_graph.impacted_modules(pymodules, self.collection_name, symbols):
+            self.add_target_to_plan(mod)
 
-        u_candidates = [pymodule]
-        # add as candidates all module_utils which include this module_utils
-        u_candidates += [
-            import_lib for _, imports in self.utils_import.items() for import_lib in imports
+    def setup_costs(self) -> Setups:
+        """Return the setup cost of the dependencies shared by the targets of the test plan.
+
+        :returns: the setup cost in seconds of each dependency, per target name
+        """
+        result = {}  # type: Setups
+        for target in self._my_test_plan:
+            costs = {}  # type: Dict[str, int]
+            if target.aliases.cloud:
+                costs[f"cloud/{target.aliases.cloud}"] = CLOUD_SETUP_SECONDS
+            for name in target.aliases.needs_targets:
+                needed = self.target_index.get(name)
+                time = needed.aliases.time if needed is not None else None
+                costs[f"needs/target/{name}"] = time or NEEDS_TARGET_SETUP_SECONDS
+            if costs:
+                result[target.name] = costs
+        return result
+
+    def dependency_files(self, target: Target, covered: Iterable[str] = ()) -> list[PosixPath]:
+        """List the files the result of a target depends on.
+
+        The files are the ones whose change selects the target, so that a target left out of the
+        test plan because it already passed with the same files would have been selected by none
+        of their changes.
+
+        :param target: the target
+        :param covered: the keys of the files the coverage index maps to the target
+        :returns: the files of the target, of the targets it needs and of the roles it tests, the
+            modules, plugins and python modules selecting it by name, the python modules they
+            import, directly or not, the files it covers and the collection requirements
+        """
+        targets_dir = self.collection_path / "tests" / "integration" / "targets"
+        directories = []
+        visited = {target.name}
+        to_visit = [target]
+        while to_visit:
+            current = to_visit.pop()
+            directories.append(targets_dir / current.name)
+            directories += [self.collection_path / "roles" / r for r in current.aliases.roles()]
+            for name in current.aliases.needs_targets:
+                needed = self.target_index.get(name)
+                if needed is not None and name not in visited:
+                    visited.add(name)
+                    to_visit.append(needed)
+        files = [p for d in directories for p in sorted(d.rglob("*")) if p.is_file()]
+
+        for name in (target.name,) + target.aliases.others:
+            files += self.import_graph.selecting_files(name)
+            files += self.import_graph.imported_files(f"{self.collection_name}:{name}")
+        for key in covered:
+            covered_file = self.import_graph.collection_file(key)
+            if covered_file is not None:
+                files.append(covered_file)
+        files += [
+            self.collection_path / p
+            for p in REQUIREMENTS_FILES
+            if (self.collection_path / p).is_file()
         ]
+        return list(dict.fromkeys(files))
+
+    def use_learned_durations(self, durations: DurationStore) -> None:
+        """Use the durations learned from previous runs for the targets of the test plan.
 
-        for mod, mod_imports in self.modules_import.items():
-            if any(util in mod_imports for util in u_candidates):
-                self.add_target_to_plan(mod)
+        The learned duration takes precedence over the `time=` alias and the default durations.
+
+        :param durations: the store of the durations learned from previous runs
+        """
+        for target in self._my_test_plan:
+            duration = durations.get(self.collection_name, target.name)
+            if duration is not None:
+                target.exec_time = duration
 
     def slow_targets_to_test(self) -> list[str]:
         """List collection slow targets.
@@ -471,30 +679,74 @@ class Collection:
 class ElGrandeSeparator:
     """A class to build output for the targets to test."""
 
-    def __init__(self, collections_items: list[Collection], number_jobs: int) -> None:
+    def __init__(
+        self,
+        collections_items: list[Collection],
+        number_jobs: int,
+        limits: SlotLimits = SlotLimits(),
+        makespan_budget: Optional[int] = None,
+        shared_jobs: bool = False,
+    ) -> None:
         """Class constructor.
 
         :param collections_items: list of collections being tested
         :param number_jobs: number of jobs to share targets on
+        :param limits: maximum number of targets and predicted duration of a job
+        :param makespan_budget: when set, use the smallest number of jobs (up to number_jobs)
+            whose predicted duration of the longest job fits this budget
+        :param shared_jobs: share number_jobs between all the collections instead of using
+            number_jobs per collection, a job still runs the targets of a single collection
         """
         self.collections = collections_items
         self.total_jobs = number_jobs
-        self.targets_per_slot = 10
+        self.limits = limits
+        self.makespan_budget = makespan_budget
+        self.shared_jobs = shared_jobs
+        self.schedules = {}  # type: Dict[str, Schedule]
 
     def output(self) -> dict[str, str]:
         """Produce output for the targets to test.
 
         :returns: a string describing the output
         """
+        if self.shared_jobs:
+            self.share_jobs()
         batches = []
         for col in self.collections:
-            slots = [f"{col.collection_name}-{i+1}" for i in range(self.total_jobs)]
+            nbslots = len(col.test_groups) if self.shared_jobs else self.total_jobs
+            slots = [f"{col.collection_name}-{i+1}" for i in range(nbslots)]
             for batch in self.build_up_batches(slots, col):
                 batches.append(batch)
         raw_string = ";".join([f"{x}:{','.join(y)}" for x, y in batches])
         raw_json = json.dumps({x: " ".join(y) for x, y in batches})
         jobs = json.dumps([x for x, _ in batches])
-        return {"raw": raw_string, "raw_json": raw_json, "jobs": jobs}
+        stats = json.dumps({name: s.stats() for name, s in self.schedules.items()})
+        return {"raw": raw_string, "raw_json": raw_json, "jobs": jobs, "stats": stats}
+
+    def share_jobs(self) -> None:
+        """Share the jobs between the collections minimizing the longest job duration."""
+        items = {
+            col.collection_name: [
+                (t.name, t.execution_time())
+                for t in sorted(col.test_plan, key=lambda x: x.execution_time(), reverse=True)
+            ]
+            for col in self.collections
+        }
+        self.schedules = share_slots(
+            items,
+            self.total_jobs,
+            self.limits,
+            self.makespan_budget,
+            {col.collection_name: col.setup_costs() for col in self.collections},
+        )
+        for col in self.collections:
+            schedule = self.schedules.get(col.collection_name)
+            col.test_groups = schedule.groups() if schedule else []
+            if schedule and not schedule.feasible:
+                print(
+                    f"Unable to share the targets of {col.collection_name} into"
+                    f" {len(schedule.loads)} jobs within the per job limits => {schedule.stats()}"
+                )
 
     def build_up_batches(
         self, slots: list[str], my_collection: Collection
@@ -509,8 +761,21 @@ class ElGrandeSeparator:
             sorted_targets = sorted(
                 my_collection.test_plan, key=lambda x: x.execution_time(), reverse=True
             )
-            my_collection.test_groups = [{"total": 0, "targets": []} for _ in range(len(slots))]
-            my_collection.test_groups = equal_share(sorted_targets, len(slots))
+            items = [(t.name, t.execution_time()) for t in sorted_targets]
+            setups = my_collection.setup_costs()
+            if self.makespan_budget is None:
+                schedule = schedule_targets(items, len(slots), *self.limits, setups)
+            else:
+                schedule = fit_schedule(
+                    items, self.makespan_budget, len(slots), self.limits, setups
+                )
+            if not schedule.feasible:
+                print(
+                    f"Unable to share the targets of {my_collection.collection_name} into"
+                    f" {len(slots)} jobs within the per job limits => {schedule.stats()}"
+                )
+            self.schedules[my_collection.collection_name] = schedule
+            my_collection.test_groups = schedule.groups()
 
         for group in my_collection.test_groups:
             if group["targets"] == []:
@@ -532,22 +797,22 @@ def make_unique(data: list[str]) -> list[str]:
     return tmp
 
 
-def equal_share(targets: list[Target], nbchunks: int) -> list[dict[str, Any]]:
+def equal_share(
+    targets: list[Target],
+    nbchunks: int,
+    max_targets: Optional[int] = None,
+    max_seconds: Optional[int] = None,
+) -> list[dict[str, Any]]:
     """Split a list of targets into equal size chunks.
 
     :param targets: The list of target to share
     :param nbchunks: The number of chunks to share targets into
+    :param max_targets: The maximum number of targets per chunk
+    :param max_seconds: The maximum total execution time of a chunk
     :returns: A list of dictionary with a set of targets and the total size
     """
-    total_data = [0 for _ in range(nbchunks)]
-    targets_data = [[] for _ in range(nbchunks)]  # type: List[List[str]]
-
-    for my_target in targets:
-        index = total_data.index(min(total_data))
-        total_data[index] += my_target.execution_time()
-        targets_data[index].append(my_target.name)
-
-    return [{"total": total_data[i], "targets": targets_data[i]} for i in range(nbchunks)]
+    items = [(t.name, t.execution_time()) for t in targets]
+    return schedule_targets(items, nbchunks, max_targets, max_seconds).groups()
 
 
 def read_test_all_the_targets() -> bool:
@@ -579,10 +844,18 @@ def read_total_jobs() -> int:
 def read_targets_to_test() -> dict[str, list[str]]:
     """Determine specific targets to test based on TargetsToTest flag into pull request body.
 
+    :returns: list of targets to test per collection
+    """
+    return parse_targets_to_test(os.environ.get("PULL_REQUEST_BODY", ""))
+
+
+def parse_targets_to_test(body: str) -> dict[str, list[str]]:
+    """Parse the TargetsToTest flag of a pull request body.
+
+    :param body: the pull request body
     :returns: list of targets to test per collection
     """
     targets_to_test = {}
-    body = os.environ.get("PULL_REQUEST_BODY", "")
     regex = re.compile(r"^TargetsToTest=([\w\.\:,;]+)", re.MULTILINE | re.IGNORECASE)
     match = regex.search(body)
     if match:
@@ -594,6 +867,19 @@ def read_targets_to_test() -> dict[str, list[str]]:
     return targets_to_test
 
 
+def export_import_graph(import_graph: CollectionsImportGraph, output: PosixPath) -> None:
+    """Write the import graph of the collections as JSON.
+
+    :param import_graph: the import graph of the collections being tested
+    :param output: path to the JSON file to write
+    """
+    graph = {
+        "modules": import_graph.graph.modules_import,
+        "module_utils": import_graph.graph.utils_import,
+    }
+    output.write_text(json.dumps(graph, indent=2, sort_keys=True), encoding="utf-8")
+
+
 def read_collections_to_test() -> list[PosixPath]:
     """Read module parameters from environment variables.
 
@@ -1,22 +1,223 @@
 #!/usr/bin/env python3
 """Script to list target to test for a pull request."""
 
+import cProfile
 import json
 import os
 
+from collections.abc import Generator
+from collections.abc import Iterable
+from contextlib import ExitStack
+from contextlib import contextmanager
 from pathlib import PosixPath
+from typing import Any
 from typing import Dict
 from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
 from typing import Union
 
+from coverage_index import CoverageIndex
+from git_diff import git_revisions
+from git_diff import git_worktree
+from git_diff import list_changes
+from import_tree import ImportReader
 from list_changed_common import Collection
+from list_changed_common import CollectionsImportGraph
 from list_changed_common import ElGrandeSeparator
 from list_changed_common import WhatHaveChanged
+from list_changed_common import export_import_graph
 from list_changed_common import make_unique
+from list_changed_common import parse_targets_to_test
 from list_changed_common import read_collections_to_test
 from list_changed_common import read_targets_to_test
-from list_changed_common import read_test_all_the_targets
-from list_changed_common import read_total_jobs
+from phase_timings import PROFILER
+from plan_cache import plan_key
+from result_cache import ContentHasher
+from semantic_diff import is_layout_change
+from settings import SplitterSettings
+from settings import read_cache_dir
+from settings import read_coverage_results
+from settings import read_splitter_settings
+from settings import read_test_results
+from settings import read_workers
+from splitter_caches import SplitterCaches
+from targets import TargetIndex
+
+
+class PullRequest(NamedTuple):
+    """A pull request to compute the test plan of."""
+
+    # the git reference of the pull request head, e.g. a SHA or refs/pull/123/head
+    ref: str
+    # the pull request body, possibly listing the targets to test
+    body: str = ""
+
+
+class ChangedTargets:
+    """Add the targets impacted by the changes of a pull request to the test plans."""
+
+    def __init__(
+        self, collections: list[Collection], settings: SplitterSettings, coverage: CoverageIndex
+    ) -> None:
+        """Class constructor.
+
+        :param collections: list of collections being tested
+        :param settings: the settings of the test plans
+        :param coverage: the index of the targets covering the collections files
+        """
+        self.collections = collections
+        self.settings = settings
+        self.coverage = coverage
+        # the changes listed per collection and kind
+        self.listed = {}  # type: Dict[str, Dict[str, List[str]]]
+        # the changed module_utils and plugin_utils, and their impacted names
+        self.pymodules = []  # type: List[str]
+        self.symbols = {}  # type: Dict[str, Optional[Set[str]]]
+
+    def add_changed_target(
+        self, name: str, ref_path: Union[PosixPath, str], plugin_type: str
+    ) -> None:
+        """Add the targets named after a changed file to the test plans.
+
+        :param name: the name of the changed collection
+        :param ref_path: the changed file, or the target or role name
+        :param plugin_type: the kind of change (modules, targets, roles, ...)
+        """
+        if plugin_type == "targets":
+            file_name, plugin_file_name = str(ref_path), str(ref_path)
+        elif plugin_type == "roles":
+            file_name = str(ref_path)
+            plugin_file_name = f"role/{ref_path}"
+        else:
+            file_name = PosixPath(ref_path).stem
+            plugin_file_name = f"{plugin_type}_{PosixPath(ref_path).stem}"
+        self.listed[name][plugin_type].append(file_name)
+        for collection in self.collections:
+            collection.add_target_to_plan(plugin_file_name)
+
+    def add_covering_targets(self, name: str, path: PosixPath) -> bool:
+        """Add the targets covering a changed file to the test plans.
+
+        :param name: the name of the changed collection
+        :param path: the changed file, relative to the collection root
+        :returns: whether the targets covering the file are known from the coverage index
+        """
+        if self.settings.target_selection != "coverage":
+            return False
+        covering = self.coverage.covering_targets(f"{name}:{path}")
+        if covering is None:
+            return False
+        self.listed[name]["covered"].append(str(path))
+        for collection in self.collections:
+            for target in covering.get(collection.collection_name, []):
+                collection.add_target_to_plan(target)
+        return True
+
+    def add_plugins(self, name: str, plugin_type: str, paths: Iterable[PosixPath]) -> None:
+        """Add the targets of changed plugins to the test plans.
+
+        :param name: the name of the changed collection
+        :param plugin_type: the plugin type (modules, inventory, connection or lookup)
+        :param paths: the changed plugins files
+        """
+        for path in paths:
+            if not self.add_covering_targets(name, path):
+                self.add_changed_target(name, path, plugin_type)
+
+    def add_utils(self, whc: WhatHaveChanged, plugin_type: str) -> None:
+        """Add the targets of changed module_utils or plugin_utils and record their importers.
+
+        :param whc: the changes of a collection
+        :param plugin_type: module_utils or plugin_utils
+        """
+        utils = whc.module_utils() if plugin_type == "module_utils" else whc.plugin_utils()
+        for path, pymod in utils:
+            if self.add_covering_targets(whc.collection_name, path):
+                continue
+            self.add_changed_target(whc.collection_name, path, plugin_type)
+            self.pymodules.append(pymod)
+            if self.settings.module_utils_impact == "symbol":
+                self.symbols[pymod] = whc.changed_symbols(path)
+
+    def add_targets_and_roles(self, whc: WhatHaveChanged) -> None:
+        """Add the changed targets, the targets depending on them and the changed roles.
+
+        :param whc: the changes of a collection
+        """
+        for target in whc.targets():
+            self.add_changed_target(whc.collection_name, target, "targets")
+            for collection in self.collections:
+                if collection.collection_name == whc.collection_name:
+                    collection.add_dependents_to_plan(target)
+        for role in whc.roles():
+            self.add_changed_target(whc.collection_name, role, "roles")
+
+    def add_unclassified(self, whc: WhatHaveChanged) -> None:
+        """List the changes of unknown impact, testing all the targets when requested.
+
+        :param whc: the changes of a collection
+        """
+        unclassified = whc.unclassified()
+        self.listed[whc.collection_name]["unclassified"] = [str(p) for p in unclassified]
+        if unclassified and self.settings.unclassified_changes == "all":
+            print(f"Unclassified changes for [{whc.collection_name}], testing all the targets")
+            for collection in self.collections:
+                if collection.collection_name == whc.collection_name:
+                    collection.cover_all()
+
+    def add(self, whc: WhatHaveChanged) -> None:
+        """Add the targets impacted by the changes of a collection to the test plans.
+
+        :param whc: the changes of a collection
+        """
+        name = whc.collection_name
+        print(f"changed file for collection [{name}] => {whc.changed_files()}")
+        self.listed[name] = {
+            "modules": [],
+            "inventory": [],
+            "connection": [],
+            "module_utils": [],
+            "plugin_utils": [],
+            "lookup": [],
+            "targets": [],
+            "roles": [],
+            "covered": [],
+        }
+        self.add_plugins(name, "modules", whc.modules())
+        self.add_plugins(name, "inventory", whc.inventory())
+        self.add_plugins(name, "connection", whc.connection())
+        self.add_utils(whc, "module_utils")
+        self.add_utils(whc, "plugin_utils")
+        self.add_plugins(name, "lookup", whc.lookup())
+        self.add_targets_and_roles(whc)
+        self.listed[name]["doc-only"] = [str(p) for p in whc.doc_only()]
+        self.add_unclassified(whc)
+
+    def cover_module_utils(self) -> None:
+        """Add the modules importing the changed module_utils and plugin_utils to the test plans."""
+        if not self.pymodules:
+            return
+        for pymod, symbols in self.symbols.items():
+            impact = "whole file" if symbols is None else ", ".join(sorted(symbols))
+            print(f"Impacted symbols of {pymod} => {impact}")
+        for collection in self.collections:
+            collection.cover_module_utils(self.pymodules, self.symbols)
+
+    def report(self) -> dict[str, list[str]]:
+        """Print the test plans and the listed changes.
+
+        :returns: the changed targets per collection
+        """
+        print("----------- Test plan      -----------")
+        for collection in self.collections:
+            print(
+                collection.collection_name, " -> ", json.dumps(collection.test_plan_names, indent=2)
+            )
+
+        print("----------- Listed Changes -----------\n", json.dumps(self.listed, indent=2))
+        return {x: make_unique(y["targets"]) for x, y in self.listed.items()}
 
 
 class ListChangedTargets:
@@ -25,23 +226,35 @@ class ListChangedTargets:
     def __init__(self) -> None:
         """Class constructor."""
         self.collections_to_test = read_collections_to_test()
-        self.total_jobs = read_total_jobs()
-
-        self.test_all_the_targets = read_test_all_the_targets()
+        self.settings = read_splitter_settings()
         self.targets_to_test = read_targets_to_test()
-        self.base_ref = os.environ.get("PULL_REQUEST_BASE_REF", "")
+        self.caches = SplitterCaches(read_cache_dir(), read_test_results(), read_coverage_results())
+        self.hasher = ContentHasher()
+        self.import_graph = CollectionsImportGraph(
+            self.collections_to_test, ImportReader(self.caches.import_cache, read_workers())
+        )
+        # the targets index of the collections, shared by the test plans
+        self.target_indexes = {}  # type: Dict[PosixPath, TargetIndex]
 
-    def make_change_targets_to_test(self, collections: list[Collection]) -> dict[str, list[str]]:
+    def make_change_targets_to_test(
+        self,
+        collections: list[Collection],
+        targets_to_test: Optional[dict[str, list[str]]] = None,
+    ) -> dict[str, list[str]]:
         """Create change for a specific target to test.
 
         :param collections: list of collections being tested
+        :param targets_to_test: the targets to test per collection, the ones of the pull request
+            body when not set
         :returns: list of target per collection
         """
+        if targets_to_test is None:
+            targets_to_test = self.targets_to_test
         changes = {}
         for collection in collections:
             name = collection.collection_name
-            if name in self.targets_to_test:
-                for target in self.targets_to_test[name]:
+            if name in targets_to_test:
+                for target in targets_to_test[name]:
                     collection.add_target_to_plan(target)
             changes[name] = collection.test_plan_names
 
@@ -60,89 +273,239 @@ class ListChangedTargets:
 
         return changes
 
-    def make_changed_targets(self, collections: list[Collection]) -> dict[str, list[str]]:
+    def make_changed_targets(
+        self, collections: list[Collection], head_ref: str = ""
+    ) -> dict[str, list[str]]:
         """Create change for changed targets.
 
         :param collections: list of collections being tested
+        :param head_ref: the git reference of the pull request, the working tree when not set
         :returns: list of targets per collection
         """
-        listed_changes = {}  # type: Dict[str, Dict[str, List[str]]]
-        collections_names = [collection.collection_name for collection in collections]
-
-        def _add_changed_target(
-            name: str, ref_path: Union[PosixPath, str], plugin_type: str
-        ) -> None:
-            if plugin_type == "targets":
-                file_name, plugin_file_name = str(ref_path), str(ref_path)
-            elif plugin_type == "roles":
-                file_name = str(ref_path)
-                plugin_file_name = f"role/{ref_path}"
-            else:
-                file_name = PosixPath(ref_path).stem
-                plugin_file_name = f"{plugin_type}_{PosixPath(ref_path).stem}"
-            listed_changes[name][plugin_type].append(file_name)
-            for collection in collections:
-                collection.add_target_to_plan(plugin_file_name)
-
-        for whc in [WhatHaveChanged(path, self.base_ref) for path in self.collections_to_test]:
-            print(f"changed file for collection [{whc.collection_name}] => {whc.changed_files()}")
-            listed_changes[whc.collection_name] = {
-                "modules": [],
-                "inventory": [],
-                "connection": [],
-                "module_utils": [],
-                "plugin_utils": [],
-                "lookup": [],
-                "targets": [],
-                "roles": [],
-            }
-            for path in whc.modules():
-                _add_changed_target(whc.collection_name, path, "modules")
-            for path in whc.inventory():
-                _add_changed_target(whc.collection_name, path, "inventory")
-            for path in whc.connection():
-                _add_changed_target(whc.collection_name, path, "connection")
-            for path, pymod in whc.module_utils():
-                _add_changed_target(whc.collection_name, path, "module_utils")
-                for collection in collections:
-                    collection.cover_module_utils(pymod, collections_names)
-            for path, pymod in whc.plugin_utils():
-                _add_changed_target(whc.collection_name, path, "plugin_utils")
-                for collection in collections:
-                    collection.cover_module_utils(pymod, collections_names)
-            for path in whc.lookup():
-                _add_changed_target(whc.collection_name, path, "lookup")
-            for target in whc.targets():
-                _add_changed_target(whc.collection_name, target, "targets")
-            for role in whc.roles():
-                _add_changed_target(whc.collection_name, role, "roles")
+        base_ref = self.settings.base_ref
+        paths = [c.collection_path for c in collections]
+        with PROFILER.phase("diff"):
+            changes = list_changes(paths, base_ref, head_ref)
+        changed = ChangedTargets(collections, self.settings, self.caches.coverage)
+        for path in paths:
+            whc = WhatHaveChanged(path, base_ref, changes[path], head_ref)
+            if self.settings.doc_only_changes == "skip":
+                whc.skip_doc_only()
+            changed.add(whc)
+        changed.cover_module_utils()
+        return changed.report()
 
-        print("----------- Test plan      -----------")
+    def skip_cached_passes(
+        self, collections: list[Collection], keep_passed: bool = False
+    ) -> tuple[dict[str, dict[str, str]], dict[str, list[str]]]:
+        """Remove from the test plans the targets which already passed with the same dependencies.
+
+        The dependencies include the files the coverage index maps to the targets when the
+        targets are selected using the coverage.
+
+        :param collections: list of collections being tested
+        :param keep_passed: only hash the dependencies, the targets which already passed being
+            kept into the test plans, e.g. when they are explicitly requested
+        :returns: the dependencies hash of the targets left to test and the names of the targets
+            removed, per collection
+        """
+        hashes = {}  # type: Dict[str, Dict[str, str]]
+        cached = {}  # type: Dict[str, List[str]]
+        coverage = self.caches.coverage if self.settings.target_selection == "coverage" else None
         for collection in collections:
-            print(
-                collection.collection_name, " -> ", json.dumps(collection.test_plan_names, indent=2)
+            name = collection.collection_name
+            digests = {}
+            for target in collection.test_plan:
+                covered = coverage.covered_files(name, target.name) if coverage else []
+                digests[target.name] = self.hasher.hash(
+                    collection.collection_path, collection.dependency_files(target, covered)
+                )
+            passed = [
+                t
+                for t, digest in digests.items()
+                if not keep_passed and self.caches.results.passed(name, t, digest)
+            ]
+            if passed:
+                print(f"Targets of [{name}] which already passed => {passed}")
+                collection.remove_from_plan(passed)
+                cached[name] = passed
+            hashes[name] = {t: digest for t, digest in digests.items() if t not in passed}
+        return hashes, cached
+
+    def shared_collections(self) -> list[Collection]:
+        """Create the collections sharing the targets index and the import graph of the checkout.
+
+        :returns: the collections being tested
+        """
+        return [
+            Collection(p, self.import_graph, self.target_indexes.get(p))
+            for p in self.collections_to_test
+        ]
+
+    @contextmanager
+    def checkout(self, head_ref: str) -> Generator[list[Collection], None, None]:
+        """Create the collections to compute the test plan of a pull request with.
+
+        The collections share the targets index and the import graph of the checked out
+        collections, unless the pull request changes the plugins, the targets or the imports they
+        are built from (see is_layout_change). The collections it changes are then checked out
+        into temporary git worktrees, and the import graph is built again.
+
+        :param head_ref: the git reference of the pull request
+        :yields: the collections being tested
+        """
+        base_ref = self.settings.base_ref
+        with PROFILER.phase("diff"):
+            changes = list_changes(self.collections_to_test, base_ref, head_ref)
+            changed = [
+                path
+                for path in self.collections_to_test
+                if any(is_layout_change(path, c, base_ref, head_ref) for c in changes[path])
+            ]
+        if not changed:
+            yield self.shared_collections()
+            return
+        print(f"The targets or the imports of {[str(p) for p in changed]} changed, checking out")
+        with ExitStack() as stack:
+            paths = [
+                stack.enter_context(git_worktree(p, head_ref)) if p in changed else p
+                for p in self.collections_to_test
+            ]
+            import_graph = CollectionsImportGraph(paths, self.import_graph.reader)
+            yield [Collection(p, import_graph, self.target_indexes.get(p)) for p in paths]
+
+    def plan(
+        self,
+        head_ref: str = "",
+        targets_to_test: Optional[dict[str, list[str]]] = None,
+        collections: Optional[list[Collection]] = None,
+    ) -> dict[str, str]:
+        """Compute the test plan of a pull request and divide its targets into chunks.
+
+        :param head_ref: the git reference of the pull request, the working tree when not set
+        :param targets_to_test: the targets listed into the pull request body
+        :param collections: the collections being tested, the ones sharing the targets index and
+            the import graph of the checkout when not set
+        :returns: resulting string of targets divide into chunks
+        """
+        if collections is None:
+            collections = self.shared_collections()
+
+        with PROFILER.phase("target_resolution"):
+            if targets_to_test:
+                changes = self.make_change_targets_to_test(collections, targets_to_test)
+            elif self.settings.test_all_the_targets:
+                changes = self.make_change_for_all_targets(collections)
+            else:
+                changes = self.make_changed_targets(collections, head_ref)
+
+        hashes, cached = {}, {}  # type: Dict[str, Dict[str, str]], Dict[str, List[str]]
+        if self.settings.result_cache:
+            # the targets to test or all the targets are tested as requested, even when they passed
+            explicit = bool(targets_to_test) or self.settings.test_all_the_targets
+            with PROFILER.phase("result_cache"):
+                hashes, cached = self.skip_cached_passes(collections, keep_passed=explicit)
+
+        print("----------- Changes -----------\n", json.dumps(changes, indent=2))
+        with PROFILER.phase("packing"):
+            for collection in collections:
+                if collection.collection_path in self.collections_to_test:
+                    self.target_indexes[collection.collection_path] = collection.target_index
+                collection.use_learned_durations(self.caches.durations)
+            egs = ElGrandeSeparator(
+                collections,
+                self.settings.total_jobs,
+                self.settings.limits,
+                self.settings.makespan_budget,
+                self.settings.shared_jobs,
             )
+            result = egs.output()
+        result["hashes"] = json.dumps(hashes)
+        result["cached"] = json.dumps(cached)
+        return result
+
+    def report_import_graph(self) -> None:
+        """Export the import graph and list the unresolved imports when requested."""
+        with PROFILER.phase("import_graph_report"):
+            if self.settings.import_graph_output:
+                export_import_graph(self.import_graph, PosixPath(self.settings.import_graph_output))
+            if self.settings.import_graph_check:
+                unresolved = self.import_graph.unresolved_imports()
+                print(
+                    "----------- Unresolved imports -----------\n",
+                    json.dumps(unresolved, indent=2),
+                )
+
+    def plan_key(self) -> Optional[str]:
+        """Compute the key of the test plan of the checked out pull request.
 
-        print("----------- Listed Changes -----------\n", json.dumps(listed_changes, indent=2))
-        return {x: make_unique(y["targets"]) for x, y in listed_changes.items()}
+        The key covers the base and head commits of the collections, the settings of the plan, the
+        content of the test results and coverage learned from and of the stores, and the code of
+        the splitter.
+
+        :returns: the key, None when a collection checkout has uncommitted changes or its base
+            reference is unknown
+        """
+        revisions = []
+        for path in self.collections_to_test:
+            revision = git_revisions(path, self.settings.base_ref)
+            if revision is None:
+                return None
+            revisions.append([str(path), *revision])
+        inputs = {
+            "revisions": revisions,
+            "settings": self.settings._asdict(),
+            "targets_to_test": self.targets_to_test,
+            "learned": self.caches.learned(self.hasher),
+        }  # type: Dict[str, Any]
+        return plan_key(inputs)
 
     def run(self) -> dict[str, str]:
         """List changes and divide targets into chunk.
 
         :returns: resulting string of targets divide into chunks
         """
-        collections = [Collection(p) for p in self.collections_to_test]
+        key = None
+        if self.settings.plan_cache:
+            with PROFILER.phase("plan_cache"):
+                key = self.plan_key()
+                cached = self.caches.plans.get(key) if key else None
+            if cached is not None:
+                print(f"Using the test plan cached for the key {key}")
+                return cached
+            if key is None:
+                print("Unknown revision of the collections, the test plan is not cached")
+        self.caches.learn()
+        result = self.plan(targets_to_test=self.targets_to_test)
+        self.report_import_graph()
+        if key:
+            # the plan is computed from the stores as updated by learn()
+            key = self.plan_key()
+        if key:
+            self.caches.plans.record(key, result)
+        self.caches.save()
+        return result
 
-        if self.targets_to_test:
-            changes = self.make_change_targets_to_test(collections)
-        elif self.test_all_the_targets:
-            changes = self.make_change_for_all_targets(collections)
-        else:
-            changes = self.make_changed_targets(collections)
+    def run_batch(self, pull_requests: dict[str, PullRequest]) -> dict[str, dict[str, str]]:
+        """Compute the test plans of several pull requests against the same base reference.
 
-        print("----------- Changes -----------\n", json.dumps(changes, indent=2))
-        egs = ElGrandeSeparator(collections, self.total_jobs)
-        return egs.output()
+        The targets index and the import graph of the collections are shared by the plans, see
+        checkout.
+
+        :param pull_requests: the pull requests, per key (e.g. the pull request number)
+        :returns: the resulting targets divided into chunks, per pull request key
+        """
+        self.caches.learn()
+        result = {}
+        for key, pull_request in pull_requests.items():
+            print(f"----------- Pull request {key} ({pull_request.ref}) -----------")
+            with self.checkout(pull_request.ref) as collections:
+                result[key] = self.plan(
+                    pull_request.ref, parse_targets_to_test(pull_request.body), collections
+                )
+        self.report_import_graph()
+        self.caches.save()
+        return result
 
 
 def write_variable_to_github_output(name: str, value: str) -> None:
@@ -159,11 +522,25 @@ def write_variable_to_github_output(name: str, value: str) -> None:
 
 def main() -> None:
     """Perform main process of the module."""
-    result = ListChangedTargets().run()
+    cprofile_output = os.environ.get("SPLITTER_CPROFILE_OUTPUT", "")
+    profile = cProfile.Profile() if cprofile_output else None
+    if profile:
+        profile.enable()
+    try:
+        result = ListChangedTargets().run()
+    finally:
+        if profile:
+            profile.disable()
+            profile.dump_stats(cprofile_output)
+    timings_output = os.environ.get("SPLITTER_TIMINGS_OUTPUT", "")
+    PROFILER.write(PosixPath(timings_output) if timings_output else None)
     print("----------- change targets result -----------\n", json.dumps(result, indent=2))
     write_variable_to_github_output("test_targets", result.get("raw", ""))
     write_variable_to_github_output("test_targets_json", result.get("raw_json", ""))
     write_variable_to_github_output("test_jobs", result.get("jobs", "[]"))
+    write_variable_to_github_output("test_plan_stats", result.get("stats", "{}"))
+    write_variable_to_github_output("test_hashes", result.get("hashes", "{}"))
+    write_variable_to_github_output("test_cached", result.get("cached", "{}"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Record the wall time, calls and files read of the splitter phases."""
+
+import json
+import os
+import time
+
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+class Profiler:
+    """Record the phases of a run.
+
+    The phases can be nested, the time of a phase excludes the time of the phases it contains so
+    that the time of the phases adds up to the time of the run.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        # the seconds, calls and files read, per phase
+        self.phases = {}  # type: Dict[str, Dict[str, Any]]
+        # the phases being run, with the time spent into their nested phases
+        self._stack = []  # type: List[List[Any]]
+
+    def _stats(self, name: str) -> dict[str, Any]:
+        """Return the statistics of a phase.
+
+        :param name: the phase name
+        :returns: the statistics of the phase
+        """
+        return self.phases.setdefault(name, {"seconds": 0.0, "calls": 0, "files_read": 0})
+
+    @contextmanager
+    def phase(self, name: str) -> Generator[None, None, None]:
+        """Record a phase.
+
+        :param name: the phase name
+        :yields: nothing, the phase being the body of the with statement
+        """
+        self._stats(name)["calls"] += 1
+        self._stack.append([name, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _, nested = self._stack.pop()
+            self._stats(name)["seconds"] += elapsed - nested
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    def files_read(self, count: int = 1) -> None:
+        """Record files read by the current phase.
+
+        :param count: the number of files read
+        """
+        name = self._stack[-1][0] if self._stack else "other"
+        self._stats(name)["files_read"] += count
+
+    def report(self) -> dict[str, Any]:
+        """Return the statistics of the phases.
+
+        :returns: the statistics per phase and the total time
+        """
+        return {
+            "phases": self.phases,
+            "total_seconds": sum(p["seconds"] for p in self.phases.values()),
+        }
+
+    def summary(self) -> str:
+        """Render the statistics of the phases as a markdown table.
+
+        :returns: the markdown table
+        """
+        lines = [
+            "### ansible-test splitter timings",
+            "",
+            "| Phase | Seconds | Calls | Files read |",
+            "| --- | ---: | ---: | ---: |",
+        ]
+        for name, stats in self.phases.items():
+            lines.append(
+                f"| {name} | {stats['seconds']:.3f} | {stats['calls']} | {stats['files_read']} |"
+            )
+        lines.append(f"| **total** | {self.report()['total_seconds']:.3f} | | |")
+        return "\n".join(lines) + "\n"
+
+    def write(self, output: Optional[PosixPath]) -> None:
+        """Write the statistics as JSON and append them to the GitHub step summary.
+
+        :param output: path to the JSON file, not written when not set
+        """
+        if output:
+            output.write_text(json.dumps(self.report(), indent=2), encoding="utf-8")
+        step_summary = os.environ.get("GITHUB_STEP_SUMMARY") or ""
+        if step_summary:
+            with open(step_summary, "a", encoding="utf-8") as file_write:
+                file_write.write(self.summary())
+
+
+# The profiler of the current run
+PROFILER = Profiler()
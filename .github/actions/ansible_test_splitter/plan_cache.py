@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Store the test plans computed for identical inputs."""
+
+import hashlib
+import json
+import time
+
+from collections.abc import Iterable
+from pathlib import PosixPath
+from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import cast
+
+from json_store import JsonStore
+from result_cache import ContentHasher
+
+
+STORE_VERSION = 1
+STORE_FILE_NAME = "plan_cache.json"
+
+# The maximum number of plans kept into the store, the oldest ones are dropped
+MAX_PLANS = 100
+
+
+def code_digest() -> str:
+    """Hash the code of the splitter, so that a new version of the code computes new plans.
+
+    :returns: the SHA256 of the splitter python modules, the tests excluded
+    """
+    directory = PosixPath(__file__).parent
+    sources = [p for p in directory.glob("*.py") if not p.name.startswith(("test_", "conftest"))]
+    return ContentHasher().hash(directory, sources)
+
+
+def plan_key(inputs: dict[str, Any]) -> str:
+    """Compute the key of a test plan.
+
+    :param inputs: the JSON serializable inputs the plan depends on
+    :returns: the SHA256 of the inputs and of the splitter code
+    """
+    content = json.dumps(
+        {"version": STORE_VERSION, "code": code_digest(), "inputs": inputs}, sort_keys=True
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def list_files(paths: Iterable[PosixPath]) -> list[PosixPath]:
+    """List the files of paths to files or directories.
+
+    :param paths: path to the files or directories containing them
+    :returns: the sorted files
+    """
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files += [p for p in path.rglob("*") if p.is_file()]
+        elif path.is_file():
+            files.append(path)
+    return sorted(files)
+
+
+class PlanCache(JsonStore):
+    """Keep the test plans per key.
+
+    The store is a JSON file as follow:
+
+        {
+            "version": 1,
+            "plans": {"<sha256>": {"time": 1.7e9, "result": {"raw": "...", ...}}}
+        }
+    """
+
+    store_file_name = STORE_FILE_NAME
+    store_version = STORE_VERSION
+    description = "plan cache"
+
+    def __init__(self, cache_dir: Optional[PosixPath] = None) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the store from and save it to, the store is kept in
+            memory only when not set
+        """
+        super().__init__(cache_dir)
+        self.plans = {}  # type: Dict[str, Dict[str, Any]]
+        self.load()
+
+    def load(self) -> None:
+        """Load the store from the cache directory, invalid content is ignored."""
+        content = self.read()
+        if content is not None:
+            self.plans = content.get("plans", {})
+
+    def save(self) -> None:
+        """Write the store into the cache directory, keeping the most recent plans."""
+        recent = sorted(self.plans.items(), key=lambda x: x[1]["time"])[-MAX_PLANS:]
+        self.write({"plans": dict(recent)})
+
+    def record(self, key: str, result: dict[str, str], now: Optional[float] = None) -> None:
+        """Record the test plan computed for a key.
+
+        :param key: the plan key
+        :param result: the test plan, as returned by ListChangedTargets.run
+        :param now: the time of the run, defaults to the current time
+        """
+        self.plans[key] = {"time": time.time() if now is None else now, "result": result}
+
+    def get(self, key: str) -> Optional[dict[str, str]]:
+        """Return the test plan recorded for a key.
+
+        :param key: the plan key
+        :returns: the test plan, None when no valid plan is recorded for the key
+        """
+        result = self.plans.get(key, {}).get("result")
+        if not isinstance(result, dict) or not all(isinstance(v, str) for v in result.values()):
+            return None
+        return cast(Dict[str, str], result)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Store the targets which passed, keyed by the content hash of their dependencies."""
+
+import hashlib
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from argparse import ArgumentParser
+from collections.abc import Iterable
+from pathlib import PosixPath
+from typing import Dict
+from typing import Optional
+from typing import Set
+
+from durations import read_ansible_test_data
+from import_cache import git_blob_sha
+from json_store import CollectionsStore
+
+
+STORE_VERSION = 1
+STORE_FILE_NAME = "results.json"
+# The file written next to the test results, holding the dependencies hash of the targets per
+# collection when they ran (the test_hashes output of the splitter)
+HASHES_FILE_NAME = "target_hashes.json"
+
+# Passed results older than this number of days are dropped from the store
+MAX_AGE_DAYS = 30
+# The maximum number of passed hashes kept per target
+MAX_HASHES = 5
+
+
+class ContentHasher:
+    """Hash the content of sets of files, each file being read once."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.digests = {}  # type: Dict[PosixPath, str]
+
+    def digest(self, path: PosixPath) -> str:
+        """Return the git blob SHA of a file.
+
+        :param path: path to the file
+        :returns: the blob SHA of the file content
+        """
+        if path not in self.digests:
+            self.digests[path] = git_blob_sha(path.read_bytes())
+        return self.digests[path]
+
+    def hash(self, root: PosixPath, paths: Iterable[PosixPath]) -> str:
+        """Hash the names and content of files.
+
+        :param root: the files names are relative to this directory
+        :param paths: path to the files
+        :returns: the SHA256 of the files
+        """
+        sha = hashlib.sha256()
+        for path in sorted(set(paths)):
+            sha.update(f"{os.path.relpath(path, root)}\0{self.digest(path)}\n".encode())
+        return sha.hexdigest()
+
+
+def read_junit_passed(path: PosixPath) -> set[str]:
+    """Read the targets which passed from a JUnit XML file.
+
+    Each test suite is expected to be named after the target it ran.
+
+    :param path: path to the JUnit file
+    :returns: the names of the targets without failure or error
+    """
+    passed = set()  # type: Set[str]
+    failed = set()  # type: Set[str]
+    for suite in ET.parse(path).getroot().iter("testsuite"):
+        name = suite.get("name")
+        if not name:
+            continue
+        errors = int(suite.get("failures") or 0) + int(suite.get("errors") or 0)
+        if errors or suite.find(".//failure") is not None or suite.find(".//error") is not None:
+            failed.add(name)
+        else:
+            passed.add(name)
+    return passed - failed
+
+
+def read_passed_hashes(paths: Iterable[PosixPath], collection_name: str) -> dict[str, str]:
+    """Read the dependencies hash of the targets which passed.
+
+    The targets listed into the ansible-test data files or into the JUnit files without failure
+    passed, their hash is read from the target_hashes.json file written with the results.
+
+    :param paths: path to the test results, files or directories containing them
+    :param collection_name: the collection name
+    :returns: the dependencies hash per target which passed
+    """
+    result = {}  # type: Dict[str, str]
+    for path in paths:
+        files = sorted(path.glob("**/*")) if path.is_dir() else [path]
+        hashes = {}  # type: Dict[str, str]
+        passed = set()  # type: Set[str]
+        for file in files:
+            try:
+                if file.name == HASHES_FILE_NAME:
+                    content = json.loads(file.read_text(encoding="utf-8"))
+                    hashes.update(content.get(collection_name, {}))
+                elif file.suffix == ".json":
+                    passed.update(read_ansible_test_data(file))
+                elif file.suffix == ".xml":
+                    passed.update(read_junit_passed(file))
+            except (ValueError, KeyError, TypeError, AttributeError, ET.ParseError) as err:
+                print(f"Ignoring invalid test results file {file} => {err}")
+        result.update({name: hashes[name] for name in sorted(passed) if name in hashes})
+    return result
+
+
+class ResultCache(CollectionsStore):
+    """Keep the dependencies hash of the targets which passed, per collection.
+
+    The store is a JSON file as follow:
+
+        {
+            "version": 1,
+            "collections": {
+                "amazon.aws": {"ec2_instance_basic": {"<sha256>": 1.7e9}}
+            }
+        }
+    """
+
+    store_file_name = STORE_FILE_NAME
+    store_version = STORE_VERSION
+    description = "results store"
+    max_age_days = MAX_AGE_DAYS
+
+    def record(
+        self, collection_name: str, hashes: dict[str, str], now: Optional[float] = None
+    ) -> None:
+        """Record the targets which passed.
+
+        :param collection_name: the collection name
+        :param hashes: the dependencies hash per target which passed
+        :param now: the time of the run, defaults to the current time
+        """
+        now = time.time() if now is None else now
+        targets = self.collections.setdefault(collection_name, {})
+        for name, digest in hashes.items():
+            passed = targets.setdefault(name, {})
+            passed[digest] = now
+            if len(passed) > MAX_HASHES:
+                targets[name] = dict(sorted(passed.items(), key=lambda x: x[1])[-MAX_HASHES:])
+
+    def prune_entry(self, entry: dict[str, float], limit: float) -> Optional[dict[str, float]]:
+        """Drop the passed results of a target which are too old.
+
+        :param entry: the time each dependencies hash of the target passed
+        :param limit: the time before which a passed result is dropped
+        :returns: the recent passed results, None when there is none
+        """
+        return {k: v for k, v in entry.items() if v >= limit} or None
+
+    def passed(self, collection_name: str, target_name: str, digest: str) -> bool:
+        """Test if a target already passed with the same dependencies.
+
+        :param collection_name: the collection name
+        :param target_name: the target name
+        :param digest: the dependencies hash of the target
+        :returns: whether a passed result is recorded for this hash or not
+        """
+        return digest in self.collections.get(collection_name, {}).get(target_name, {})
+
+
+def main() -> None:
+    """Record the targets which passed from test results into the store."""
+    parser = ArgumentParser(description="Record the integration test targets which passed.")
+    parser.add_argument("--collection", required=True, help="The collection name.")
+    parser.add_argument("--cache-dir", required=True, type=PosixPath, help="The store directory.")
+    parser.add_argument(
+        "results",
+        nargs="+",
+        type=PosixPath,
+        help=f"Test results files/directories, including the {HASHES_FILE_NAME} file.",
+    )
+    args = parser.parse_args()
+
+    store = ResultCache(args.cache_dir)
+    hashes = read_passed_hashes(args.results, args.collection)
+    print(f"Recording {len(hashes)} targets which passed for {args.collection}")
+    store.record(args.collection, hashes)
+    store.prune()
+    store.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Share test targets into slots minimizing the time of the longest slot (makespan)."""
+
+from collections import Counter
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+# Maximum number of improvements tried by the local search
+MAX_REFINE_ITERATIONS = 1000
+
+# The setup cost in seconds of each dependency of a target, per target name
+Setups = Dict[str, Dict[str, int]]
+
+
+class SlotLimits(NamedTuple):
+    """The limits of each slot, a limit is not enforced when not set."""
+
+    # The maximum number of targets per slot
+    max_targets: Optional[int] = None
+    # The maximum duration of a slot
+    max_seconds: Optional[int] = None
+
+
+class Schedule:
+    """The assignment of targets to slots.
+
+    A slot pays the setup cost of a dependency once, whatever the number of its targets sharing
+    it, the duration of a slot is the duration of its targets plus the setup cost of their
+    distinct dependencies.
+    """
+
+    def __init__(self, nbchunks: int, setups: Optional[Setups] = None) -> None:
+        """Class constructor.
+
+        :param nbchunks: The number of slots
+        :param setups: The setup cost of each dependency of the targets
+        """
+        self.loads = [0 for _ in range(nbchunks)]
+        self.items = [[] for _ in range(nbchunks)]  # type: List[List[Tuple[str, int]]]
+        self.setups = setups or {}
+        # number of targets of each slot needing a dependency
+        self.counts = [Counter() for _ in range(nbchunks)]  # type: List[Counter[str]]
+        # whether the max targets/seconds per slot constraints are satisfied
+        self.feasible = True
+
+    def add_cost(
+        self, index: int, item: tuple[str, int], removed: Optional[tuple[str, int]] = None
+    ) -> int:
+        """Compute the duration added to a slot by a target.
+
+        :param index: The slot index
+        :param item: The target name and duration
+        :param removed: A target of the slot to leave out, when computing a swap
+        :returns: the duration of the target and of the dependencies not set up by the slot yet
+        """
+        removed_setups = self.setups.get(removed[0], {}) if removed else {}
+        counts = self.counts[index]
+        return item[1] + sum(
+            cost
+            for key, cost in self.setups.get(item[0], {}).items()
+            if counts[key] - (key in removed_setups) == 0
+        )
+
+    def remove_cost(self, index: int, item: tuple[str, int]) -> int:
+        """Compute the duration removed from a slot by a target.
+
+        :param index: The slot index
+        :param item: The target name and duration
+        :returns: the duration of the target and of the dependencies only this target needs
+        """
+        counts = self.counts[index]
+        return item[1] + sum(
+            cost for key, cost in self.setups.get(item[0], {}).items() if counts[key] == 1
+        )
+
+    def add(self, index: int, item: tuple[str, int], position: Optional[int] = None) -> None:
+        """Add a target to a slot.
+
+        :param index: The slot index
+        :param item: The target name and duration
+        :param position: The position of the target into the slot, appended when not set
+        """
+        self.loads[index] += self.add_cost(index, item)
+        if position is None:
+            self.items[index].append(item)
+        else:
+            self.items[index].insert(position, item)
+        self.counts[index].update(self.setups.get(item[0], {}).keys())
+
+    def remove(self, index: int, position: int) -> tuple[str, int]:
+        """Remove a target from a slot.
+
+        :param index: The slot index
+        :param position: The position of the target into the slot
+        :returns: the target name and duration
+        """
+        item = self.items[index][position]
+        self.loads[index] -= self.remove_cost(index, item)
+        del self.items[index][position]
+        self.counts[index].subtract(self.setups.get(item[0], {}).keys())
+        return item
+
+    @property
+    def makespan(self) -> int:
+        """Return the predicted duration of the longest slot.
+
+        :returns: the makespan in seconds
+        """
+        return max(self.loads, default=0)
+
+    @property
+    def imbalance(self) -> float:
+        """Return how much the longest slot exceeds the average slot duration.
+
+        :returns: the relative imbalance, 0.0 for a perfectly balanced schedule
+        """
+        total = sum(self.loads)
+        if not total:
+            return 0.0
+        return self.makespan * len(self.loads) / total - 1
+
+    def groups(self) -> list[dict[str, Any]]:
+        """Return the schedule in the format used by the splitter.
+
+        :returns: A list of dictionary with a set of targets and the total size
+        """
+        return [
+            {"total": load, "targets": [name for name, _ in items]}
+            for load, items in zip(self.loads, self.items)
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        """Return the predicted makespan and imbalance of the schedule.
+
+        :returns: the schedule statistics
+        """
+        return {
+            "makespan": self.makespan,
+            "imbalance": round(self.imbalance, 3),
+            "feasible": self.feasible,
+            "slots": self.loads,
+        }
+
+
+def _fits(count: int, load: int, max_targets: Optional[int], max_seconds: Optional[int]) -> bool:
+    """Test whether a slot satisfies the constraints.
+
+    :param count: The number of targets of the slot
+    :param load: The duration of the slot
+    :param max_targets: The maximum number of targets per slot
+    :param max_seconds: The maximum duration of a slot
+    :returns: whether the constraints are satisfied
+    """
+    return (max_targets is None or count <= max_targets) and (
+        max_seconds is None or load <= max_seconds
+    )
+
+
+def lpt(
+    items: list[tuple[str, int]],
+    nbchunks: int,
+    max_targets: Optional[int] = None,
+    max_seconds: Optional[int] = None,
+    setups: Optional[Setups] = None,
+) -> Schedule:
+    """Assign the longest targets first, each to the slot where it ends the earliest.
+
+    Without setup costs, this is the least loaded slot. A slot is skipped once it holds
+    max_targets targets, when every slot is full or a target exceeds max_seconds the target
+    still goes to the least loaded slot and the schedule is flagged as infeasible.
+
+    :param items: The targets name and duration
+    :param nbchunks: The number of slots
+    :param max_targets: The maximum number of targets per slot
+    :param max_seconds: The maximum duration of a slot
+    :param setups: The setup cost of each dependency of the targets
+    :returns: the schedule
+    """
+    schedule = Schedule(nbchunks, setups)
+
+    def _size(item: tuple[str, int]) -> int:
+        return item[1] + sum(schedule.setups.get(item[0], {}).values())
+
+    for item in sorted(items, key=_size, reverse=True):
+        candidates = [
+            (schedule.loads[i] + schedule.add_cost(i, item), i)
+            for i in range(nbchunks)
+            if max_targets is None or len(schedule.items[i]) < max_targets
+        ]
+        if candidates:
+            index = min(candidates)[1]
+        else:
+            # every slot is full
+            schedule.feasible = False
+            index = schedule.loads.index(min(schedule.loads))
+        schedule.add(index, item)
+        if max_seconds is not None and schedule.loads[index] > max_seconds:
+            schedule.feasible = False
+    return schedule
+
+
+class _Move(NamedTuple):
+    """A move of a target of the longest slot to another slot, or its swap with another target."""
+
+    # the makespan after the move
+    peak: int
+    # the index of the other slot, -1 when no move reduces the makespan
+    other: int = -1
+    # the index of the target into the longest slot
+    position: int = -1
+    # the index of the target of the other slot it is swapped with, None for a move
+    swap: Optional[int] = None
+
+
+def refine(
+    schedule: Schedule,
+    max_targets: Optional[int] = None,
+    max_seconds: Optional[int] = None,
+) -> Schedule:
+    """Reduce the makespan of a schedule by moving or swapping targets of the longest slot.
+
+    :param schedule: The schedule to improve
+    :param max_targets: The maximum number of targets per slot
+    :param max_seconds: The maximum duration of a slot
+    :returns: the improved schedule
+    """
+    for _ in range(MAX_REFINE_ITERATIONS if len(schedule.loads) > 1 else 0):
+        longest = schedule.loads.index(schedule.makespan)
+        peak = schedule.loads[longest]
+        best = _Move(peak)
+        for other, load in enumerate(schedule.loads):
+            if other == longest:
+                continue
+            for i, item in enumerate(schedule.items[longest]):
+                # move the target to the other slot
+                remaining = peak - schedule.remove_cost(longest, item)
+                added = load + schedule.add_cost(other, item)
+                new_peak = max(remaining, added)
+                if new_peak < best.peak and _fits(
+                    len(schedule.items[other]) + 1, added, max_targets, None
+                ):
+                    best = _Move(new_peak, other, i)
+                # swap the target with another one of the other slot, a shorter one unless
+                # the swap saves setup costs
+                for j, other_item in enumerate(schedule.items[other]):
+                    if other_item[1] >= item[1] and not schedule.setups:
+                        continue
+                    new_peak = max(
+                        remaining + schedule.add_cost(longest, other_item, item),
+                        load
+                        - schedule.remove_cost(other, other_item)
+                        + schedule.add_cost(other, item, other_item),
+                    )
+                    if new_peak < best.peak:
+                        best = _Move(new_peak, other, i, j)
+        if best.other < 0:
+            break
+        item = schedule.remove(longest, best.position)
+        if best.swap is None:
+            schedule.add(best.other, item)
+        else:
+            other_item = schedule.remove(best.other, best.swap)
+            schedule.add(longest, other_item, best.position)
+            schedule.add(best.other, item, best.swap)
+    schedule.feasible = all(
+        _fits(len(items), load, max_targets, max_seconds)
+        for items, load in zip(schedule.items, schedule.loads)
+    )
+    return schedule
+
+
+def schedule_targets(
+    items: list[tuple[str, int]],
+    nbchunks: int,
+    max_targets: Optional[int] = None,
+    max_seconds: Optional[int] = None,
+    setups: Optional[Setups] = None,
+) -> Schedule:
+    """Share targets into slots, longest processing time first then improved by local search.
+
+    :param items: The targets name and duration
+    :param nbchunks: The number of slots
+    :param max_targets: The maximum number of targets per slot
+    :param max_seconds: The maximum duration of a slot
+    :param setups: The setup cost of each dependency of the targets
+    :returns: the schedule
+    """
+    return refine(lpt(items, nbchunks, max_targets, max_seconds, setups), max_targets, max_seconds)
+
+
+def fit_schedule(
+    items: list[tuple[str, int]],
+    makespan_budget: int,
+    max_chunks: int,
+    limits: SlotLimits = SlotLimits(),
+    setups: Optional[Setups] = None,
+) -> Schedule:
+    """Share targets into the smallest number of slots whose makespan fits a budget.
+
+    :param items: The targets name and duration
+    :param makespan_budget: The maximum predicted duration of the longest slot
+    :param max_chunks: The maximum number of slots
+    :param limits: The limits of each slot
+    :param setups: The setup cost of each dependency of the targets
+    :returns: the schedule, using max_chunks slots when the budget cannot be met
+    """
+    max_targets, max_seconds = limits
+    max_chunks = max(1, max_chunks)
+    # no schedule with less slots than the total duration over the budget can fit
+    lower_bound = -(-sum(d for _, d in items) // max(1, makespan_budget))
+    if max_targets is not None:
+        lower_bound = max(lower_bound, -(-len(items) // max_targets))
+    for nbchunks in range(max(1, lower_bound), max_chunks):
+        schedule = schedule_targets(items, nbchunks, max_targets, max_seconds, setups)
+        if schedule.feasible and schedule.makespan <= makespan_budget:
+            return schedule
+    return schedule_targets(items, max_chunks, max_targets, max_seconds, setups)
+
+
+def share_slots(
+    items: dict[str, list[tuple[str, int]]],
+    nbslots: int,
+    limits: SlotLimits = SlotLimits(),
+    makespan_budget: Optional[int] = None,
+    setups: Optional[dict[str, Setups]] = None,
+) -> dict[str, Schedule]:
+    """Share a pool of slots between groups of targets which cannot be mixed in a slot.
+
+    Each group with targets starts with one slot, the next slot goes to the group with the
+    longest makespan, until the pool is empty, the makespan budget is met or the longest group
+    cannot be improved.
+
+    :param items: The targets name and duration, per group (e.g. per collection)
+    :param nbslots: The number of slots of the pool
+    :param limits: The limits of each slot
+    :param makespan_budget: Stop adding slots once every group fits this makespan
+    :param setups: The setup cost of each dependency of the targets, per group
+    :returns: the schedule per group
+    """
+    max_targets, max_seconds = limits
+    setups = setups or {}
+    schedules = {
+        name: schedule_targets(group, 1, max_targets, max_seconds, setups.get(name))
+        for name, group in items.items()
+        if group
+    }
+    used = len(schedules)
+    while used < nbslots and schedules:
+        longest = max(schedules, key=lambda n: (not schedules[n].feasible, schedules[n].makespan))
+        current = schedules[longest]
+        if makespan_budget is not None and current.feasible and current.makespan <= makespan_budget:
+            break
+        schedule = schedule_targets(
+            items[longest], len(current.loads) + 1, max_targets, max_seconds, setups.get(longest)
+        )
+        if current.feasible and schedule.makespan >= current.makespan:
+            break
+        schedules[longest] = schedule
+        used += 1
+    return schedules
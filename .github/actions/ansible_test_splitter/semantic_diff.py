@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Compare the base and head versions of the changed python files, ignoring documentation."""
+
+import ast
+import os
+import subprocess
+
+from pathlib import PosixPath
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+from git_diff import FileChange
+from import_scanner import scan_imports
+
+
+# The module variables holding the plugins documentation
+DOC_VARIABLES = ("DOCUMENTATION", "EXAMPLES", "RETURN")
+# The class holding the documentation of a doc fragment, as string attributes
+DOC_FRAGMENT_CLASS = "ModuleDocFragment"
+# The directories the targets index and the import graph of a collection are built from
+PLUGINS_DIR = PosixPath("plugins")
+# The directory of the modules, the only plugins whose documentation is not read at runtime: the
+# inventory, connection, lookup, ... plugins read their options from DOCUMENTATION and the doc
+# fragments it extends
+MODULES_DIR = PLUGINS_DIR / "modules"
+TARGETS_DIR = PosixPath("tests/integration/targets")
+
+
+def _is_string(node: Optional[ast.AST]) -> bool:
+    """Return true if the node is a string literal.
+
+    :param node: the AST node
+    :returns: whether the node is a string constant
+    """
+    return isinstance(node, ast.Constant) and isinstance(node.value, str)
+
+
+class _DocStripper(ast.NodeTransformer):
+    """Remove the documentation from a python AST."""
+
+    def __init__(self, plugin_doc: bool = False) -> None:
+        """Class constructor.
+
+        :param plugin_doc: whether to also remove the plugin documentation (DOC_VARIABLES and the
+            attributes of a doc fragment class), the docstrings only are removed otherwise
+        """
+        self.plugin_doc = plugin_doc
+        self.in_doc_fragment = False
+
+    def visit_Expr(self, node: ast.Expr) -> Optional[ast.AST]:  # pylint: disable=invalid-name
+        """Drop the string statements, e.g. docstrings.
+
+        :param node: the expression statement
+        :returns: the node, or None to drop it
+        """
+        return None if _is_string(node.value) else self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign) -> Optional[ast.AST]:  # pylint: disable=invalid-name
+        """Drop the assignments of the documentation strings.
+
+        :param node: the assignment
+        :returns: the node, or None to drop it
+        """
+        if self.plugin_doc and _is_string(node.value):
+            if self.in_doc_fragment:
+                return None
+            names = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            if names and all(n in DOC_VARIABLES for n in names):
+                return None
+        return self.generic_visit(node)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:  # pylint: disable=invalid-name
+        """Visit a class, the attributes of a doc fragment class being documentation.
+
+        :param node: the class definition
+        :returns: the node
+        """
+        in_doc_fragment = self.in_doc_fragment
+        self.in_doc_fragment = node.name == DOC_FRAGMENT_CLASS
+        self.generic_visit(node)
+        self.in_doc_fragment = in_doc_fragment
+        return node
+
+
+def normalized_code(source: bytes, plugin_doc: bool = False) -> Optional[str]:
+    """Dump the AST of a python file without its documentation, comments and formatting.
+
+    :param source: the python file content
+    :param plugin_doc: whether the plugin documentation is ignored too (see _DocStripper), it is
+        only for the modules
+    :returns: the normalized AST, None when the file cannot be parsed
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    return ast.dump(_DocStripper(plugin_doc).visit(tree), include_attributes=False)
+
+
+def _defined_names(node: ast.stmt) -> list[str]:
+    """List the names a top level statement defines.
+
+    :param node: the statement
+    :returns: the names of a function, a class or a simple assignment, empty for other statements
+    """
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return [node.name]
+    if isinstance(node, ast.Assign) and all(isinstance(t, ast.Name) for t in node.targets):
+        return [t.id for t in node.targets if isinstance(t, ast.Name)]
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return [node.target.id]
+    return []
+
+
+class TopLevelSymbols:
+    """The top level definitions of a python file, used to diff it at symbol granularity."""
+
+    def __init__(self, source: bytes) -> None:
+        """Class constructor.
+
+        :param source: the python file content
+        """
+        tree = _DocStripper().visit(ast.parse(source))
+        # the normalized code of each function, class or variable
+        self.definitions = {}  # type: Dict[str, str]
+        # the other top level names each definition refers to
+        self.references = {}  # type: Dict[str, Set[str]]
+        # the normalized code of the other statements (imports, conditional definitions, ...)
+        self.other = []  # type: List[str]
+        nodes = {}  # type: Dict[str, List[ast.stmt]]
+        for node in tree.body:
+            names = _defined_names(node)
+            if not names:
+                self.other.append(ast.dump(node, include_attributes=False))
+            for name in names:
+                nodes.setdefault(name, []).append(node)
+        for name, statements in nodes.items():
+            self.definitions[name] = "\n".join(
+                ast.dump(n, include_attributes=False) for n in statements
+            )
+            self.references[name] = {
+                n.id
+                for statement in statements
+                for n in ast.walk(statement)
+                if isinstance(n, ast.Name) and n.id != name and n.id in nodes
+            }
+
+    def changed_names(self, other: "TopLevelSymbols") -> set[str]:
+        """List the names defined differently by another version of the file.
+
+        :param other: the top level definitions of the other version
+        :returns: the names added, removed or whose definition changed
+        """
+        names = set(self.definitions) | set(other.definitions)
+        return {n for n in names if self.definitions.get(n) != other.definitions.get(n)}
+
+    def referrers(self) -> dict[str, set[str]]:
+        """Reverse the references between the top level definitions.
+
+        :returns: the names referring to each name
+        """
+        result = {}  # type: Dict[str, Set[str]]
+        for name, references in self.references.items():
+            for reference in references:
+                result.setdefault(reference, set()).add(name)
+        return result
+
+
+def impacted_symbols(base: bytes, head: bytes) -> Optional[set[str]]:
+    """List the top level names of a python file impacted by a change.
+
+    A name is impacted when its definition changed, or when it refers, directly or through other
+    top level names of the file, to a changed definition.
+
+    :param base: the file content before the change
+    :param head: the file content after the change
+    :returns: the impacted names, None when a change outside of the top level definitions (e.g.
+        an import or a conditional definition) makes the impact ambiguous
+    """
+    try:
+        before, after = TopLevelSymbols(base), TopLevelSymbols(head)
+    except (SyntaxError, ValueError):
+        return None
+    if before.other != after.other:
+        return None
+    changed = before.changed_names(after)
+    referrers = before.referrers()
+    for reference, names in after.referrers().items():
+        referrers.setdefault(reference, set()).update(names)
+    result = set(changed)
+    to_visit = list(changed)
+    while to_visit:
+        for referrer in referrers.get(to_visit.pop(), set()):
+            if referrer not in result:
+                result.add(referrer)
+                to_visit.append(referrer)
+    return result
+
+
+def read_blob(collection_path: PosixPath, path: PosixPath, ref: str) -> Optional[bytes]:
+    """Read the content of a collection file at a git reference.
+
+    :param collection_path: path to the collection
+    :param path: the file path, relative to the collection root
+    :param ref: the git reference, the working tree when empty
+    :returns: the file content, None when the file does not exist
+    """
+    if not ref:
+        file_path = collection_path / path
+        return file_path.read_bytes() if file_path.is_file() else None
+    proc = subprocess.run(
+        ["git", "show", f"{ref}:./{os.fsdecode(path)}"],
+        cwd=collection_path,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    return proc.stdout if proc.returncode == 0 else None
+
+
+def is_doc_only(
+    collection_path: PosixPath, change: FileChange, base_ref: str, head_ref: str = ""
+) -> bool:
+    """Return true if a change of a python file leaves its executable code unchanged.
+
+    The documentation of the modules is ignored, the one of the other plugins and of the doc
+    fragments is not since the plugins read their options from it.
+
+    :param collection_path: path to the collection
+    :param change: the change, with paths relative to the collection root
+    :param base_ref: the base reference, compared as origin/<base_ref>
+    :param head_ref: the reference compared with the base one, the working tree when not set
+    :returns: whether only the documentation, comments or formatting of the file changed
+    """
+    # a renamed file is tested under its new name, even when its content is unchanged
+    if change.status != "M" or change.path.suffix != ".py":
+        return False
+    base = read_blob(collection_path, change.path, f"origin/{base_ref}")
+    head = read_blob(collection_path, change.path, head_ref)
+    if base is None or head is None:
+        return False
+    plugin_doc = MODULES_DIR in change.path.parents
+    base_code = normalized_code(base, plugin_doc)
+    return base_code is not None and base_code == normalized_code(head, plugin_doc)
+
+
+def _import_statements(content: bytes) -> Optional[list[str]]:
+    """List the import statements of a python file content, ignoring their position.
+
+    :param content: the python file content
+    :returns: the normalized import statements, None when the content is not valid python
+    """
+    try:
+        return [ast.dump(n, include_attributes=False) for n in scan_imports(content.decode())]
+    except (SyntaxError, ValueError):
+        return None
+
+
+def is_layout_change(
+    collection_path: PosixPath, change: FileChange, base_ref: str, head_ref: str = ""
+) -> bool:
+    """Return true if a change may alter the targets index or the import graph of a collection.
+
+    The targets index and the import graph depend on the plugins and python modules files, on the
+    targets directories and aliases and on the import statements of the python files. The
+    collection checkout is expected to be at the base reference.
+
+    :param collection_path: path to the collection
+    :param change: the change, with paths relative to the collection root
+    :param base_ref: the base reference, compared as origin/<base_ref>
+    :param head_ref: the reference compared with the base one, the working tree when not set
+    :returns: whether a plugin or a target is added, removed or renamed, or the aliases of a
+        target or the imports of a python file changed
+    """
+    for path in change.paths():
+        if path.is_relative_to(TARGETS_DIR) and len(path.parts) > len(TARGETS_DIR.parts) + 1:
+            target = path.parts[len(TARGETS_DIR.parts)]
+            if path.name == "aliases" or not (collection_path / TARGETS_DIR / target).is_dir():
+                return True
+        elif path.is_relative_to(PLUGINS_DIR) and change.status != "M":
+            return True
+    if change.status != "M" or change.path.suffix != ".py":
+        return False
+    if not change.path.is_relative_to(PLUGINS_DIR):
+        return False
+    base = read_blob(collection_path, change.path, f"origin/{base_ref}")
+    head = read_blob(collection_path, change.path, head_ref)
+    if base is None or head is None:
+        return True
+    base_imports = _import_statements(base)
+    return base_imports is None or base_imports != _import_statements(head)
+
+
+def changed_symbols(
+    collection_path: PosixPath, change: FileChange, base_ref: str, head_ref: str = ""
+) -> Optional[set[str]]:
+    """List the top level names of a changed python file impacted by the change.
+
+    :param collection_path: path to the collection
+    :param change: the change, with paths relative to the collection root
+    :param base_ref: the base reference, compared as origin/<base_ref>
+    :param head_ref: the reference compared with the base one, the working tree when not set
+    :returns: the impacted names, None when the whole file must be considered as changed (e.g. a
+        new, deleted or renamed file)
+    """
+    if change.status != "M" or change.path.suffix != ".py":
+        return None
+    base = read_blob(collection_path, change.path, f"origin/{base_ref}")
+    head = read_blob(collection_path, change.path, head_ref)
+    if base is None or head is None:
+        return None
+    return impacted_symbols(base, head)
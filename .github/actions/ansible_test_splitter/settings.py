@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Read the settings of the splitter from the environment variables."""
+
+import os
+
+from collections import defaultdict
+from pathlib import PosixPath
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from list_changed_common import read_test_all_the_targets
+from list_changed_common import read_total_jobs
+from scheduler import SlotLimits
+
+
+class SplitterSettings(NamedTuple):
+    """The settings of the test plans, shared by the pull requests planned by a run."""
+
+    base_ref: str
+    total_jobs: int
+    limits: SlotLimits
+    makespan_budget: Optional[int]
+    shared_jobs: bool
+    unclassified_changes: str
+    doc_only_changes: str
+    module_utils_impact: str
+    target_selection: str
+    result_cache: bool
+    plan_cache: bool
+    test_all_the_targets: bool
+    import_graph_output: str
+    import_graph_check: bool
+
+
+def read_splitter_settings() -> SplitterSettings:
+    """Read the settings of the test plans.
+
+    :returns: the settings
+    """
+    return SplitterSettings(
+        base_ref=os.environ.get("PULL_REQUEST_BASE_REF", ""),
+        total_jobs=read_total_jobs(),
+        limits=SlotLimits(
+            read_optional_int("MAX_TARGETS_PER_SLOT"), read_optional_int("MAX_SECONDS_PER_SLOT")
+        ),
+        makespan_budget=read_optional_int("MAKESPAN_BUDGET"),
+        shared_jobs=read_shared_jobs(),
+        unclassified_changes=read_unclassified_changes(),
+        doc_only_changes=read_doc_only_changes(),
+        module_utils_impact=read_module_utils_impact(),
+        target_selection=read_target_selection(),
+        result_cache=read_result_cache(),
+        plan_cache=read_plan_cache(),
+        test_all_the_targets=read_test_all_the_targets(),
+        import_graph_output=os.environ.get("IMPORT_GRAPH_OUTPUT", ""),
+        import_graph_check=read_import_graph_check(),
+    )
+
+
+def read_optional_int(name: str) -> Optional[int]:
+    """Read an optional positive integer from an environment variable.
+
+    :param name: the environment variable name
+    :returns: the value or None when the variable is not set or invalid
+    """
+    try:
+        result = int(os.environ.get(name, ""))
+    except ValueError:
+        return None
+    return result if result > 0 else None
+
+
+def read_collections_paths(variable: str) -> dict[str, list[PosixPath]]:
+    """Read `collection:path` entries separated by semicolons or new lines.
+
+    :param variable: the environment variable name
+    :returns: the paths per collection
+    """
+    result = defaultdict(list)  # type: Dict[str, List[PosixPath]]
+    for item in os.environ.get(variable, "").replace("\n", ";").split(";"):
+        name, sep, path = item.strip().partition(":")
+        if sep and name and path.strip():
+            result[name].append(PosixPath(path.strip()))
+    return dict(result)
+
+
+def read_test_results() -> dict[str, list[PosixPath]]:
+    """Read the results of previous integration test runs to learn the targets duration from.
+
+    The variable TEST_RESULTS holds `collection:path` entries separated by semicolons or new
+    lines, the path being an ansible-test data or JUnit file or a directory containing them.
+
+    :returns: the path to the test results per collection
+    """
+    return read_collections_paths("TEST_RESULTS")
+
+
+def read_coverage_results() -> dict[str, list[PosixPath]]:
+    """Read the coverage of previous integration test runs to index the covered files from.
+
+    The variable COVERAGE_RESULTS holds `collection:path` entries separated by semicolons or new
+    lines, the path being an `ansible-test coverage analyze targets generate` file or a directory
+    containing them.
+
+    :returns: the path to the coverage analysis per collection
+    """
+    return read_collections_paths("COVERAGE_RESULTS")
+
+
+def read_target_selection() -> str:
+    """Read how the targets impacted by the changed plugins and module_utils are selected.
+
+    :returns: "coverage" to use the targets covering the changed files when they are known from
+        the coverage index, "imports" to use the naming conventions and the import graph only
+    """
+    selection = os.environ.get("TARGET_SELECTION", "").strip().lower()
+    return selection if selection in ("coverage", "imports") else "imports"
+
+
+def read_workers() -> int:
+    """Read the number of processes used to parse the collections files.
+
+    :returns: number of workers, 1 meaning the files are parsed serially
+    """
+    default_value = os.cpu_count() or 1
+    try:
+        result = int(os.environ.get("SPLITTER_WORKERS", default_value))
+    except ValueError:
+        result = default_value
+    return max(1, result)
+
+
+def read_import_graph_check() -> bool:
+    """Test if the unresolved imports of the collections should be reported.
+
+    :returns: whether the import graph self-check is enabled or not
+    """
+    return os.environ.get("IMPORT_GRAPH_CHECK", "").lower() == "true"
+
+
+def read_shared_jobs() -> bool:
+    """Test if the jobs should be shared between the collections being tested.
+
+    :returns: whether TOTAL_JOBS is the number of jobs for all the collections or not
+    """
+    return os.environ.get("SHARED_JOBS", "").lower() == "true"
+
+
+def read_result_cache() -> bool:
+    """Test if the targets which already passed with the same dependencies should be skipped.
+
+    :returns: whether the passed results are cached or not
+    """
+    return os.environ.get("RESULT_CACHE", "").lower() == "true"
+
+
+def read_plan_cache() -> bool:
+    """Test if the test plans should be stored and reused for identical inputs.
+
+    :returns: whether the test plans are cached or not
+    """
+    return os.environ.get("PLAN_CACHE", "").lower() == "true"
+
+
+def read_unclassified_changes() -> str:
+    """Read the policy for the changed files whose impact on the targets is unknown.
+
+    :returns: "all" to test all the targets of the collection, "ignore" otherwise
+    """
+    policy = os.environ.get("UNCLASSIFIED_CHANGES", "").strip().lower()
+    return policy if policy in ("all", "ignore") else "ignore"
+
+
+def read_doc_only_changes() -> str:
+    """Read the policy for the changed python files whose executable code is unchanged.
+
+    :returns: "test" to test them like the other changes, "skip" otherwise
+    """
+    policy = os.environ.get("DOC_ONLY_CHANGES", "").strip().lower()
+    return policy if policy in ("skip", "test") else "skip"
+
+
+def read_module_utils_impact() -> str:
+    """Read the granularity of the impact of the module_utils and plugin_utils changes.
+
+    :returns: "symbol" to only impact the importers of the changed functions, classes and
+        variables, "file" to impact all the importers of the changed files
+    """
+    granularity = os.environ.get("MODULE_UTILS_IMPACT", "").strip().lower()
+    return granularity if granularity in ("symbol", "file") else "symbol"
+
+
+def read_cache_dir() -> Optional[PosixPath]:
+    """Read the directory used to persist the splitter caches between runs.
+
+    :returns: the cache directory or None when caching is disabled
+    """
+    cache_dir = os.environ.get("SPLITTER_CACHE_DIR", "").strip()
+    return PosixPath(cache_dir) if cache_dir else None
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""The stores persisted by the splitter between runs and the results they learn from."""
+
+from pathlib import PosixPath
+from typing import Dict
+from typing import Optional
+
+from coverage_index import CoverageIndex
+from coverage_index import read_coverage
+from durations import DurationStore
+from import_cache import ImportCache
+from import_cache import git_blob_sha
+from phase_timings import PROFILER
+from plan_cache import PlanCache
+from plan_cache import list_files
+from result_cache import ContentHasher
+from result_cache import ResultCache
+from result_cache import read_passed_hashes
+
+
+class SplitterCaches:
+    """Load the splitter stores from the cache directory, feed and save them."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[PosixPath] = None,
+        test_results: Optional[dict[str, list[PosixPath]]] = None,
+        coverage_results: Optional[dict[str, list[PosixPath]]] = None,
+    ) -> None:
+        """Class constructor.
+
+        :param cache_dir: directory to load the stores from and save them to, the stores are kept
+            in memory only when not set
+        :param test_results: the results of the previous integration test runs, per collection
+        :param coverage_results: the coverage of the previous integration test runs, per
+            collection
+        """
+        self.test_results = test_results or {}
+        self.coverage_results = coverage_results or {}
+        self.import_cache = ImportCache(cache_dir)
+        self.durations = DurationStore(cache_dir)
+        self.coverage = CoverageIndex(cache_dir)
+        self.results = ResultCache(cache_dir)
+        self.plans = PlanCache(cache_dir)
+
+    def learn(self) -> None:
+        """Record the results and the coverage of the previous runs into the stores."""
+        with PROFILER.phase("caches"):
+            self.learn_durations()
+            self.learn_coverage()
+            self.learn_results()
+
+    def learn_durations(self) -> None:
+        """Record the results of the previous runs into the durations store."""
+        for name, paths in self.test_results.items():
+            durations = self.durations.ingest(name, paths)
+            print(f"Recording the duration of {len(durations)} targets for {name}")
+        self.durations.prune()
+        self.durations.save()
+
+    def learn_coverage(self) -> None:
+        """Record the coverage of the previous runs into the coverage index."""
+        for name, paths in self.coverage_results.items():
+            coverage = read_coverage(paths, name)
+            print(f"Recording the targets covering {len(coverage)} files for {name}")
+            self.coverage.record(name, coverage)
+        self.coverage.save()
+
+    def learn_results(self) -> None:
+        """Record the targets which passed in the previous runs into the results store."""
+        for name, paths in self.test_results.items():
+            hashes = read_passed_hashes(paths, name)
+            print(f"Recording {len(hashes)} targets which passed for {name}")
+            self.results.record(name, hashes)
+        self.results.prune()
+        self.results.save()
+
+    def learned(self, hasher: ContentHasher) -> dict[str, str]:
+        """Hash the test results and the coverage learned from, and the stores learned so far.
+
+        :param hasher: the hasher of the files content
+        :returns: the digest of the files, per kind and collection or per store file name
+        """
+        result = {}  # type: Dict[str, str]
+        for kind, results in (("test", self.test_results), ("coverage", self.coverage_results)):
+            for name, paths in results.items():
+                result[f"{kind}:{name}"] = hasher.hash(PosixPath("/"), list_files(paths))
+        for store in (self.durations, self.coverage, self.results):
+            # not memoized by the hasher, learning the results rewrites the stores
+            if store.store_file is not None and store.store_file.is_file():
+                result[store.store_file_name] = git_blob_sha(store.store_file.read_bytes())
+        return result
+
+    def save(self) -> None:
+        """Write the stores updated while planning into the cache directory."""
+        with PROFILER.phase("caches"):
+            self.import_cache.save()
+            self.plans.save()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Define the integration test targets of a collection and their aliases."""
+
+import re
+
+from collections import defaultdict
+from collections.abc import Iterable
+from enum import IntFlag
+from pathlib import PosixPath
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from phase_timings import PROFILER
+
+
+class AliasFlag(IntFlag):
+    """Flags set into the aliases file of a target."""
+
+    UNSUPPORTED = 1
+    DISABLED = 2
+    UNSTABLE = 4
+    HIDDEN = 8
+    SLOW = 16
+
+
+# A target is ignored when any of those flags is set
+IGNORED_FLAGS = AliasFlag.UNSUPPORTED | AliasFlag.DISABLED | AliasFlag.UNSTABLE | AliasFlag.HIDDEN
+
+_FLAG_ALIASES = {flag.name.lower(): flag for flag in AliasFlag if flag.name}
+_ALIAS_TIME = re.compile(r"^time=([0-9]+)(m?)\S*$")
+
+
+class TargetAliases:
+    """The content of the aliases file of a target, parsed once."""
+
+    __slots__ = ("flags", "time", "cloud", "needs_targets", "others")
+
+    def __init__(self, lines: list[str]) -> None:
+        """Class constructor.
+
+        :param lines: the lines of the aliases file, without comments
+        """
+        self.flags = AliasFlag(0)
+        # execution time in seconds, from the time=<value> alias
+        self.time = None  # type: Optional[int]
+        # cloud group, from the cloud/<group> alias
+        self.cloud = None  # type: Optional[str]
+        # names of the targets from the needs/target/<name> aliases
+        self.needs_targets = ()  # type: Tuple[str, ...]
+        # any other alias (e.g. module names, role/<name>, context/controller)
+        self.others = ()  # type: Tuple[str, ...]
+
+        needs_targets = []
+        others = []
+        for line in lines:
+            if line in _FLAG_ALIASES:
+                self.flags |= _FLAG_ALIASES[line]
+            elif match := _ALIAS_TIME.match(line):
+                self.time = int(match.group(1)) * (60 if match.group(2) else 1)
+            elif line.startswith("cloud/"):
+                self.cloud = line[len("cloud/") :]
+            elif line.startswith("needs/target/"):
+                needs_targets.append(line[len("needs/target/") :])
+            else:
+                others.append(line)
+        self.needs_targets = tuple(needs_targets)
+        self.others = tuple(others)
+
+    def has(self, flags: AliasFlag) -> bool:
+        """Test if any of the flags is set.
+
+        :param flags: the flags
+        :returns: whether any of the flags is set or not
+        """
+        return bool(self.flags & flags)
+
+    def roles(self) -> list[str]:
+        """List the roles tested by the target, from the role/<name> aliases.
+
+        :returns: the names of the roles
+        """
+        return [alias[len("role/") :] for alias in self.others if alias.startswith("role/")]
+
+
+class Target:
+    """A class to store information about a specific target."""
+
+    __slots__ = ("name", "lines", "aliases", "exec_time")
+
+    def __init__(self, target_path: PosixPath) -> None:
+        """Class constructor.
+
+        :param target_path: path to the target
+        """
+        self.name = target_path.stem
+        self.lines = []  # type: List[str]
+        aliases_path = PosixPath(target_path / "aliases")
+        if aliases_path.exists():
+            PROFILER.files_read()
+            self.lines = [
+                line.split("#")[0]
+                for line in aliases_path.read_text(encoding="utf-8").split("\n")
+                if line
+            ]
+        self.aliases = TargetAliases(self.lines)
+        self.exec_time = 0
+
+    def is_alias_of(self, name: str) -> bool:
+        """Test alias target.
+
+        :param name: the name of the source target
+        :returns: whether target is an alias or not
+        """
+        return name in self.lines or self.name == name
+
+    def is_unstable(self) -> bool:
+        """Test unstable target.
+
+        :returns: whether target is unstable or not
+        """
+        return self.aliases.has(AliasFlag.UNSTABLE)
+
+    def is_disabled(self) -> bool:
+        """Test disabled target.
+
+        :returns: whether target is disabled or not
+        """
+        return self.aliases.has(AliasFlag.DISABLED)
+
+    def is_slow(self) -> bool:
+        """Test slow target.
+
+        :returns: whether target is slow or not
+        """
+        # NOTE: Should be replaced by time=3000
+        return self.aliases.has(AliasFlag.SLOW)
+
+    def is_ignored(self) -> bool:
+        """Show the target be ignored.
+
+        :returns: whether target is set as ignored or not
+        """
+        return self.aliases.has(IGNORED_FLAGS)
+
+    def execution_time(self) -> int:
+        """Retrieve execution time of a target.
+
+        :returns: execution time of the target
+        """
+        if not self.exec_time:
+            if self.aliases.time is not None:
+                self.exec_time = self.aliases.time
+            else:
+                self.exec_time = 3000 if self.is_slow() else 180
+        return self.exec_time
+
+
+class TargetIndex:
+    """A class indexing the integration test targets of a collection."""
+
+    def __init__(self, targets: Iterable[Target]) -> None:
+        """Class constructor.
+
+        :param targets: the targets of the collection
+        """
+        self.targets = list(targets)
+        self.by_name = {}  # type: Dict[str, Target]
+        self.by_alias = defaultdict(list)  # type: Dict[str, List[Target]]
+        # targets declaring a needs/target/<name> alias, per needed target name
+        self.needed_by = defaultdict(list)  # type: Dict[str, List[Target]]
+        for target in self.targets:
+            self.by_name[target.name] = target
+            for alias in dict.fromkeys([target.name] + target.lines):
+                self.by_alias[alias].append(target)
+            for name in target.aliases.needs_targets:
+                self.needed_by[name].append(target)
+
+    def get(self, name: str) -> Optional[Target]:
+        """Return a target by its name.
+
+        :param name: the target name
+        :returns: the target or None when there is no target with this name
+        """
+        return self.by_name.get(name)
+
+    def aliases_of(self, name: str) -> list[Target]:
+        """List the targets named or aliased after a name (see Target.is_alias_of).
+
+        :param name: the name of the source target
+        :returns: the list of targets
+        """
+        return self.by_alias.get(name, [])
+
+    def dependents_of(self, name: str) -> list[Target]:
+        """List the targets needing a target, directly or through other needed targets.
+
+        :param name: the name of the needed target
+        :returns: the list of dependent targets, in breadth-first order
+        """
+        result = []
+        visited = {name}
+        to_visit = [name]
+        while to_visit:
+            current = to_visit.pop(0)
+            for target in self.needed_by.get(current, []):
+                if target.name not in visited:
+                    visited.add(target.name)
+                    to_visit.append(target.name)
+                    result.append(target)
+        return result
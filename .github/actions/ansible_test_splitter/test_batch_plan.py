@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Contains tests cases for batch_plan module."""
+
+import json
+import subprocess
+
+from pathlib import PosixPath
+
+import pytest
+
+from batch_plan import read_pull_requests
+from conftest import GitRepository
+from list_changed_targets import ListChangedTargets
+from list_changed_targets import PullRequest
+
+
+def test_run_batch(
+    tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch, git_repo: GitRepository
+) -> None:
+    """Test ListChangedTargets.run_batch computes one plan per pull request.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    :param git_repo: git repository fixture
+    """
+    (tmp_path / "galaxy.yml").write_text("namespace: some\nname: collection\n")
+    for name in ("a", "b", "c"):
+        (tmp_path / "plugins" / "modules").mkdir(parents=True, exist_ok=True)
+        (tmp_path / "plugins" / "modules" / f"{name}.py").write_text(f"# {name}\n")
+        (tmp_path / "tests" / "integration" / "targets" / name).mkdir(parents=True)
+        (tmp_path / "tests" / "integration" / "targets" / name / "aliases").write_text("\n")
+    git_repo.commit_base()
+    for branch, module in (("one", "a"), ("two", "b")):
+        git_repo.run("checkout", "-q", "-b", branch, "origin/main")
+        (tmp_path / "plugins" / "modules" / f"{module}.py").write_text("changed = True\n")
+        git_repo.run("commit", "-q", "-a", "-m", f"change {module}")
+    # a new module and its target, unknown from the checked out collection
+    git_repo.run("checkout", "-q", "-b", "three", "origin/main")
+    (tmp_path / "plugins" / "modules" / "d.py").write_text("# d\n")
+    (tmp_path / "tests" / "integration" / "targets" / "d").mkdir()
+    (tmp_path / "tests" / "integration" / "targets" / "d" / "aliases").write_text("\n")
+    git_repo.run("add", ".")
+    git_repo.run("commit", "-q", "-m", "add d")
+    git_repo.run("checkout", "-q", "--detach", "origin/main")
+
+    monkeypatch.setenv("COLLECTIONS_TO_TEST", str(tmp_path))
+    monkeypatch.setenv("TOTAL_JOBS", "2")
+    monkeypatch.setenv("PULL_REQUEST_BASE_REF", "main")
+    monkeypatch.delenv("PULL_REQUEST_BODY", raising=False)
+    splitter = ListChangedTargets()
+    plans = splitter.run_batch(
+        {
+            "1": PullRequest("one"),
+            "2": PullRequest("two"),
+            "3": PullRequest("one", "TargetsToTest=some.collection:c,b"),
+            "4": PullRequest("three"),
+        }
+    )
+    assert {key: plan["raw"] for key, plan in plans.items()} == {
+        "1": "some.collection-1:a",
+        "2": "some.collection-1:b",
+        "3": "some.collection-1:c;some.collection-2:b",
+        "4": "some.collection-1:d",
+    }
+    assert list(splitter.target_indexes) == [tmp_path]
+    assert not (tmp_path / "tests" / "integration" / "targets" / "d").exists()
+    worktrees = subprocess.run(
+        ["git", "worktree", "list", "--porcelain"], cwd=tmp_path, stdout=subprocess.PIPE, check=True
+    )
+    assert worktrees.stdout.count(b"worktree ") == 1
+
+
+def test_read_pull_requests(tmp_path: PosixPath) -> None:
+    """Test read_pull_requests function.
+
+    :param tmp_path: python temporary path fixture
+    """
+    path = tmp_path / "pull_requests.json"
+    path.write_text(json.dumps({"12": {"ref": "refs/pull/12/head", "body": None}, "13": {}}))
+    with pytest.raises(ValueError):
+        read_pull_requests(path)
+    path.write_text(json.dumps({"12": {"ref": "refs/pull/12/head", "body": None}}))
+    assert read_pull_requests(path) == {"12": PullRequest("refs/pull/12/head", "")}
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Contains tests cases for change_classifier module."""
+
+from pathlib import PosixPath
+
+from change_classifier import PrefixTrie
+from change_classifier import classify_changes
+
+
+def test_prefix_trie() -> None:
+    """Test PrefixTrie class matches the longest prefix."""
+    trie = PrefixTrie({"plugins": "plugins", "plugins/modules": "modules"})
+    assert trie.match(("plugins", "modules", "ec2.py")) == ("modules", 2)
+    assert trie.match(("plugins", "modules_extra", "ec2.py")) == ("plugins", 1)
+    assert trie.match(("docs", "index.rst")) == (None, 0)
+
+
+def test_classify_changes() -> None:
+    """Test classify_changes function."""
+    paths = [
+        PosixPath("plugins/modules/ec2.py"),
+        PosixPath("plugins/module_utils/botocore/__init__.py"),
+        PosixPath("tests/integration/targets/setup_ec2/tasks/main.yml"),
+        PosixPath("roles/my_role/tasks/main.yml"),
+        PosixPath("changelogs/fragments/fix.yml"),
+        PosixPath("meta/runtime.yml"),
+        PosixPath("plugins/doc_fragments/aws.py"),
+    ]
+    result = classify_changes(paths)
+    assert result["modules"] == [(PosixPath("plugins/modules/ec2.py"), "ec2.py")]
+    assert result["module_utils"] == [
+        (PosixPath("plugins/module_utils/botocore/__init__.py"), "botocore")
+    ]
+    assert result["targets"] == [
+        (PosixPath("tests/integration/targets/setup_ec2/tasks/main.yml"), "setup_ec2")
+    ]
+    assert result["roles"] == [(PosixPath("roles/my_role/tasks/main.yml"), "my_role")]
+    assert result["ignored"] == [(PosixPath("changelogs/fragments/fix.yml"), "fragments")]
+    assert result["unclassified"] == [(PosixPath("meta/runtime.yml"), "")]
+    assert result["doc_fragments"] == [(PosixPath("plugins/doc_fragments/aws.py"), "aws.py")]
+    assert not result["lookup"]
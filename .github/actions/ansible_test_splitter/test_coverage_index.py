@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Contains tests cases for coverage_index module."""
+
+import json
+
+from pathlib import PosixPath
+from unittest.mock import patch
+
+import pytest
+
+from coverage_index import CoverageIndex
+from coverage_index import coverage_key
+from coverage_index import read_coverage
+from git_diff import FileChange
+from list_changed_common import Collection
+from list_changed_targets import ListChangedTargets
+
+
+ANALYSIS = {
+    "targets": ["ec2_vpc", "ec2_eni", "s3_bucket"],
+    "arcs": {
+        "/root/ansible_collections/amazon/aws/plugins/module_utils/ec2.py": {
+            "1:2": [0],
+            "2:3": [1],
+        },
+        "plugins/modules/s3_bucket.py": {"-1:1": [2]},
+    },
+    "lines": {"/root/ansible_collections/amazon/aws/plugins/modules/ec2_vpc.py": {"12": [0]}},
+}
+
+
+def test_coverage_key() -> None:
+    """Test coverage_key function."""
+    assert (
+        coverage_key("community.aws", "/x/ansible_collections/amazon/aws/plugins/modules/a.py")
+        == "amazon.aws:plugins/modules/a.py"
+    )
+    assert (
+        coverage_key("community.aws", "plugins/modules/a.py")
+        == "community.aws:plugins/modules/a.py"
+    )
+
+
+def test_read_coverage(tmp_path: PosixPath) -> None:
+    """Test read_coverage function.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "analyze.json").write_text(json.dumps(ANALYSIS))
+    (tmp_path / "invalid.json").write_text(json.dumps({"arcs": {}}))
+    assert read_coverage([tmp_path], "amazon.aws") == {
+        "amazon.aws:plugins/module_utils/ec2.py": {"ec2_vpc", "ec2_eni"},
+        "amazon.aws:plugins/modules/s3_bucket.py": {"s3_bucket"},
+        "amazon.aws:plugins/modules/ec2_vpc.py": {"ec2_vpc"},
+    }
+
+
+def test_coverage_index(tmp_path: PosixPath) -> None:
+    """Test CoverageIndex class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    index = CoverageIndex(tmp_path)
+    index.record(
+        "amazon.aws",
+        {
+            "amazon.aws:plugins/module_utils/ec2.py": {"ec2_vpc", "ec2_eni"},
+            "amazon.aws:plugins/modules/s3_bucket.py": {"s3_bucket"},
+        },
+    )
+    index.record(
+        "community.aws",
+        {"amazon.aws:plugins/module_utils/ec2.py": {"ec2_win_password"}},
+    )
+    index.save()
+
+    index = CoverageIndex(tmp_path)
+    assert index.covering_targets("amazon.aws:plugins/module_utils/ec2.py") == {
+        "amazon.aws": ["ec2_eni", "ec2_vpc"],
+        "community.aws": ["ec2_win_password"],
+    }
+    assert index.covering_targets("amazon.aws:plugins/modules/ec2_vpc.py") is None
+
+    # a new run of ec2_vpc replaces the files it covers, the other targets are kept
+    index.record("amazon.aws", {"amazon.aws:plugins/modules/ec2_vpc.py": {"ec2_vpc"}})
+    assert index.covering_targets("amazon.aws:plugins/module_utils/ec2.py") == {
+        "amazon.aws": ["ec2_eni"],
+        "community.aws": ["ec2_win_password"],
+    }
+    assert index.covering_targets("amazon.aws:plugins/modules/ec2_vpc.py") == {
+        "amazon.aws": ["ec2_vpc"]
+    }
+
+    (tmp_path / "coverage_index.json").write_text('{"version": 1, "collections": {"a.b": {}}}')
+    assert not CoverageIndex(tmp_path).collections
+
+
+def test_coverage_selection(tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test ListChangedTargets selects the targets covering the changed files.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    """
+    (tmp_path / "galaxy.yml").write_text("namespace: amazon\nname: aws\n")
+    for name in ("ec2_vpc", "ec2_eni", "s3_bucket"):
+        (tmp_path / "tests" / "integration" / "targets" / name).mkdir(parents=True)
+    monkeypatch.setenv("COLLECTIONS_TO_TEST", str(tmp_path))
+    monkeypatch.setenv("TARGET_SELECTION", "coverage")
+    monkeypatch.setenv("DOC_ONLY_CHANGES", "test")
+    monkeypatch.setenv("MODULE_UTILS_IMPACT", "file")
+    splitter = ListChangedTargets()
+    splitter.caches.coverage.record(
+        "amazon.aws",
+        {
+            "amazon.aws:plugins/module_utils/ec2.py": {"ec2_eni"},
+            "amazon.aws:plugins/modules/ec2_vpc.py": {"ec2_vpc"},
+        },
+    )
+    changes = [
+        FileChange("M", PosixPath("plugins/module_utils/ec2.py")),
+        FileChange("M", PosixPath("plugins/modules/s3_bucket.py")),
+    ]
+    collections = [Collection(tmp_path, splitter.import_graph)]
+    with patch("list_changed_targets.list_changes", return_value={tmp_path: changes}):
+        splitter.make_changed_targets(collections)
+    # the module_utils is covered by ec2_eni, s3_bucket is not covered and found by name
+    assert collections[0].test_plan_names == ["s3_bucket", "ec2_eni"]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Contains tests cases for durations module."""
+
+import json
+
+from pathlib import PosixPath
+
+from durations import DurationStore
+from durations import read_results
+
+
+def test_read_results(tmp_path: PosixPath) -> None:
+    """Test read_results function.
+
+    :param tmp_path: python temporary path fixture
+    """
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "integration-2024-python3.12.json").write_text(
+        json.dumps(
+            {
+                "targets": {
+                    "ec2_instance": {"name": "ec2_instance", "run_time_seconds": 612.5},
+                    "setup_ec2": {"name": "setup_ec2"},
+                }
+            }
+        )
+    )
+    (tmp_path / "junit.xml").write_text(
+        '<testsuites><testsuite name="s3_bucket" time="120.5"/>'
+        '<testsuite name="s3_bucket" time="10"/></testsuites>'
+    )
+    (tmp_path / "broken.xml").write_text("<testsuites>")
+    (data / "list.json").write_text("[]")
+    (data / "targets.json").write_text(json.dumps({"targets": ["s3_bucket"]}))
+
+    assert read_results([data, tmp_path / "junit.xml", tmp_path / "broken.xml"]) == {
+        "ec2_instance": 612.5,
+        "s3_bucket": 130.5,
+    }
+
+
+def test_duration_store(tmp_path: PosixPath) -> None:
+    """Test record, prune, save and load methods from DurationStore class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    store = DurationStore(tmp_path)
+    assert store.get("amazon.aws", "ec2_instance") is None
+
+    store.record("amazon.aws", {"ec2_instance": 600, "s3_bucket": 100}, now=0)
+    store.record("amazon.aws", {"ec2_instance": 300}, now=86400 * 30)
+    assert store.get("amazon.aws", "ec2_instance") == 510
+    # an outlier sample is clamped to 4 times the estimate
+    store.record("amazon.aws", {"s3_bucket": 100000}, now=0)
+    assert store.get("amazon.aws", "s3_bucket") == 190
+
+    store.prune(max_age_days=40, now=86400 * 60)
+    assert store.get("amazon.aws", "s3_bucket") is None
+    assert store.get("amazon.aws", "ec2_instance") == 510
+
+    store.save()
+    assert DurationStore(tmp_path).get("amazon.aws", "ec2_instance") == 510
+
+    store.prune(max_age_days=1, now=86400 * 60)
+    assert not store.collections
+
+
+def test_duration_store_ingest(tmp_path: PosixPath) -> None:
+    """Test that ingesting the same results twice does not change the estimates.
+
+    :param tmp_path: python temporary path fixture
+    """
+    results = tmp_path / "results"
+    results.mkdir()
+    (results / "junit.xml").write_text(
+        '<testsuites><testsuite name="s3_bucket" time="100"/></testsuites>'
+    )
+    store = DurationStore(tmp_path / "cache")
+    store.record("amazon.aws", {"s3_bucket": 200}, now=0)
+
+    assert store.ingest("amazon.aws", [results], now=1) == {"s3_bucket": 100}
+    assert store.get("amazon.aws", "s3_bucket") == 170
+    store.save()
+
+    store = DurationStore(tmp_path / "cache")
+    assert not store.ingest("amazon.aws", [results], now=2)
+    assert store.get("amazon.aws", "s3_bucket") == 170
+    # the same results are new for another collection
+    assert store.ingest("community.aws", [results], now=2) == {"s3_bucket": 100}
+
+    (results / "junit.xml").write_text(
+        '<testsuites><testsuite name="s3_bucket" time="200"/></testsuites>'
+    )
+    assert store.ingest("amazon.aws", [results], now=3) == {"s3_bucket": 200}
+    assert store.get("amazon.aws", "s3_bucket") == 179
+
+    store.prune(max_age_days=1, now=86400 * 2)
+    assert not store.ingested
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Contains tests cases for git_diff module."""
+
+import io
+
+from pathlib import PosixPath
+
+import pytest
+
+from conftest import GitRepository
+from git_diff import FileChange
+from git_diff import list_changes
+from git_diff import parse_name_status
+from git_diff import partition_changes
+from git_diff import split_stream
+
+
+def test_parse_name_status() -> None:
+    """Test parse_name_status function on a stream read by small chunks."""
+    output = b"M\0plugins/modules/a.py\0R095\0plugins/modules/b.py\0plugins/modules/c.py\0"
+    output += b"D\0docs/with\nnew line.md\0C100\0x.py\0y.py\0"
+    assert list(parse_name_status(split_stream(io.BytesIO(output), chunk_size=5))) == [
+        FileChange("M", PosixPath("plugins/modules/a.py")),
+        FileChange("R", PosixPath("plugins/modules/c.py"), PosixPath("plugins/modules/b.py")),
+        FileChange("D", PosixPath("docs/with\nnew line.md")),
+        FileChange("C", PosixPath("y.py"), PosixPath("x.py")),
+    ]
+    assert FileChange("C", PosixPath("y.py"), PosixPath("x.py")).paths() == [PosixPath("y.py")]
+    with pytest.raises(ValueError):
+        list(parse_name_status([b"M", b"a.py", b"R100", b"b.py"]))
+
+
+def test_partition_changes() -> None:
+    """Test partition_changes function."""
+    changes = [
+        FileChange("M", PosixPath("amazon/aws/plugins/modules/a.py")),
+        FileChange("R", PosixPath("community/aws/b.py"), PosixPath("amazon/aws/b.py")),
+        FileChange("A", PosixPath("README.md")),
+    ]
+    roots = {PosixPath("x"): PosixPath("amazon/aws"), PosixPath("y"): PosixPath("community/aws")}
+    assert partition_changes(changes, roots) == {
+        PosixPath("x"): [
+            FileChange("M", PosixPath("plugins/modules/a.py")),
+            FileChange("D", PosixPath("b.py")),
+        ],
+        PosixPath("y"): [FileChange("R", PosixPath("b.py"))],
+    }
+
+
+def test_list_changes(tmp_path: PosixPath, git_repo: GitRepository) -> None:
+    """Test list_changes function runs git diff once for collections of the same checkout.
+
+    :param tmp_path: python temporary path fixture
+    :param git_repo: git repository fixture
+    """
+    for name in ("one/plugins/modules/a.py", "one/plugins/modules/b.py", "two/c.py"):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(f"# {name}\n" * 10)
+    git_repo.commit_base()
+
+    (tmp_path / "one/plugins/modules/b.py").rename(tmp_path / "one/plugins/modules/d.py")
+    (tmp_path / "two/c.py").write_text("changed\n")
+    git_repo.run("add", "-A")
+
+    one, two = tmp_path / "one", tmp_path / "two"
+    assert list_changes([one, two], "main") == {
+        one: [
+            FileChange("R", PosixPath("plugins/modules/d.py"), PosixPath("plugins/modules/b.py")),
+        ],
+        two: [FileChange("M", PosixPath("c.py"))],
+    }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Contains tests cases for import_cache module."""
+
+import json
+
+from pathlib import PosixPath
+from unittest.mock import MagicMock
+
+from import_cache import ImportCache
+from import_cache import git_blob_sha
+from import_tree import ImportReader
+from import_tree import build_import_tree
+
+
+def test_git_blob_sha() -> None:
+    """Test git_blob_sha function."""
+    assert git_blob_sha(b"") == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+    assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+def test_import_cache_fetch(tmp_path: PosixPath) -> None:
+    """Test fetch, save and load methods from ImportCache class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    extract = MagicMock()
+    extract.return_value = ["a.b", "c"]
+
+    cache = ImportCache(tmp_path)
+    assert cache.fetch(b"import a.b", "pkg.modules", extract) == ["a.b", "c"]
+    assert cache.fetch(b"import a.b", "pkg.modules", extract) == ["a.b", "c"]
+    extract.assert_called_once_with("import a.b")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # the same content read from another package is a different entry
+    cache.fetch(b"import a.b", "pkg.module_utils", extract)
+    assert extract.call_count == 2
+
+    cache.save()
+    content = json.loads((tmp_path / "import_cache.json").read_text())
+    assert content["entries"] == {
+        git_blob_sha(b"import a.b"): {"pkg.modules": ["a.b", "c"], "pkg.module_utils": ["a.b", "c"]}
+    }
+
+    # restore the cache from the directory
+    extract.reset_mock()
+    cache = ImportCache(tmp_path)
+    assert cache.fetch(b"import a.b", "pkg.modules", extract) == ["a.b", "c"]
+    extract.assert_not_called()
+
+
+def test_import_cache_invalid_file(tmp_path: PosixPath) -> None:
+    """Test that an invalid or outdated cache file is ignored.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "import_cache.json").write_text("{not json")
+    assert not ImportCache(tmp_path).entries
+
+    (tmp_path / "import_cache.json").write_text(json.dumps({"version": 0, "entries": {"a": {}}}))
+    assert not ImportCache(tmp_path).entries
+
+    (tmp_path / "import_cache.json").write_text("[]")
+    assert not ImportCache(tmp_path).entries
+
+
+def test_build_import_tree_with_cache(tmp_path: PosixPath) -> None:
+    """Test that build_import_tree only parses files whose content changed.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "plugins" / "modules").mkdir(parents=True)
+    (tmp_path / "plugins" / "module_utils").mkdir(parents=True)
+    (tmp_path / "plugins" / "modules" / "ec2.py").write_text("from ..module_utils.core import A\n")
+    (tmp_path / "plugins" / "module_utils" / "core.py").write_text("import os\n")
+
+    cache = ImportCache()
+    reader = ImportReader(cache)
+    expected = build_import_tree(tmp_path, "amazon.aws", ["amazon.aws"], reader)
+    assert expected[0] == {"ec2": ["ansible_collections.amazon.aws.plugins.module_utils.core"]}
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    assert build_import_tree(tmp_path, "amazon.aws", ["amazon.aws"], reader) == expected
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    (tmp_path / "plugins" / "modules" / "ec2.py").write_text("import os\n")
+    modules_import, _ = build_import_tree(tmp_path, "amazon.aws", ["amazon.aws"], reader)
+    assert not modules_import
+    assert (cache.hits, cache.misses) == (3, 3)
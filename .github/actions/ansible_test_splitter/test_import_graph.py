@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Contains tests cases for import_graph module."""
+
+from pathlib import PosixPath
+from typing import Dict
+from typing import Optional
+from typing import Set
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from import_graph import ImportGraph
+from import_tree import build_import_tree
+from list_changed_common import Collection
+from list_changed_common import CollectionsImportGraph
+
+
+PREFIX = "ansible_collections.amazon.aws.plugins.module_utils"
+
+MODULES_IMPORT = {
+    "ec2_mod1": [],
+    "ec2_mod2": [f"{PREFIX}.core"],
+    "ec2_mod3": [f"{PREFIX}.tagging", f"{PREFIX}.waiters"],
+    "s3_object": [f"{PREFIX}.s3"],
+}
+
+UTILS_IMPORT = {
+    f"{PREFIX}.waiters": [f"{PREFIX}.core"],
+    f"{PREFIX}.tagging": [f"{PREFIX}.core", f"{PREFIX}.botocore"],
+    f"{PREFIX}.core": [f"{PREFIX}.botocore"],
+    # cyclic imports
+    f"{PREFIX}.s3": [f"{PREFIX}.s3_utils"],
+    f"{PREFIX}.s3_utils": [f"{PREFIX}.s3"],
+}
+
+
+def test_impacted_modules() -> None:
+    """Test impacted_modules method from ImportGraph class."""
+    graph = ImportGraph(MODULES_IMPORT, UTILS_IMPORT)
+    assert graph.impacted_modules([f"{PREFIX}.core"]) == ["ec2_mod2", "ec2_mod3"]
+    assert graph.impacted_modules([f"{PREFIX}.botocore"]) == ["ec2_mod2", "ec2_mod3"]
+    assert graph.impacted_modules([f"{PREFIX}.waiters"]) == ["ec2_mod3"]
+    assert graph.impacted_modules([f"{PREFIX}.s3_utils"]) == ["s3_object"]
+    assert graph.impacted_modules([f"{PREFIX}.s3"]) == ["s3_object"]
+    assert not graph.impacted_modules([f"{PREFIX}.unknown"])
+    assert graph.impacted_modules([f"{PREFIX}.waiters", f"{PREFIX}.s3"]) == [
+        "ec2_mod3",
+        "s3_object",
+    ]
+    assert graph.impacted_modules([f"{PREFIX}.waiters", f"{PREFIX}.s3"], "s3_") == ["s3_object"]
+
+
+def test_closure_is_memoized() -> None:
+    """Test the closure of a python module is computed once."""
+    graph = ImportGraph(MODULES_IMPORT, UTILS_IMPORT)
+    assert graph.closure(f"{PREFIX}.core") == 0b0110
+    with patch.object(graph, "direct_utils", MagicMock()) as m_direct_utils:
+        assert graph.closure(f"{PREFIX}.core") == 0b0110
+        m_direct_utils.get.assert_not_called()
+        graph.clear_closures()
+        graph.closure(f"{PREFIX}.core")
+        m_direct_utils.get.assert_called()
+
+
+def create_collection(path: PosixPath, name: str, files: dict[str, str]) -> PosixPath:
+    """Create a collection on disk.
+
+    :param path: The path to the collection
+    :param name: The collection name
+    :param files: The content of the collection files
+    :returns: the path to the collection
+    """
+    namespace, collection = name.split(".")
+    path.mkdir()
+    (path / "galaxy.yml").write_text(f"namespace: {namespace}\nname: {collection}\n")
+    for file_name, content in files.items():
+        (path / file_name).parent.mkdir(parents=True, exist_ok=True)
+        (path / file_name).write_text(content)
+    return path
+
+
+def test_collections_import_graph(tmp_path: PosixPath) -> None:
+    """Test CollectionsImportGraph class with cross collections imports.
+
+    :param tmp_path: python temporary path fixture
+    """
+    amazon = create_collection(
+        tmp_path / "amazon",
+        "amazon.aws",
+        {
+            "plugins/modules/ec2_vpc.py": "from ..module_utils.ec2 import X\n",
+            "plugins/modules/s3_bucket.py": "from ..module_utils.s3 import X\n",
+            "plugins/module_utils/ec2.py": "from .core import X\n",
+            "plugins/module_utils/core.py": "import os\n",
+            "plugins/module_utils/s3.py": "import os\n",
+        },
+    )
+    community = create_collection(
+        tmp_path / "community",
+        "community.aws",
+        {
+            "plugins/modules/ec2_win_password.py": (
+                "from ansible_collections.amazon.aws.plugins.module_utils.ec2 import X\n"
+            ),
+            "plugins/modules/sns.py": "from ..module_utils.sns import X\n",
+            "plugins/module_utils/sns.py": (
+                "from ansible_collections.amazon.aws.plugins.module_utils.s3 import X\n"
+            ),
+        },
+    )
+
+    import_graph = CollectionsImportGraph([amazon, community])
+    with patch(
+        "list_changed_common.build_import_tree", wraps=build_import_tree
+    ) as m_build_import_tree:
+        collections = [Collection(p, import_graph) for p in (amazon, community)]
+        with patch.object(Collection, "add_target_to_plan") as m_add_target_to_plan:
+            for collection in collections:
+                collection.cover_module_utils([f"{PREFIX}.core", f"{PREFIX}.s3"])
+        # the graph is built once for all the collections
+        assert m_build_import_tree.call_count == 2
+    assert [c.args[0] for c in m_add_target_to_plan.call_args_list] == [
+        "ec2_vpc",
+        "s3_bucket",
+        "ec2_win_password",
+        "sns",
+    ]
+
+
+def test_collections_import_graph_plugins(tmp_path: PosixPath) -> None:
+    """Test CollectionsImportGraph class with plugins other than modules.
+
+    :param tmp_path: python temporary path fixture
+    """
+    amazon = create_collection(
+        tmp_path / "amazon",
+        "amazon.aws",
+        {
+            "plugins/modules/s3_object.py": "import os\n",
+            "plugins/action/s3_object.py": "from ..module_utils.s3 import X\n",
+            "plugins/inventory/aws_ec2.py": "from ..module_utils.ec2 import X\n",
+            "plugins/lookup/aws_account_attribute.py": "from ..plugin_utils.lookup import X\n",
+            "plugins/connection/aws_ssm.py": "import os\n",
+            "plugins/module_utils/s3.py": "from .botocore import X\n",
+            "plugins/module_utils/ec2.py": "from .botocore import X\n",
+            "plugins/module_utils/botocore.py": "import os\n",
+            "plugins/plugin_utils/lookup.py": (
+                "from ansible_collections.amazon.aws.plugins.module_utils.botocore import X\n"
+            ),
+        },
+    )
+
+    import_graph = CollectionsImportGraph([amazon])
+    assert import_graph.impacted_modules([f"{PREFIX}.botocore"], "amazon.aws") == [
+        "inventory_aws_ec2",
+        "lookup_aws_account_attribute",
+        "s3_object",
+    ]
+    assert import_graph.impacted_modules(
+        ["ansible_collections.amazon.aws.plugins.plugin_utils.lookup"], "amazon.aws"
+    ) == ["lookup_aws_account_attribute"]
+
+
+def test_filtered_closure() -> None:
+    """Test impacted_modules method from ImportGraph class with impacted importers only."""
+    graph = ImportGraph(MODULES_IMPORT, UTILS_IMPORT)
+    impacted = {"ec2_mod2", f"{PREFIX}.tagging"}
+    assert graph.impacted_modules(
+        [f"{PREFIX}.core", f"{PREFIX}.botocore"], is_impacted=lambda i, m: i in impacted
+    ) == ["ec2_mod2", "ec2_mod3"]
+    assert graph.impacted_modules(
+        [f"{PREFIX}.botocore"], is_impacted=lambda i, m: i == f"{PREFIX}.tagging"
+    ) == ["ec2_mod3"]
+    assert not graph.impacted_modules([f"{PREFIX}.core"], is_impacted=lambda i, m: False)
+
+
+def test_collections_import_graph_symbols(tmp_path: PosixPath) -> None:
+    """Test CollectionsImportGraph class only impacts the importers of the changed symbols.
+
+    :param tmp_path: python temporary path fixture
+    """
+    amazon = create_collection(
+        tmp_path / "amazon",
+        "amazon.aws",
+        {
+            "plugins/modules/ec2_vpc.py": "from ..module_utils.ec2 import describe_vpcs\n",
+            "plugins/modules/ec2_eni.py": "from ..module_utils.ec2 import describe_enis\n",
+            "plugins/modules/ec2_tag.py": "from ..module_utils import ec2\n",
+            "plugins/modules/s3_bucket.py": "from ..module_utils.s3 import S3\n",
+            "plugins/action/ec2_eni.py": "from ..module_utils.botocore import retry\n",
+            "plugins/module_utils/ec2.py": "from .botocore import retry\n",
+            "plugins/module_utils/s3.py": "from .botocore import paginate\n",
+            "plugins/module_utils/botocore.py": "import os\n",
+        },
+    )
+
+    import_graph = CollectionsImportGraph([amazon])
+    assert import_graph.imported_symbols("amazon.aws:ec2_eni", f"{PREFIX}.ec2") == {"describe_enis"}
+    assert import_graph.imported_symbols("amazon.aws:ec2_eni", f"{PREFIX}.botocore") == {"retry"}
+    assert import_graph.imported_symbols("amazon.aws:ec2_tag", f"{PREFIX}.ec2") is None
+    assert import_graph.imported_symbols(f"{PREFIX}.s3", f"{PREFIX}.botocore") == {"paginate"}
+
+    symbols = {f"{PREFIX}.ec2": {"describe_vpcs"}}  # type: Dict[str, Optional[Set[str]]]
+    assert import_graph.impacted_modules([f"{PREFIX}.ec2"], "amazon.aws", symbols) == [
+        "ec2_tag",
+        "ec2_vpc",
+    ]
+    symbols = {f"{PREFIX}.botocore": {"retry"}}
+    assert import_graph.impacted_modules([f"{PREFIX}.botocore"], "amazon.aws", symbols) == [
+        "ec2_eni",
+        "ec2_tag",
+        "ec2_vpc",
+    ]
+    symbols = {f"{PREFIX}.botocore": None}
+    assert import_graph.impacted_modules([f"{PREFIX}.botocore"], "amazon.aws", symbols) == [
+        "ec2_eni",
+        "ec2_tag",
+        "ec2_vpc",
+        "s3_bucket",
+    ]
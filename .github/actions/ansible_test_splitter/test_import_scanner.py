@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Contains tests cases for import_scanner module."""
+
+import ast
+
+from collections.abc import Sequence
+from unittest.mock import patch
+
+import pytest
+
+from import_scanner import scan_imports
+from import_scanner import walk_imports
+
+
+MY_MODULE = '''
+DOCUMENTATION = r"""
+module: my_module
+description:
+  - from this module import nothing
+"""
+EXAMPLES = \'\'\'
+import this_is_not_an_import
+\'\'\'
+import os, sys
+from .module_utils.core import (
+    AnsibleAWSModule,  # this comment contains a )
+    is_boto3_error_code,
+)
+from ..module_utils import \\
+    tagging
+try:
+    import botocore
+except ImportError:
+    pass  # Handled by AnsibleAWSModule
+
+message = "import nope"
+
+
+def main():
+    from ansible_collections.kubernetes.core.plugins.module_utils.common import K8sAnsibleMixin
+    import json; import re
+    raise ValueError("from") from None
+'''
+
+
+def dump(nodes: Sequence[ast.AST]) -> list[str]:
+    """Dump ast nodes.
+
+    :param nodes: list of ast nodes
+    :returns: the list of dumped nodes
+    """
+    return [ast.dump(n) for n in nodes]
+
+
+def test_scan_imports() -> None:
+    """Test scan_imports without falling back to ast."""
+    with patch("import_scanner.walk_imports") as m_walk_imports:
+        nodes = scan_imports(MY_MODULE)
+        m_walk_imports.assert_not_called()
+    assert sorted(dump(nodes)) == sorted(dump(walk_imports(MY_MODULE)))
+    assert [n.module if isinstance(n, ast.ImportFrom) else n.names[0].name for n in nodes] == [
+        "os",
+        "module_utils.core",
+        "module_utils",
+        "botocore",
+        "ansible_collections.kubernetes.core.plugins.module_utils.common",
+        "json",
+        "re",
+    ]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "if TYPE_CHECKING: import typing\nimport os\n",
+        "import os; x = 1\n",
+        "from a import (b\n",
+        "x = 'unterminated\nimport os\n",
+    ],
+)
+def test_scan_imports_fallback(content: str) -> None:
+    """Test scan_imports falls back to ast for ambiguous content.
+
+    :param content: python content
+    """
+    with patch("import_scanner.walk_imports") as m_walk_imports:
+        m_walk_imports.return_value = []
+        scan_imports(content)
+        m_walk_imports.assert_called_once_with(content)
+
+
+def test_scan_imports_without_import() -> None:
+    """Test scan_imports on a content without any import."""
+    assert not scan_imports('DOCUMENTATION = """\nmodule: a\n"""\n')
+
+
+def test_scan_imports_backslash_newline() -> None:
+    """Test scan_imports on string literals containing a backslash-newline."""
+    content = (
+        'DOCUMENTATION = r"""\\\nmodule: foo\n"""\n'
+        "EXAMPLES = '\\\nimport nope'\n"
+        "from ansible_collections.amazon.aws.plugins.module_utils.core import AnsibleAWSModule\n"
+    )
+    with patch("import_scanner.walk_imports") as m_walk_imports:
+        nodes = scan_imports(content)
+        m_walk_imports.assert_not_called()
+    assert dump(nodes) == dump(walk_imports(content))
+    assert len(nodes) == 1
@@ -3,24 +3,37 @@
 
 import io
 
+from collections.abc import Generator
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import PosixPath
 from typing import Any
+from typing import cast
 from unittest.mock import ANY
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
 import pytest
 
+from durations import DurationStore
+from git_diff import FileChange
+from import_resolver import ImportResolver
+from import_tree import ImportReader
+from import_tree import build_import_tree
+from import_tree import list_pyimport
 from list_changed_common import Collection
 from list_changed_common import ElGrandeSeparator
 from list_changed_common import WhatHaveChanged
-from list_changed_common import list_pyimport
 from list_changed_common import make_unique
 from list_changed_common import read_collection_name
 from list_changed_common import read_collections_to_test
 from list_changed_common import read_targets_to_test
 from list_changed_common import read_test_all_the_targets
 from list_changed_common import read_total_jobs
+from settings import read_test_results
+from settings import read_unclassified_changes
+from settings import read_workers
+from targets import AliasFlag
+from targets import TargetAliases
 
 
 MY_MODULE = """
@@ -55,6 +68,14 @@ import time
 import botocore.exceptions
 """
 
+MY_MODULE_4 = """
+import os, sys
+from . import transformations, waiters
+from ..botocore import is_boto3_error_code
+from ... import modules
+from ...module_utils.core import *
+"""
+
 
 def test_read_collection_name() -> None:
     """Test read_collection_name method."""
@@ -68,8 +89,8 @@ def test_read_collection_name() -> None:
 def test_list_pyimport() -> None:
     """Test list_pyimport."""
     assert list(list_pyimport("ansible_collections.amazon.aws.plugins.", "modules", MY_MODULE)) == [
-        "ansible_collections.amazon.aws.plugins.module_utils.core",
-        "ipaddress",
+        "ansible_collections.amazon.aws.plugins.module_utils.core.AnsibleAWSModule",
+        "ipaddress.ipaddress",
         "time",
         "botocore.exceptions",
     ]
@@ -78,18 +99,169 @@ def test_list_pyimport() -> None:
         list_pyimport("ansible_collections.kubernetes.core.plugins.", "modules", MY_MODULE_2)
     ) == [
         "ansible_collections.kubernetes.core.plugins.module_utils.k8sdynamicclient",
-        "ansible_collections.kubernetes.core.plugins.module_utils.common",
+        "ansible_collections.kubernetes.core.plugins.module_utils.common.K8sAnsibleMixin",
+        "ansible_collections.kubernetes.core.plugins.module_utils.common.get_api_client",
     ]
 
     assert list(
         list_pyimport("ansible_collections.amazon.aws.plugins.", "module_utils", MY_MODULE_3)
     ) == [
-        "ansible_collections.amazon.aws.plugins.module_utils.modules",
-        "ipaddress",
+        "ansible_collections.amazon.aws.plugins.module_utils.modules.AnsibleAWSModule",
+        "ipaddress.ipaddress",
         "time",
         "botocore.exceptions",
     ]
 
+    assert list(
+        list_pyimport("ansible_collections.amazon.aws.plugins.", "module_utils._s3", MY_MODULE_4)
+    ) == [
+        "os",
+        "sys",
+        "ansible_collections.amazon.aws.plugins.module_utils._s3.transformations",
+        "ansible_collections.amazon.aws.plugins.module_utils._s3.waiters",
+        "ansible_collections.amazon.aws.plugins.module_utils.botocore.is_boto3_error_code",
+        "ansible_collections.amazon.aws.plugins.modules",
+        "ansible_collections.amazon.aws.plugins.module_utils.core",
+    ]
+
+
+def test_build_import_tree_resolution(tmp_path: PosixPath) -> None:
+    """Test build_import_tree resolves imports to the collection files.
+
+    :param tmp_path: python temporary path fixture
+    """
+    files = {
+        "plugins/modules/s3_object.py": (
+            "from ..module_utils._s3 import transformations, waiters\n"
+            "from ..module_utils.botocore import is_boto3_error_code\n"
+        ),
+        "plugins/modules/ec2_vpc.py": (
+            "from ..module_utils import ec2, names\n"
+            "from ..module_utils.missing import M\n"
+            "from ansible_collections.amazon.aws.plugins.unknown import U\n"
+        ),
+        "plugins/module_utils/__init__.py": "",
+        "plugins/module_utils/ec2.py": "import os\n",
+        "plugins/module_utils/botocore/__init__.py": "from .retries import R\n",
+        "plugins/module_utils/botocore/retries.py": "import time\n",
+        "plugins/module_utils/_s3/transformations.py": "from ...module_utils import ec2\n",
+        "plugins/module_utils/_s3/waiters.py": "from ..botocore import retries\n",
+    }
+    for name, content in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(content)
+
+    prefix = "ansible_collections.amazon.aws.plugins.module_utils"
+    resolver = ImportResolver({"amazon.aws": tmp_path})
+    modules_import, utils_import = build_import_tree(
+        tmp_path, "amazon.aws", ["amazon.aws"], resolver=resolver
+    )
+    assert modules_import == {
+        "ec2_vpc": [f"{prefix}.ec2", prefix],
+        "s3_object": [
+            f"{prefix}._s3.transformations",
+            prefix,
+            f"{prefix}._s3.waiters",
+            f"{prefix}.botocore",
+        ],
+    }
+    assert utils_import == {
+        f"{prefix}.botocore": [f"{prefix}.botocore.retries", prefix],
+        f"{prefix}._s3.waiters": [f"{prefix}.botocore.retries", prefix, f"{prefix}.botocore"],
+        f"{prefix}._s3.transformations": [f"{prefix}.ec2", prefix],
+    }
+    assert resolver.unresolved == {
+        str(tmp_path / "plugins/modules/ec2_vpc.py"): {
+            f"{prefix}.missing.M",
+            "ansible_collections.amazon.aws.plugins.unknown.U",
+        },
+    }
+
+
+def create_collection_modules(path: PosixPath, count: int) -> None:
+    """Create a collection with modules importing module_utils.
+
+    :param path: The path to the collection
+    :param count: The number of modules to create
+    """
+    (path / "plugins" / "modules").mkdir(parents=True)
+    (path / "plugins" / "module_utils").mkdir(parents=True)
+    (path / "plugins" / "module_utils" / "core.py").write_text("from .waiters import W\n")
+    (path / "plugins" / "module_utils" / "waiters.py").write_text("import time\n")
+    (path / "plugins" / "modules" / "broken.py").write_text("import (\n")
+    for i in range(count):
+        (path / "plugins" / "modules" / f"mod_{i}.py").write_text(
+            MY_MODULE if i % 2 else "from ..module_utils.waiters import W\n"
+        )
+
+
+@patch("import_tree.MIN_PARALLEL_FILES", 1)
+def test_build_import_tree_parallel(tmp_path: PosixPath) -> None:
+    """Test that parsing files with a pool of processes gives the same result.
+
+    :param tmp_path: python temporary path fixture
+    """
+    create_collection_modules(tmp_path, 10)
+    serial = build_import_tree(
+        tmp_path, "amazon.aws", ["amazon.aws"], reader=ImportReader(workers=1)
+    )
+    parallel = build_import_tree(
+        tmp_path, "amazon.aws", ["amazon.aws"], reader=ImportReader(workers=3)
+    )
+    assert serial == parallel
+    assert list(serial[0]) == list(parallel[0])
+    assert serial[0]["mod_1"] == ["ansible_collections.amazon.aws.plugins.module_utils.core"]
+    assert serial[1] == {
+        "ansible_collections.amazon.aws.plugins.module_utils.core": [
+            "ansible_collections.amazon.aws.plugins.module_utils.waiters"
+        ]
+    }
+
+    with patch("import_tree.ProcessPoolExecutor") as m_executor:
+        m_executor.side_effect = OSError("no semaphore")
+        assert (
+            build_import_tree(
+                tmp_path, "amazon.aws", ["amazon.aws"], reader=ImportReader(workers=3)
+            )
+            == serial
+        )
+
+    def _broken_map(*args: Any, **_: Any) -> Generator[list[str], None, None]:
+        # the first file is parsed, then a worker dies
+        yield args[0](args[1][0], args[2][0], args[3][0])
+        raise BrokenProcessPool("a worker died")
+
+    with patch("import_tree.ProcessPoolExecutor") as m_executor:
+        m_executor.return_value.__enter__.return_value.map.side_effect = _broken_map
+        assert (
+            build_import_tree(
+                tmp_path, "amazon.aws", ["amazon.aws"], reader=ImportReader(workers=3)
+            )
+            == serial
+        )
+
+
+def test_extract_pyimports(tmp_path: PosixPath) -> None:
+    """Test extract method from ImportReader class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    mod = tmp_path / "mod.py"
+    mod.write_text(MY_MODULE_3)
+    broken = tmp_path / "broken.py"
+    broken.write_text("def (")
+    assert ImportReader().extract(
+        [(mod, "module_utils"), (broken, "modules")], "ansible_collections.amazon.aws.plugins."
+    ) == {
+        mod: [
+            "ansible_collections.amazon.aws.plugins.module_utils.modules.AnsibleAWSModule",
+            "ipaddress.ipaddress",
+            "time",
+            "botocore.exceptions",
+        ],
+        broken: [],
+    }
+
 
 @patch("list_changed_common.read_collection_name")
 def test_what_changed_files(m_read_collection_name: MagicMock) -> None:
@@ -102,6 +274,7 @@ def test_what_changed_files(m_read_collection_name: MagicMock) -> None:
     whc.files = [
         PosixPath("tests/something"),
         PosixPath("plugins/module_utils/core.py"),
+        PosixPath("plugins/module_utils/botocore/__init__.py"),
         PosixPath("plugins/plugin_utils/base.py"),
         PosixPath("plugins/connection/aws_ssm.py"),
         PosixPath("plugins/modules/ec2.py"),
@@ -109,6 +282,7 @@ def test_what_changed_files(m_read_collection_name: MagicMock) -> None:
         PosixPath("tests/integration/targets/k8s_target_1/action.yaml"),
         PosixPath("tests/integration/targets/k8s_target_2/file.txt"),
         PosixPath("tests/integration/targets/k8s_target_3/tasks/main.yaml"),
+        PosixPath("meta/runtime.yml"),
     ]
     assert list(whc.modules()) == [PosixPath("plugins/modules/ec2.py")]
     assert list(whc.plugin_utils()) == [
@@ -121,7 +295,11 @@ def test_what_changed_files(m_read_collection_name: MagicMock) -> None:
         (
             PosixPath("plugins/module_utils/core.py"),
             "ansible_collections.a.b.plugins.module_utils.core",
-        )
+        ),
+        (
+            PosixPath("plugins/module_utils/botocore/__init__.py"),
+            "ansible_collections.a.b.plugins.module_utils.botocore",
+        ),
     ]
     assert list(whc.lookup()) == [PosixPath("plugins/lookup/aws_test.py")]
     assert list(whc.targets()) == [
@@ -130,6 +308,7 @@ def test_what_changed_files(m_read_collection_name: MagicMock) -> None:
         "k8s_target_3",
     ]
     assert list(whc.connection()) == [PosixPath("plugins/connection/aws_ssm.py")]
+    assert whc.unclassified() == [PosixPath("tests/something"), PosixPath("meta/runtime.yml")]
 
 
 def build_collection(aliases: list[Any]) -> Collection:
@@ -188,6 +367,72 @@ def test_c_targets(tmp_path: PosixPath) -> None:
     assert list(mycollection.targets())[0].execution_time() == 30
 
 
+def test_c_learned_durations(tmp_path: PosixPath) -> None:
+    """Test use_learned_durations method from Collection class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    mycollection = build_collection(
+        [
+            create_test_content(tmp_path / "a", "time=30\n"),
+            create_test_content(tmp_path / "b", "slow\n"),
+            create_test_content(tmp_path / "c"),
+        ]
+    )
+    mycollection.cover_all()
+    durations = DurationStore()
+    durations.record("some.collection", {"a": 400.4, "b": 12})
+    durations.record("another.collection", {"c": 60})
+    mycollection.use_learned_durations(durations)
+    assert [t.execution_time() for t in mycollection.test_plan] == [400, 12, 180]
+
+
+def test_c_setup_costs(tmp_path: PosixPath) -> None:
+    """Test setup_costs method from Collection class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    mycollection = build_collection(
+        [
+            create_test_content(tmp_path / "a", "cloud/aws\nneeds/target/setup_a\n"),
+            create_test_content(tmp_path / "b", "needs/target/setup_a\nneeds/target/setup_b\n"),
+            create_test_content(tmp_path / "c"),
+            create_test_content(tmp_path / "setup_a", "hidden\ntime=2m\n"),
+        ]
+    )
+    mycollection.cover_all()
+    assert mycollection.setup_costs() == {
+        "a": {"cloud/aws": 30, "needs/target/setup_a": 120},
+        "b": {"needs/target/setup_a": 120, "needs/target/setup_b": 60},
+    }
+
+
+def test_target_aliases() -> None:
+    """Test TargetAliases class."""
+    aliases = TargetAliases(
+        [
+            "cloud/aws",
+            "slow",
+            "unstable",
+            "time=5m",
+            "needs/target/setup_ec2_facts",
+            "needs/target/setup_botocore_pip",
+            "ec2_instance",
+            "role/ec2_setup",
+        ]
+    )
+    assert aliases.flags == AliasFlag.SLOW | AliasFlag.UNSTABLE
+    assert aliases.time == 300
+    assert aliases.cloud == "aws"
+    assert aliases.needs_targets == ("setup_ec2_facts", "setup_botocore_pip")
+    assert aliases.others == ("ec2_instance", "role/ec2_setup")
+
+    aliases = TargetAliases(["time=140s", "hidden", "time=20"])
+    assert aliases.flags == AliasFlag.HIDDEN
+    assert aliases.time == 20
+    assert aliases.cloud is None
+
+
 def test_2_targets_for_one_module(tmp_path: PosixPath) -> None:
     """Test 2 targets.
 
@@ -203,6 +448,65 @@ def test_2_targets_for_one_module(tmp_path: PosixPath) -> None:
     assert collection.regular_targets_to_test() == ["a", "b"]
 
 
+def test_c_target_index(tmp_path: PosixPath) -> None:
+    """Test the collection targets are listed and read once.
+
+    :param tmp_path: python temporary path fixture
+    """
+    a = tmp_path / "a"
+    b = tmp_path / "b"
+    c = tmp_path / "c"
+    collection = build_collection(
+        [
+            create_test_content(a, "ec2_instance\ncloud/aws\n"),
+            create_test_content(b, "ec2_instance\na\n"),
+            create_test_content(c, "disabled\nec2_instance\n"),
+        ]
+    )
+    index = collection.target_index
+    target = index.get("a")
+    assert target is not None and target.name == "a"
+    assert index.get("ec2_instance") is None
+    assert [t.name for t in index.aliases_of("ec2_instance")] == ["a", "b", "c"]
+    assert [t.name for t in index.aliases_of("a")] == ["a", "b"]
+    assert not index.aliases_of("unknown")
+
+    collection.add_target_to_plan("modules_ec2_instance")
+    collection.add_target_to_plan("a")
+    collection.add_target_to_plan("b")
+    collection.cover_all()
+    assert collection.test_plan_names == ["a", "b"]
+    cast(MagicMock, collection.collection_path).glob.assert_called_once_with(
+        "tests/integration/targets/*"
+    )
+
+
+def test_c_dependents(tmp_path: PosixPath) -> None:
+    """Test the targets needing a changed target are added to the plan.
+
+    :param tmp_path: python temporary path fixture
+    """
+    collection = build_collection(
+        [
+            create_test_content(tmp_path / "setup_a", "hidden\nneeds/target/setup_b\n"),
+            create_test_content(tmp_path / "setup_b", "hidden\nneeds/target/setup_a\n"),
+            create_test_content(tmp_path / "a", "needs/target/setup_a\n"),
+            create_test_content(tmp_path / "b", "needs/target/setup_b\n"),
+            create_test_content(tmp_path / "c", "disabled\nneeds/target/setup_a\n"),
+            create_test_content(tmp_path / "d", "needs/target/a\n"),
+            create_test_content(tmp_path / "e"),
+        ]
+    )
+    index = collection.target_index
+    assert [t.name for t in index.dependents_of("setup_a")] == ["setup_b", "a", "c", "b", "d"]
+    assert not index.dependents_of("e")
+
+    collection.add_target_to_plan("setup_a")
+    assert not collection.test_plan_names
+    collection.add_dependents_to_plan("setup_a")
+    assert collection.test_plan_names == ["a", "b", "d"]
+
+
 @patch("list_changed_common.read_collection_name")
 def test_c_disabled_unstable(tmp_path: PosixPath) -> None:
     """Test disable/unstable targets.
@@ -338,24 +642,111 @@ def test_splitter_with_time(tmp_path: PosixPath) -> None:
     assert result == [("slot0", ["a0"]), ("slot1", ["b0"]), ("slot2", ["d0", "c0"])]
 
 
+def test_splitter_with_makespan_budget(tmp_path: PosixPath) -> None:
+    """Test ElGrandeSeparator uses the smallest number of jobs fitting the makespan budget.
+
+    :param tmp_path: python temporary path fixture
+    """
+    collection = build_collection(
+        [
+            create_test_content(tmp_path / "a", "time=10m\n"),
+            create_test_content(tmp_path / "b", "time=5m\n"),
+            create_test_content(tmp_path / "c", "time=5m\n"),
+        ]
+    )
+    collection.cover_all()
+    egs = ElGrandeSeparator([collection], 3, makespan_budget=600)
+    result = egs.output()
+    assert result["jobs"] == '["some.collection-1", "some.collection-2"]'
+    assert result["raw"] == "some.collection-1:a;some.collection-2:b,c"
+
+
+def test_splitter_with_shared_jobs(tmp_path: PosixPath) -> None:
+    """Test ElGrandeSeparator shares the jobs between the collections.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "one").mkdir()
+    (tmp_path / "two").mkdir()
+    collection_1 = build_collection(
+        [
+            create_test_content(tmp_path / "one" / "a", "time=10m\n"),
+            create_test_content(tmp_path / "one" / "b", "time=10m\n"),
+            create_test_content(tmp_path / "one" / "c", "time=10m\n"),
+        ]
+    )
+    collection_2 = build_collection([create_test_content(tmp_path / "two" / "d", "time=1m\n")])
+    collection_2.collection_name = "another.collection"
+    for collection in (collection_1, collection_2):
+        collection.cover_all()
+    egs = ElGrandeSeparator([collection_1, collection_2], 3, shared_jobs=True)
+    assert egs.output()["raw"] == "some.collection-1:a,c;some.collection-2:b;another.collection-1:d"
+
+
 @patch("list_changed_common.read_collection_name")
-@patch("list_changed_common.run_command")
-def test_what_changed_git_call(m_run_command: MagicMock, m_read_collection_name: MagicMock) -> None:
+@patch("list_changed_common.list_changes")
+def test_what_changed_git_call(
+    m_list_changes: MagicMock, m_read_collection_name: MagicMock
+) -> None:
     """Test changed_files method from WhatHaveChanged class.
 
-    :param m_run_command: run_command patched method
+    :param m_list_changes: list_changes patched method
     :param m_read_collection_name: read_collection_name patched method
     """
-    m_run_command.return_value = "plugins/modules/foo.py\n"
+    m_list_changes.return_value = {
+        PosixPath("a"): [
+            FileChange("M", PosixPath("plugins/modules/foo.py")),
+            FileChange(
+                "R", PosixPath("plugins/modules/bar.py"), PosixPath("plugins/modules/baz.py")
+            ),
+        ]
+    }
     m_read_collection_name.return_value = "a.b"
 
     whc = WhatHaveChanged(PosixPath("a"), "stable-2.1")
-    assert whc.changed_files() == [PosixPath("plugins/modules/foo.py")]
+    assert whc.changed_files() == [
+        PosixPath("plugins/modules/foo.py"),
+        PosixPath("plugins/modules/bar.py"),
+        PosixPath("plugins/modules/baz.py"),
+    ]
+    m_list_changes.assert_called_once_with([PosixPath("a")], "stable-2.1", "")
 
-    m_run_command.assert_called_with(
-        command="git diff origin/stable-2.1 --name-only",
-        chdir=PosixPath("a"),
-    )
+    whc = WhatHaveChanged(PosixPath("a"), "stable-2.1", [FileChange("D", PosixPath("README.md"))])
+    assert whc.changed_files() == [PosixPath("README.md")]
+    m_list_changes.assert_called_once()
+
+
+@patch("list_changed_common.read_collection_name")
+@patch("list_changed_common.is_doc_only")
+def test_what_changed_doc_only(m_is_doc_only: MagicMock, m_read_collection_name: MagicMock) -> None:
+    """Test WhatHaveChanged class leaves out the documentation only changes.
+
+    :param m_is_doc_only: is_doc_only patched method
+    :param m_read_collection_name: read_collection_name patched method
+    """
+    m_read_collection_name.return_value = "a.b"
+    m_is_doc_only.side_effect = lambda path, change, base_ref, head_ref: change.path.stem == "foo"
+    changes = [
+        FileChange("M", PosixPath("plugins/modules/foo.py")),
+        FileChange("M", PosixPath("plugins/modules/bar.py")),
+        FileChange("M", PosixPath("plugins/doc_fragments/foo.py")),
+        FileChange("M", PosixPath("plugins/doc_fragments/baz.py")),
+    ]
+
+    whc = WhatHaveChanged(PosixPath("a"), "main", changes, "refs/pull/1/head")
+    whc.skip_doc_only()
+    assert list(whc.modules()) == [PosixPath("plugins/modules/bar.py")]
+    assert whc.doc_only() == [
+        PosixPath("plugins/modules/foo.py"),
+        PosixPath("plugins/doc_fragments/foo.py"),
+    ]
+    assert whc.unclassified() == [PosixPath("plugins/doc_fragments/baz.py")]
+    m_is_doc_only.assert_any_call(PosixPath("a"), changes[0], "main", "refs/pull/1/head")
+
+    whc = WhatHaveChanged(PosixPath("a"), "main", changes)
+    assert len(list(whc.modules())) == 2
+    assert not whc.doc_only()
+    assert len(whc.unclassified()) == 2
 
 
 def test_make_unique() -> None:
@@ -406,6 +797,55 @@ def test_read_total_jobs(monkeypatch: pytest.MonkeyPatch) -> None:
     assert read_total_jobs() == 5
 
 
+def test_read_unclassified_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test read_unclassified_changes function.
+
+    :param monkeypatch: monkey patch
+    """
+    assert read_unclassified_changes() == "ignore"
+
+    monkeypatch.setenv("UNCLASSIFIED_CHANGES", "All")
+    assert read_unclassified_changes() == "all"
+
+    monkeypatch.setenv("UNCLASSIFIED_CHANGES", "something")
+    assert read_unclassified_changes() == "ignore"
+
+
+def test_read_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test read_workers function.
+
+    :param monkeypatch: monkey patch
+    """
+    monkeypatch.setattr("os.cpu_count", lambda: 4)
+    assert read_workers() == 4
+
+    monkeypatch.setenv("SPLITTER_WORKERS", "any")
+    assert read_workers() == 4
+
+    monkeypatch.setenv("SPLITTER_WORKERS", "0")
+    assert read_workers() == 1
+
+    monkeypatch.setenv("SPLITTER_WORKERS", "2")
+    assert read_workers() == 2
+
+
+def test_read_test_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test read_test_results function.
+
+    :param monkeypatch: monkey patch
+    """
+    assert not read_test_results()
+
+    monkeypatch.setenv(
+        "TEST_RESULTS",
+        "amazon.aws:results/a;amazon.aws:results/b\ncommunity.aws:results/c\ninvalid",
+    )
+    assert read_test_results() == {
+        "amazon.aws": [PosixPath("results/a"), PosixPath("results/b")],
+        "community.aws": [PosixPath("results/c")],
+    }
+
+
 def test_read_targets_to_test(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test read_targets_to_test function.
 
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Contains tests cases for phase_timings module."""
+
+import json
+
+from pathlib import PosixPath
+
+import pytest
+
+from phase_timings import Profiler
+
+
+def test_profiler(tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test Profiler class.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    """
+    clock = iter([0.0, 1.0, 3.0, 4.0, 10.0, 10.5])
+    monkeypatch.setattr("time.perf_counter", lambda: next(clock))
+
+    profiler = Profiler()
+    with profiler.phase("resolution"):
+        profiler.files_read(2)
+        with profiler.phase("import_graph"):
+            profiler.files_read(10)
+    with profiler.phase("resolution"):
+        pass
+    profiler.files_read()
+
+    assert profiler.report() == {
+        "phases": {
+            "resolution": {"seconds": 2.5, "calls": 2, "files_read": 2},
+            "import_graph": {"seconds": 2.0, "calls": 1, "files_read": 10},
+            "other": {"seconds": 0.0, "calls": 0, "files_read": 1},
+        },
+        "total_seconds": 4.5,
+    }
+
+    summary = tmp_path / "summary.md"
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(summary))
+    profiler.write(tmp_path / "timings.json")
+    assert json.loads((tmp_path / "timings.json").read_text()) == profiler.report()
+    assert "| import_graph | 2.000 | 1 | 10 |" in summary.read_text()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Contains tests cases for plan_cache module."""
+
+from pathlib import PosixPath
+from unittest.mock import patch
+
+import pytest
+
+from conftest import GitRepository
+from list_changed_targets import ListChangedTargets
+from plan_cache import PlanCache
+from plan_cache import list_files
+from plan_cache import plan_key
+
+
+def test_plan_cache(tmp_path: PosixPath) -> None:
+    """Test PlanCache class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    store = PlanCache(tmp_path)
+    key = plan_key({"revisions": [["a", "b"]], "total_jobs": 2})
+    assert key == plan_key({"total_jobs": 2, "revisions": [["a", "b"]]})
+    assert key != plan_key({"revisions": [["a", "b"]], "total_jobs": 3})
+    store.record(key, {"raw": "some.collection-1:a"}, now=1.0)
+    store.save()
+    assert PlanCache(tmp_path).get(key) == {"raw": "some.collection-1:a"}
+    assert PlanCache(tmp_path).get("other") is None
+    store.plans["invalid"] = {"time": 1.0, "result": {"raw": 1}}
+    assert store.get("invalid") is None
+
+    with patch("plan_cache.MAX_PLANS", 2):
+        store.record("b", {}, now=2.0)
+        store.record("c", {}, now=3.0)
+        store.save()
+    assert sorted(PlanCache(tmp_path).plans) == ["b", "c"]
+
+    (tmp_path / "plan_cache.json").write_text("{")
+    assert not PlanCache(tmp_path).plans
+
+
+def test_list_files(tmp_path: PosixPath) -> None:
+    """Test list_files function.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "b.json").write_text("{}")
+    (tmp_path / "a.xml").write_text("")
+    assert list_files([tmp_path / "data", tmp_path / "a.xml", tmp_path / "missing"]) == [
+        tmp_path / "a.xml",
+        tmp_path / "data" / "b.json",
+    ]
+
+
+def test_run_plan_cache(
+    tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch, git_repo: GitRepository
+) -> None:
+    """Test ListChangedTargets.run reuses the plan computed for the same inputs.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    :param git_repo: git repository fixture
+    """
+    (tmp_path / "galaxy.yml").write_text("namespace: some\nname: collection\n")
+    (tmp_path / "plugins" / "modules").mkdir(parents=True)
+    for name in ("a", "b"):
+        (tmp_path / "plugins" / "modules" / f"{name}.py").write_text(f"# {name}\n")
+        (tmp_path / "tests" / "integration" / "targets" / name).mkdir(parents=True)
+        (tmp_path / "tests" / "integration" / "targets" / name / "aliases").write_text("\n")
+    git_repo.commit_base()
+    (tmp_path / "plugins" / "modules" / "a.py").write_text("changed = True\n")
+    git_repo.run("commit", "-q", "-a", "-m", "change a")
+
+    monkeypatch.setenv("COLLECTIONS_TO_TEST", str(tmp_path))
+    monkeypatch.setenv("TOTAL_JOBS", "2")
+    monkeypatch.setenv("PULL_REQUEST_BASE_REF", "main")
+    monkeypatch.setenv("SPLITTER_CACHE_DIR", str(tmp_path.parent / f"{tmp_path.name}_cache"))
+    monkeypatch.setenv("PLAN_CACHE", "true")
+    monkeypatch.delenv("PULL_REQUEST_BODY", raising=False)
+    result = ListChangedTargets().run()
+    assert result["raw"] == "some.collection-1:a"
+
+    with patch.object(ListChangedTargets, "plan") as plan:
+        assert ListChangedTargets().run() == result
+        plan.assert_not_called()
+
+    # the stores learned from are part of the key
+    splitter = ListChangedTargets()
+    key = splitter.plan_key()
+    assert splitter.caches.durations.store_file is not None
+    splitter.caches.durations.store_file.write_text('{"version": 1, "collections": {}}')
+    assert splitter.plan_key() not in (None, key)
+
+    # another setting, another plan
+    monkeypatch.setenv("PULL_REQUEST_BODY", "TargetsToTest=some.collection:b")
+    assert ListChangedTargets().run()["raw"] == "some.collection-1:b"
+
+    # a new head commit
+    monkeypatch.delenv("PULL_REQUEST_BODY")
+    (tmp_path / "plugins" / "modules" / "b.py").write_text("changed = True\n")
+    splitter = ListChangedTargets()
+    assert splitter.plan_key() is None
+    git_repo.run("commit", "-q", "-a", "-m", "change b")
+    assert ListChangedTargets().run()["raw"] == "some.collection-1:a;some.collection-2:b"
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Contains tests cases for result_cache module."""
+
+import json
+
+from pathlib import PosixPath
+from typing import cast
+from unittest.mock import patch
+
+import pytest
+
+from coverage_index import CoverageIndex
+from git_diff import FileChange
+from list_changed_common import Collection
+from list_changed_common import CollectionsImportGraph
+from list_changed_targets import ListChangedTargets
+from result_cache import ContentHasher
+from result_cache import ResultCache
+from result_cache import read_passed_hashes
+from targets import Target
+
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+  <testsuite name="ec2_vpc" tests="1" failures="0" errors="0" time="12.5"/>
+  <testsuite name="ec2_eni" tests="1" failures="1" errors="0" time="3"/>
+</testsuites>
+"""
+
+
+def test_read_passed_hashes(tmp_path: PosixPath) -> None:
+    """Test read_passed_hashes function pairs the passed targets with their hash.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "junit.xml").write_text(JUNIT)
+    (tmp_path / "integration-2024.json").write_text(
+        json.dumps({"targets": {"s3_bucket": {"run_time_seconds": 10}}})
+    )
+    (tmp_path / "target_hashes.json").write_text(
+        json.dumps(
+            {
+                "amazon.aws": {"ec2_vpc": "a", "ec2_eni": "b", "s3_bucket": "c", "iam": "d"},
+                "community.aws": {"sns": "e"},
+            }
+        )
+    )
+    assert read_passed_hashes([tmp_path], "amazon.aws") == {"ec2_vpc": "a", "s3_bucket": "c"}
+    assert not read_passed_hashes([tmp_path], "community.aws")
+
+
+def test_result_cache(tmp_path: PosixPath) -> None:
+    """Test ResultCache class.
+
+    :param tmp_path: python temporary path fixture
+    """
+    store = ResultCache(tmp_path)
+    store.record("amazon.aws", {"ec2_vpc": "a", "s3_bucket": "c"}, now=1000.0)
+    store.record("amazon.aws", {"ec2_vpc": "b"}, now=90000.0)
+    store.save()
+
+    store = ResultCache(tmp_path)
+    assert store.passed("amazon.aws", "ec2_vpc", "a")
+    assert store.passed("amazon.aws", "ec2_vpc", "b")
+    assert not store.passed("amazon.aws", "ec2_vpc", "c")
+    assert not store.passed("community.aws", "ec2_vpc", "a")
+
+    store.prune(max_age_days=1, now=90000.0 + 3600)
+    assert not store.passed("amazon.aws", "ec2_vpc", "a")
+    assert not store.passed("amazon.aws", "s3_bucket", "c")
+    assert store.passed("amazon.aws", "ec2_vpc", "b")
+
+    for i in range(10):
+        store.record("amazon.aws", {"ec2_vpc": str(i)}, now=100000.0 + i)
+    assert sorted(store.collections["amazon.aws"]["ec2_vpc"]) == ["5", "6", "7", "8", "9"]
+
+    (tmp_path / "results.json").write_text("{")
+    assert not ResultCache(tmp_path).collections
+
+
+def test_content_hasher(tmp_path: PosixPath) -> None:
+    """Test ContentHasher class hashes the files names and content.
+
+    :param tmp_path: python temporary path fixture
+    """
+    (tmp_path / "a").write_text("a")
+    (tmp_path / "b").write_text("b")
+    hasher = ContentHasher()
+    reference = hasher.hash(tmp_path, [tmp_path / "a", tmp_path / "b"])
+    assert hasher.hash(tmp_path, [tmp_path / "b", tmp_path / "a", tmp_path / "a"]) == reference
+    assert hasher.hash(tmp_path, [tmp_path / "a"]) != reference
+    assert ContentHasher().hash(tmp_path / "..", [tmp_path / "a", tmp_path / "b"]) != reference
+
+
+def test_skip_cached_passes(tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test ListChangedTargets skips the targets which passed with the same dependencies.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    """
+    (tmp_path / "galaxy.yml").write_text("namespace: amazon\nname: aws\n")
+    (tmp_path / "plugins" / "modules").mkdir(parents=True)
+    (tmp_path / "plugins" / "module_utils").mkdir(parents=True)
+    (tmp_path / "plugins" / "module_utils" / "ec2.py").write_text("RETRIES = 3\n")
+    (tmp_path / "plugins" / "module_utils" / "s3.py").write_text("RETRIES = 3\n")
+    (tmp_path / "plugins" / "modules" / "ec2_vpc.py").write_text(
+        "from ansible_collections.amazon.aws.plugins.module_utils.ec2 import RETRIES\n"
+    )
+    (tmp_path / "plugins" / "modules" / "s3_bucket.py").write_text(
+        "from ansible_collections.amazon.aws.plugins.module_utils.s3 import RETRIES\n"
+    )
+    targets = tmp_path / "tests" / "integration" / "targets"
+    for name in ("ec2_vpc", "s3_bucket", "setup_ec2"):
+        (targets / name / "tasks").mkdir(parents=True)
+        (targets / name / "tasks" / "main.yml").write_text("- ping:\n")
+    (targets / "ec2_vpc" / "aliases").write_text("needs/target/setup_ec2\n")
+    (targets / "setup_ec2" / "aliases").write_text("hidden\n")
+    monkeypatch.setenv("COLLECTIONS_TO_TEST", str(tmp_path))
+    monkeypatch.setenv("RESULT_CACHE", "true")
+    monkeypatch.setenv("SPLITTER_CACHE_DIR", str(tmp_path / "cache"))
+
+    def _plan() -> tuple[list[str], dict[str, str]]:
+        splitter = ListChangedTargets()
+        collection = Collection(tmp_path, splitter.import_graph)
+        collection.cover_all()
+        hashes, cached = splitter.skip_cached_passes([collection])
+        # the hashes are kept for the targets left to test only
+        tested = cached.get("amazon.aws", []) + list(hashes["amazon.aws"])
+        assert sorted(tested) == ["ec2_vpc", "s3_bucket"]
+        return collection.test_plan_names, hashes["amazon.aws"]
+
+    plan, hashes = _plan()
+    assert sorted(plan) == ["ec2_vpc", "s3_bucket"]
+    passed = ListChangedTargets().caches.results
+    passed.record("amazon.aws", hashes)
+    passed.save()
+    assert not _plan()[0]
+
+    # the module_utils imported by ec2_vpc changed
+    (tmp_path / "plugins" / "module_utils" / "ec2.py").write_text("RETRIES = 4\n")
+    plan, new_hashes = _plan()
+    assert plan == ["ec2_vpc"]
+    assert new_hashes["ec2_vpc"] != hashes["ec2_vpc"]
+
+    # the target needed by ec2_vpc changed
+    (tmp_path / "plugins" / "module_utils" / "ec2.py").write_text("RETRIES = 3\n")
+    assert not _plan()[0]
+    (targets / "setup_ec2" / "tasks" / "main.yml").write_text("- debug:\n")
+    assert _plan()[0] == ["ec2_vpc"]
+
+
+def test_skip_cached_passes_coverage(tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test ListChangedTargets tests again a target covering a changed file.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    """
+    (tmp_path / "galaxy.yml").write_text("namespace: amazon\nname: aws\n")
+    (tmp_path / "plugins" / "modules").mkdir(parents=True)
+    (tmp_path / "plugins" / "modules" / "ec2_a.py").write_text("A = 1\n")
+    (tmp_path / "plugins" / "modules" / "ec2_b.py").write_text("B = 1\n")
+    (tmp_path / "tests" / "integration" / "targets" / "ec2_a").mkdir(parents=True)
+    (tmp_path / "tests" / "integration" / "targets" / "ec2_a" / "aliases").write_text("\n")
+    monkeypatch.setenv("COLLECTIONS_TO_TEST", str(tmp_path))
+    monkeypatch.setenv("RESULT_CACHE", "true")
+    monkeypatch.setenv("TARGET_SELECTION", "coverage")
+    monkeypatch.setenv("DOC_ONLY_CHANGES", "test")
+    monkeypatch.setenv("SPLITTER_CACHE_DIR", str(tmp_path / "cache"))
+    index = CoverageIndex(tmp_path / "cache")
+    index.record("amazon.aws", {"amazon.aws:plugins/modules/ec2_b.py": {"ec2_a"}})
+    index.save()
+
+    def _plan() -> dict[str, str]:
+        changes = {tmp_path: [FileChange("M", PosixPath("plugins/modules/ec2_b.py"))]}
+        with patch("list_changed_targets.list_changes", return_value=changes):
+            return ListChangedTargets().plan()
+
+    result = _plan()
+    assert result["raw"] == "amazon.aws-1:ec2_a"
+    passed = ListChangedTargets().caches.results
+    passed.record("amazon.aws", json.loads(result["hashes"])["amazon.aws"])
+    passed.save()
+    assert _plan()["raw"] == ""
+
+    # the file covered by ec2_a changed again
+    (tmp_path / "plugins" / "modules" / "ec2_b.py").write_text("B = 2\n")
+    assert _plan()["raw"] == "amazon.aws-1:ec2_a"
+
+
+def test_skip_cached_passes_explicit(tmp_path: PosixPath, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test ListChangedTargets tests the targets to test and all the targets, even when they passed.
+
+    :param tmp_path: python temporary path fixture
+    :param monkeypatch: monkey patch
+    """
+    (tmp_path / "galaxy.yml").write_text("namespace: amazon\nname: aws\n")
+    (tmp_path / "plugins" / "modules").mkdir(parents=True)
+    (tmp_path / "plugins" / "modules" / "ec2_a.py").write_text("A = 1\n")
+    (tmp_path / "tests" / "integration" / "targets" / "ec2_a").mkdir(parents=True)
+    (tmp_path / "tests" / "integration" / "targets" / "ec2_a" / "aliases").write_text("\n")
+    monkeypatch.setenv("COLLECTIONS_TO_TEST", str(tmp_path))
+    monkeypatch.setenv("RESULT_CACHE", "true")
+    monkeypatch.setenv("DOC_ONLY_CHANGES", "test")
+    monkeypatch.setenv("SPLITTER_CACHE_DIR", str(tmp_path / "cache"))
+
+    changes = {tmp_path: [FileChange("M", PosixPath("plugins/modules/ec2_a.py"))]}
+    with patch("list_changed_targets.list_changes", return_value=changes):
+        result = ListChangedTargets().plan()
+        assert result["raw"] == "amazon.aws-1:ec2_a"
+        passed = ListChangedTargets().caches.results
+        passed.record("amazon.aws", json.loads(result["hashes"])["amazon.aws"])
+        passed.save()
+        assert ListChangedTargets().plan()["raw"] == ""
+
+    result = ListChangedTargets().plan(targets_to_test={"amazon.aws": ["ec2_a"]})
+    assert result["raw"] == "amazon.aws-1:ec2_a"
+    assert json.loads(result["cached"]) == {}
+    assert list(json.loads(result["hashes"])["amazon.aws"]) == ["ec2_a"]
+
+    monkeypatch.setenv("ANSIBLE_TEST_ALL_THE_TARGETS", "true")
+    assert ListChangedTargets().plan()["raw"] == "amazon.aws-1:ec2_a"
+
+
+def test_dependency_files_by_name(tmp_path: PosixPath) -> None:
+    """Test Collection.dependency_files lists the files selecting a target by name.
+
+    :param tmp_path: python temporary path fixture
+    """
+    amazon, community = tmp_path / "amazon", tmp_path / "community"
+    for path, name in ((amazon, "aws"), (community, "community")):
+        (path / "plugins" / "modules").mkdir(parents=True)
+        (path / "galaxy.yml").write_text(f"namespace: {path.name}\nname: {name}\n")
+    (amazon / "plugins" / "module_utils").mkdir()
+    (amazon / "plugins" / "module_utils" / "ec2.py").write_text("A = 1\n")
+    (amazon / "plugins" / "modules" / "ec2_vpc.py").write_text("A = 1\n")
+    (community / "plugins" / "modules" / "ec2_vpc.py").write_text("A = 1\n")
+    targets = amazon / "tests" / "integration" / "targets"
+    for name in ("ec2_vpc", "module_utils_ec2"):
+        (targets / name).mkdir(parents=True)
+        (targets / name / "aliases").write_text("\n")
+
+    import_graph = CollectionsImportGraph([amazon, community])
+    collection = Collection(amazon, import_graph)
+    index = collection.target_index
+    # a changed module selects the targets named after it into all the collections
+    assert collection.dependency_files(cast(Target, index.get("ec2_vpc"))) == [
+        targets / "ec2_vpc" / "aliases",
+        amazon / "plugins" / "modules" / "ec2_vpc.py",
+        community / "plugins" / "modules" / "ec2_vpc.py",
+        amazon / "galaxy.yml",
+    ]
+    assert collection.dependency_files(cast(Target, index.get("module_utils_ec2"))) == [
+        targets / "module_utils_ec2" / "aliases",
+        amazon / "plugins" / "module_utils" / "ec2.py",
+        amazon / "galaxy.yml",
+    ]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Contains tests cases for scheduler module."""
+
+from scheduler import SlotLimits
+from scheduler import fit_schedule
+from scheduler import lpt
+from scheduler import schedule_targets
+from scheduler import share_slots
+
+
+ITEMS = [("a", 3), ("b", 3), ("c", 2), ("d", 2), ("e", 2)]
+
+
+def test_lpt() -> None:
+    """Test lpt function."""
+    schedule = lpt(ITEMS, 2)
+    assert schedule.groups() == [
+        {"total": 7, "targets": ["a", "c", "e"]},
+        {"total": 5, "targets": ["b", "d"]},
+    ]
+    assert schedule.makespan == 7
+
+
+def test_schedule_targets() -> None:
+    """Test schedule_targets function improves the lpt schedule."""
+    schedule = schedule_targets(ITEMS, 2)
+    assert schedule.makespan == 6
+    assert sorted(sorted(g["targets"]) for g in schedule.groups()) == [
+        ["a", "b"],
+        ["c", "d", "e"],
+    ]
+    assert schedule.stats() == {
+        "makespan": 6,
+        "imbalance": 0.0,
+        "feasible": True,
+        "slots": [6, 6],
+    }
+
+    schedule = schedule_targets([("a", 90), ("b", 10)], 3)
+    assert schedule.groups()[2] == {"total": 0, "targets": []}
+    assert schedule.stats()["imbalance"] == 1.7
+
+    assert schedule_targets([], 1).stats() == {
+        "makespan": 0,
+        "imbalance": 0.0,
+        "feasible": True,
+        "slots": [0],
+    }
+
+
+def test_schedule_targets_constraints() -> None:
+    """Test schedule_targets with max targets and max seconds per slot."""
+    items = [("a", 10), ("b", 1), ("c", 1), ("d", 1)]
+    assert schedule_targets(items, 2).groups() == [
+        {"total": 10, "targets": ["a"]},
+        {"total": 3, "targets": ["b", "c", "d"]},
+    ]
+    schedule = schedule_targets(items, 2, max_targets=2)
+    assert schedule.groups() == [
+        {"total": 11, "targets": ["a", "d"]},
+        {"total": 2, "targets": ["b", "c"]},
+    ]
+    assert schedule.feasible
+
+    assert not schedule_targets(items, 1, max_targets=2).feasible
+    assert not schedule_targets(items, 2, max_seconds=9).feasible
+    assert schedule_targets(items, 2, max_seconds=10).feasible
+
+
+def test_schedule_targets_setups() -> None:
+    """Test schedule_targets co-locates the targets sharing a dependency."""
+    items = [("a", 50), ("b", 50), ("c", 100), ("d", 50), ("e", 50)]
+    setups = {"a": {"x": 100}, "b": {"x": 100}, "e": {"y": 20}}
+    # the setup cost of a dependency is paid once per slot
+    assert lpt(items, 2, setups=setups).groups() == [
+        {"total": 250, "targets": ["a", "c"]},
+        {"total": 270, "targets": ["b", "e", "d"]},
+    ]
+    schedule = schedule_targets(items, 2, setups=setups)
+    assert schedule.groups() == [
+        {"total": 200, "targets": ["a", "b"]},
+        {"total": 220, "targets": ["c", "e", "d"]},
+    ]
+    assert [dict(+c) for c in schedule.counts] == [{"x": 2}, {"y": 1}]
+
+
+def test_fit_schedule() -> None:
+    """Test fit_schedule uses the smallest number of slots fitting the budget."""
+    assert len(fit_schedule(ITEMS, 12, 5).loads) == 1
+    assert len(fit_schedule(ITEMS, 6, 5).loads) == 2
+    assert len(fit_schedule(ITEMS, 4, 5).loads) == 4
+    assert len(fit_schedule(ITEMS, 4, 5, SlotLimits(max_targets=1)).loads) == 5
+    # the budget cannot be met, use all the slots
+    schedule = fit_schedule(ITEMS, 2, 4)
+    assert len(schedule.loads) == 4
+    assert schedule.makespan == 4
+    assert len(fit_schedule([], 10, 3).loads) == 1
+
+
+def test_share_slots() -> None:
+    """Test share_slots gives the slots of the pool to the longest groups."""
+    items = {
+        "a": [("a1", 10), ("a2", 10), ("a3", 10)],
+        "b": [("b1", 6), ("b2", 6)],
+        "c": [],
+    }
+    schedules = share_slots(items, 4)
+    assert sorted(schedules) == ["a", "b"]
+    assert [len(s.loads) for s in schedules.values()] == [3, 1]
+
+    # the makespan of b cannot be improved by another slot
+    schedules = share_slots(items, 10)
+    assert [len(s.loads) for s in schedules.values()] == [3, 2]
+
+    schedules = share_slots(items, 10, makespan_budget=20)
+    assert [len(s.loads) for s in schedules.values()] == [2, 1]
+
+    # every group gets a slot even when the pool is too small
+    assert [len(s.loads) for s in share_slots(items, 1).values()] == [1, 1]
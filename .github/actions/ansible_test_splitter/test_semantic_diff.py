@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Contains tests cases for semantic_diff module."""
+
+from pathlib import PosixPath
+
+from conftest import GitRepository
+from git_diff import FileChange
+from semantic_diff import changed_symbols
+from semantic_diff import impacted_symbols
+from semantic_diff import is_doc_only
+from semantic_diff import is_layout_change
+from semantic_diff import normalized_code
+
+
+MODULE = b'''
+"""My module."""
+
+DOCUMENTATION = r"""
+module: my_module
+short_description: does something
+"""
+
+EXAMPLES = ""
+
+
+def main():
+    """Run the module."""
+    # a comment
+    return run(1, 2)
+'''
+
+DOC_FRAGMENT = b'''
+class ModuleDocFragment:
+    DOCUMENTATION = r"""
+options: {}
+"""
+    TAGS = "tags"
+'''
+
+
+def test_normalized_code() -> None:
+    """Test normalized_code function ignores documentation, comments and formatting."""
+    reference = normalized_code(MODULE, plugin_doc=True)
+    assert reference is not None
+    doc_change = MODULE.replace(b"does something", b"does something else")
+    doc_change = doc_change.replace(b"# a comment", b"# another comment")
+    doc_change = doc_change.replace(b"run(1, 2)", b"run(\n        1,\n        2,\n    )")
+    doc_change = doc_change.replace(b'"""Run the module."""', b"")
+    assert normalized_code(doc_change, plugin_doc=True) == reference
+    assert normalized_code(MODULE.replace(b"run(1, 2)", b"run(1, 3)"), True) != reference
+    assert normalized_code(MODULE.replace(b'EXAMPLES = ""', b'OTHER = ""'), True) != reference
+    assert normalized_code(MODULE.replace(b"def main", b"def main(")) is None
+    # the plugins other than modules read their options from DOCUMENTATION
+    reference = normalized_code(MODULE)
+    assert normalized_code(doc_change) != reference
+    assert normalized_code(doc_change.replace(b"does something else", b"does something")) == (
+        reference
+    )
+
+    fragment = normalized_code(DOC_FRAGMENT, plugin_doc=True)
+    assert normalized_code(DOC_FRAGMENT.replace(b'"tags"', b'"other tags"'), True) == fragment
+    assert normalized_code(DOC_FRAGMENT.replace(b'"tags"', b"1"), True) != fragment
+    assert normalized_code(DOC_FRAGMENT.replace(b'"tags"', b'"other tags"')) != (
+        normalized_code(DOC_FRAGMENT)
+    )
+
+
+UTILS = b"""
+import json
+
+RETRIES = 3
+
+
+def retry(func):
+    return func(RETRIES)
+
+
+def describe(client):
+    return retry(client.describe)
+
+
+class Helper:
+    def run(self, client):
+        return describe(client)
+
+
+def unrelated():
+    return json.dumps({})
+"""
+
+
+def test_impacted_symbols() -> None:
+    """Test impacted_symbols function follows the references between the top level names."""
+    assert impacted_symbols(UTILS, UTILS) == set()
+    assert impacted_symbols(UTILS, UTILS.replace(b"RETRIES = 3", b"RETRIES = 4")) == {
+        "RETRIES",
+        "retry",
+        "describe",
+        "Helper",
+    }
+    assert impacted_symbols(UTILS, UTILS.replace(b"client.describe", b"client.list")) == {
+        "describe",
+        "Helper",
+    }
+    assert impacted_symbols(UTILS, UTILS + b"\n\ndef new():\n    pass\n") == {"new"}
+    comment = UTILS.replace(b"    return json", b"    # a comment\n    return json")
+    assert impacted_symbols(UTILS, comment) == set()
+    assert impacted_symbols(UTILS, UTILS.replace(b"import json", b"import yaml")) is None
+    assert impacted_symbols(UTILS, UTILS.replace(b"import json", b"import (")) is None
+
+
+def test_is_doc_only(tmp_path: PosixPath, git_repo: GitRepository) -> None:
+    """Test is_doc_only function compares the base and head versions of the files.
+
+    :param tmp_path: python temporary path fixture
+    :param git_repo: git repository fixture
+    """
+    modules = tmp_path / "plugins" / "modules"
+    modules.mkdir(parents=True)
+    for name in ("a.py", "b.py", "c.py", "e.py"):
+        (modules / name).write_bytes(MODULE)
+    git_repo.commit_base()
+
+    def _change(status: str, name: str, old_name: str = "") -> FileChange:
+        old_path = PosixPath("plugins/modules", old_name) if old_name else None
+        return FileChange(status, PosixPath("plugins/modules", name), old_path)
+
+    (modules / "a.py").write_bytes(MODULE.replace(b"does something", b"does nothing"))
+    (modules / "b.py").write_bytes(MODULE.replace(b"run(1, 2)", b"run(2, 1)"))
+    (modules / "c.py").rename(modules / "d.py")
+    (modules / "e.py").write_bytes(MODULE.replace(b"# a comment", b"# another comment"))
+    assert is_doc_only(tmp_path, _change("M", "a.py"), "main")
+    assert not is_doc_only(tmp_path, _change("M", "b.py"), "main")
+    # a pure rename changes the name of the module, hence of its targets
+    assert not is_doc_only(tmp_path, _change("R", "d.py", "c.py"), "main")
+    assert not is_doc_only(tmp_path, _change("A", "d.py"), "main")
+    assert changed_symbols(tmp_path, _change("M", "b.py"), "main") == {"main"}
+    assert changed_symbols(tmp_path, _change("M", "e.py"), "main") == set()
+    assert changed_symbols(tmp_path, _change("A", "d.py"), "main") is None
+
+    git_repo.run("commit", "-q", "-a", "-m", "change")
+    (modules / "a.py").write_bytes(b"")
+    assert is_doc_only(tmp_path, _change("M", "a.py"), "main", "HEAD")
+    assert not is_doc_only(tmp_path, _change("M", "a.py"), "main")
+
+
+INVENTORY = b'''
+"""My inventory."""
+
+DOCUMENTATION = r"""
+name: my_inventory
+options:
+  strict:
+    description: fail on template errors
+    default: false
+"""
+
+from ansible.plugins.inventory import BaseInventoryPlugin
+
+
+class InventoryModule(BaseInventoryPlugin):
+    NAME = "my_inventory"
+'''
+
+
+def test_is_doc_only_plugin_options(tmp_path: PosixPath, git_repo: GitRepository) -> None:
+    """Test is_doc_only function keeps the documentation the plugins read their options from.
+
+    :param tmp_path: python temporary path fixture
+    :param git_repo: git repository fixture
+    """
+    for directory in ("inventory", "doc_fragments"):
+        (tmp_path / "plugins" / directory).mkdir(parents=True)
+    (tmp_path / "plugins" / "inventory" / "my_inventory.py").write_bytes(INVENTORY)
+    (tmp_path / "plugins" / "doc_fragments" / "tags.py").write_bytes(DOC_FRAGMENT)
+    git_repo.commit_base()
+
+    inventory = PosixPath("plugins/inventory/my_inventory.py")
+    (tmp_path / inventory).write_bytes(INVENTORY.replace(b"default: false", b"default: true"))
+    assert not is_doc_only(tmp_path, FileChange("M", inventory), "main")
+    (tmp_path / inventory).write_bytes(INVENTORY.replace(b"My inventory", b"The inventory"))
+    assert is_doc_only(tmp_path, FileChange("M", inventory), "main")
+
+    fragment = PosixPath("plugins/doc_fragments/tags.py")
+    (tmp_path / fragment).write_bytes(DOC_FRAGMENT.replace(b"options: {}", b"options: {a: 1}"))
+    assert not is_doc_only(tmp_path, FileChange("M", fragment), "main")
+
+
+def test_is_layout_change(tmp_path: PosixPath, git_repo: GitRepository) -> None:
+    """Test is_layout_change function detects the changes of the targets and of the imports.
+
+    :param tmp_path: python temporary path fixture
+    :param git_repo: git repository fixture
+    """
+    (tmp_path / "plugins" / "modules").mkdir(parents=True)
+    (tmp_path / "plugins" / "modules" / "a.py").write_bytes(MODULE)
+    (tmp_path / "plugins" / "modules" / "b.py").write_bytes(MODULE)
+    (tmp_path / "tests" / "integration" / "targets" / "a" / "tasks").mkdir(parents=True)
+    (tmp_path / "tests" / "integration" / "targets" / "a" / "aliases").write_text("\n")
+    git_repo.commit_base()
+
+    (tmp_path / "plugins" / "modules" / "a.py").write_bytes(MODULE.replace(b"1, 2", b"2, 1"))
+    (tmp_path / "plugins" / "modules" / "b.py").write_bytes(b"import json\n" + MODULE)
+    target = PosixPath("tests/integration/targets")
+    assert not is_layout_change(
+        tmp_path, FileChange("M", PosixPath("plugins/modules/a.py")), "main"
+    )
+    assert is_layout_change(tmp_path, FileChange("M", PosixPath("plugins/modules/b.py")), "main")
+    assert is_layout_change(tmp_path, FileChange("A", PosixPath("plugins/modules/c.py")), "main")
+    assert not is_layout_change(tmp_path, FileChange("A", target / "a/tasks/main.yml"), "main")
+    assert is_layout_change(tmp_path, FileChange("M", target / "a/aliases"), "main")
+    assert is_layout_change(tmp_path, FileChange("A", target / "c/tasks/main.yml"), "main")
+    assert is_layout_change(
+        tmp_path, FileChange("R", target / "c/tasks/main.yml", target / "a/tasks/main.yml"), "main"
+    )
+    assert not is_layout_change(tmp_path, FileChange("A", PosixPath("docs/a.md")), "main")